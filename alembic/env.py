@@ -13,6 +13,7 @@ from app.models.category import *
 from app.models.comment import *
 from app.models.popular_ad import *
 from app.models.favourite import *
+from app.models.stored_file import *
 
 config = context.config
 
@@ -0,0 +1,31 @@
+"""add ad keyset pagination indexes
+
+Revision ID: 4a5bf4b684f0
+Revises: 6309d6791297
+Create Date: 2026-10-17 10:02:52.480803
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a5bf4b684f0'
+down_revision: Union[str, None] = '6309d6791297'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite indexes backing keyset pagination on (created_at DESC, id DESC)
+    op.create_index('ix_ad_created_at_id', 'ad', ['created_at', 'id'], unique=False)
+    op.create_index('ix_ad_category_id_created_at_id', 'ad', ['category_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_ad_user_id_created_at_id', 'ad', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ad_user_id_created_at_id', table_name='ad')
+    op.drop_index('ix_ad_category_id_created_at_id', table_name='ad')
+    op.drop_index('ix_ad_created_at_id', table_name='ad')
@@ -0,0 +1,53 @@
+"""add ad full text search vectors
+
+Revision ID: 74031bf9950b
+Revises: 4a5bf4b684f0
+Create Date: 2026-10-17 10:04:16.887008
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74031bf9950b'
+down_revision: Union[str, None] = '4a5bf4b684f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTORS = {
+    'search_vector': 'simple',
+    'search_vector_ru': 'russian',
+    'search_vector_en': 'english',
+}
+
+
+def _search_vector_expression(config: str) -> str:
+    return (
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(description, '')), 'B') || "
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(city, '') || ' ' || coalesce(street, '')), 'C')"
+    )
+
+
+def upgrade() -> None:
+    # Stored generated columns are computed for every existing row when added,
+    # so adding them also backfills the table
+    for column_name, config in SEARCH_VECTORS.items():
+        op.add_column('ad', sa.Column(
+            column_name,
+            postgresql.TSVECTOR(),
+            sa.Computed(_search_vector_expression(config), persisted=True),
+            nullable=True
+        ))
+        op.create_index(f'ix_ad_{column_name}', 'ad', [column_name], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    for column_name in SEARCH_VECTORS:
+        op.drop_index(f'ix_ad_{column_name}', table_name='ad', postgresql_using='gin')
+        op.drop_column('ad', column_name)
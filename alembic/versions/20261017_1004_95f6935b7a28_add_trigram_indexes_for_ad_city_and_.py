@@ -0,0 +1,32 @@
+"""add trigram indexes for ad city and street
+
+Revision ID: 95f6935b7a28
+Revises: 74031bf9950b
+Create Date: 2026-10-17 10:04:59.209909
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '95f6935b7a28'
+down_revision: Union[str, None] = '74031bf9950b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Serve ILIKE '%...%' and fuzzy (%) matches on city and street
+    op.create_index('ix_ad_city_trgm', 'ad', ['city'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'})
+    op.create_index('ix_ad_street_trgm', 'ad', ['street'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'street': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ad_street_trgm', table_name='ad', postgresql_using='gin')
+    op.drop_index('ix_ad_city_trgm', table_name='ad', postgresql_using='gin')
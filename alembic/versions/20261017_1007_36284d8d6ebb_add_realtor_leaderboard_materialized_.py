@@ -0,0 +1,47 @@
+"""add realtor leaderboard materialized view
+
+Revision ID: 36284d8d6ebb
+Revises: 95f6935b7a28
+Create Date: 2026-10-17 10:07:22.489491
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '36284d8d6ebb'
+down_revision: Union[str, None] = '95f6935b7a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE MATERIALIZED VIEW realtor_leaderboard AS
+        SELECT
+            u.id AS user_id,
+            count(a.id) AS total_ads,
+            coalesce(sum(a.views_count), 0) AS total_views,
+            coalesce(sum(f.favourites_count), 0) AS total_favourites,
+            coalesce(sum(f.favourites_count), 0) * 2 + coalesce(sum(a.views_count), 0) AS ranking_score
+        FROM "user" u
+        LEFT JOIN ad a ON a.user_id = u.id
+        LEFT JOIN (
+            SELECT ad_id, count(id) AS favourites_count
+            FROM favourite
+            GROUP BY ad_id
+        ) f ON f.ad_id = a.id
+        WHERE u.role = 'realtor'
+        GROUP BY u.id
+        WITH DATA
+    """)
+    # The unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_realtor_leaderboard_user_id ON realtor_leaderboard (user_id)")
+    op.execute("CREATE INDEX ix_realtor_leaderboard_ranking ON realtor_leaderboard (ranking_score DESC, user_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS realtor_leaderboard")
@@ -0,0 +1,29 @@
+"""add earthdistance index for nearby ads
+
+Revision ID: a78cfda6d45a
+Revises: 36284d8d6ebb
+Create Date: 2026-10-17 10:08:03.605498
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a78cfda6d45a'
+down_revision: Union[str, None] = '36284d8d6ebb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+    op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+    # Serves earth_box(...) @> ll_to_earth(latitude, longitude) in the nearby search
+    op.execute("CREATE INDEX ix_ad_earth_location ON ad USING gist (ll_to_earth(latitude, longitude))")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ad_earth_location', table_name='ad', postgresql_using='gist')
@@ -0,0 +1,51 @@
+"""add stored file reference counts
+
+Revision ID: a349e00384d0
+Revises: a78cfda6d45a
+Create Date: 2026-10-17 10:15:42.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a349e00384d0'
+down_revision: Union[str, None] = 'a78cfda6d45a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stored_file',
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('url')
+    )
+    # Serves the sweep of unreferenced files
+    op.create_index(
+        'ix_stored_file_unreferenced', 'stored_file', ['updated_at'],
+        unique=False, postgresql_where=sa.text('ref_count = 0')
+    )
+    # Count the files already referenced by ads, categories and user avatars
+    op.execute("""
+        INSERT INTO stored_file (url, ref_count)
+        SELECT url, count(*)
+        FROM (
+            SELECT unnest(image_urls) AS url FROM ad
+            UNION ALL SELECT unnest(document_urls) FROM ad
+            UNION ALL SELECT icon FROM category WHERE icon IS NOT NULL
+            UNION ALL SELECT avatar FROM "user" WHERE avatar IS NOT NULL
+        ) refs
+        GROUP BY url
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stored_file_unreferenced', table_name='stored_file', postgresql_where=sa.text('ref_count = 0'))
+    op.drop_table('stored_file')
@@ -0,0 +1,26 @@
+"""add category tree version sequence
+
+Revision ID: 5e0c8d7a2f13
+Revises: a349e00384d0
+Create Date: 2026-10-17 10:21:09.542817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0c8d7a2f13'
+down_revision: Union[str, None] = 'a349e00384d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('category_tree_version')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('category_tree_version')))
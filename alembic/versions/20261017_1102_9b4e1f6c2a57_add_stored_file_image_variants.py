@@ -0,0 +1,28 @@
+"""add stored file image variants
+
+Revision ID: 9b4e1f6c2a57
+Revises: c81f4b9e07d2
+Create Date: 2026-10-17 11:02:18.640731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e1f6c2a57'
+down_revision: Union[str, None] = 'c81f4b9e07d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Files uploaded so far have no recorded renditions; ads list them without variants
+    op.add_column('stored_file', sa.Column('variants', postgresql.ARRAY(sa.String()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('stored_file', 'variants')
@@ -1,11 +1,13 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.security import decode_access_token
-from app.db.session import SessionLocal
-from app.models.user import User, UserRole
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.user import UserRole
+from app.services.user_cache import AuthenticatedUser, get_authenticated_user, get_authenticated_user_sync
 
 oauth2_scheme = HTTPBearer()
 oauth2_scheme_optional = HTTPBearer(auto_error=False)
@@ -19,50 +21,77 @@ def get_db() -> Generator:
         db.close()
 
 
-async def get_current_user(
-        db: Session = Depends(get_db),
-        token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail='Could not validate credentials'
-    )
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
 
+def _token_subject(token: HTTPAuthorizationCredentials) -> str | None:
     payload = decode_access_token(token.credentials)
-    if not payload:
-        raise credentials_exception
+    return payload.get('sub') if payload else None
 
-    user_id = payload.get('sub')
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise credentials_exception
 
+def _require_user(user: AuthenticatedUser | None) -> AuthenticatedUser:
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Could not validate credentials'
+        )
     return user
 
 
-async def get_admin_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
-    if current_user.role != UserRole.ADMIN:
+def _require_admin(user: AuthenticatedUser) -> AuthenticatedUser:
+    if user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail='Access forbidden',
         )
-    return current_user
+    return user
+
+
+async def get_current_user(
+        db: AsyncSession = Depends(get_async_db),
+        token: str = Depends(oauth2_scheme)
+) -> AuthenticatedUser:
+    return _require_user(await get_authenticated_user(db, _token_subject(token)))
+
+
+async def get_admin_user(
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
+    return _require_admin(current_user)
 
 
 async def get_current_user_optional(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         token: HTTPAuthorizationCredentials | None = Depends(oauth2_scheme_optional)
-) -> User | None:
+) -> AuthenticatedUser | None:
     """Return current user if Authorization provided and valid; otherwise None."""
     if not token:
         return None
+    return await get_authenticated_user(db, _token_subject(token))
 
-    payload = decode_access_token(token.credentials)
-    if not payload:
-        return None
 
-    user_id = payload.get('sub')
-    user = db.query(User).filter(User.id == user_id).first()
-    return user
+# Variants for sync endpoints: they look the user up on the endpoint's own Session (get_db)
+# instead of opening an AsyncSession next to it.
+
+def get_current_user_sync(
+        db: Session = Depends(get_db),
+        token: str = Depends(oauth2_scheme)
+) -> AuthenticatedUser:
+    return _require_user(get_authenticated_user_sync(db, _token_subject(token)))
+
+
+def get_admin_user_sync(
+    current_user: AuthenticatedUser = Depends(get_current_user_sync)
+) -> AuthenticatedUser:
+    return _require_admin(current_user)
+
+
+def get_current_user_optional_sync(
+        db: Session = Depends(get_db),
+        token: HTTPAuthorizationCredentials | None = Depends(oauth2_scheme_optional)
+) -> AuthenticatedUser | None:
+    if not token:
+        return None
+    return get_authenticated_user_sync(db, _token_subject(token))
@@ -0,0 +1,76 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the parts identifying a representation, e.g. its path and a version stamp"""
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match lists etag; GET uses the weak comparison, so W/ prefixes are ignored"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def cache_control(request: Request, max_age: int = settings.HTTP_CACHE_MAX_AGE_SECONDS) -> str:
+    """Anonymous responses may be stored by shared caches; authenticated ones only revalidated by the client"""
+    if request.headers.get("authorization"):
+        return "private, no-cache"
+    return f"public, max-age={max_age}"
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set the caching headers of a read endpoint from an ETag known before the response is built,
+    and return a 304 response when the client already has it, so that loading and serialization are skipped
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control(request), "Vary": "Authorization"}
+    response.headers.update(headers)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+class ETagRoute(APIRoute):
+    """
+    Route class for cacheable read endpoints. Successful GET responses get a strong ETag hashed
+    from the rendered body, unless the endpoint set one, and Cache-Control unless the endpoint set it;
+    If-None-Match is answered with 304. This saves bandwidth, not server work; endpoints with a cheap
+    version stamp should call not_modified() instead.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            response = await handler(request)
+            if request.method != "GET" or response.status_code != 200 or not hasattr(response, "body"):
+                return response
+
+            etag = response.headers.get("etag")
+            if etag is None:
+                etag = f'"{hashlib.sha256(response.body).hexdigest()[:32]}"'
+                response.headers["ETag"] = etag
+            response.headers.setdefault("Cache-Control", cache_control(request))
+            response.headers.setdefault("Vary", "Authorization")
+
+            if etag_matches(request, etag):
+                headers = {
+                    name: value for name, value in response.headers.items()
+                    if name not in ("content-length", "content-type")
+                }
+                return Response(status_code=304, headers=headers)
+            return response
+
+        return route_handler
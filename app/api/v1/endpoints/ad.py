@@ -1,132 +1,241 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, status, HTTPException, Query, File, UploadFile, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 
-from app.api.deps import get_db, get_current_user, get_current_user_optional
+from app.api.deps import get_async_db, get_current_user, get_current_user_optional
+from app.api.http_cache import ETagRoute, make_etag
 from app.schemas.category import AdCategoryUpdate
-from app.services.ad_service import AdService
-from app.schemas.ad import AdCreate, AdOut, AdUpdate, DealType, UploadFileResponse
-from app.models.user import User, UserRole
-
-router = APIRouter(prefix="/api/v1/ads", tags=["Ads"])
+from app.services.ad_service import (
+    AsyncAdService,
+    DEFAULT_NEARBY_LIMIT,
+    DEFAULT_PAGE_SIZE,
+    MAX_NEARBY_LIMIT,
+    MAX_PAGE_SIZE,
+)
+from app.services.user_cache import AuthenticatedUser
+from app.schemas.ad import AdClusterOut, AdCreate, AdFacetsOut, AdOut, AdPage, AdUpdate, DealType, UploadFileResponse
+from app.core.config import settings
+from app.models.category import LanguageEnum
+from app.models.user import UserRole
+from app.utils.json_response import ModelJSONResponse
+
+router = APIRouter(prefix="/api/v1/ads", tags=["Ads"], route_class=ETagRoute)
+
+
+@router.get("/", response_model=AdPage)
+async def list_ads(
+        q: Optional[str] = Query(None, min_length=1, description="Search string (supports quotes, OR and -exclusion)"),
+        lang: Optional[LanguageEnum] = Query(None, description="Search language; stems Russian and English words"),
+        category_id: Optional[int] = None,
+        include_descendants: bool = Query(False, description="Also match ads in the subcategories of category_id"),
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        deal_type: Optional[DealType] = None,
+        rooms_count: Optional[int] = None,
+        city: Optional[str] = None,
+        street: Optional[str] = None,
+        fuzzy: bool = Query(False, description="Match city and street by similarity, tolerating misspellings"),
+        min_area: Optional[float] = None,
+        max_area: Optional[float] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional)
+):
+    ad_service = AsyncAdService(db)
+    filters = dict(
+        search_query=q,
+        search_lang=lang,
+        category_id=category_id,
+        include_descendants=include_descendants,
+        min_price=min_price,
+        max_price=max_price,
+        deal_type=deal_type,
+        rooms_count=rooms_count,
+        city=city,
+        street=street,
+        fuzzy=fuzzy,
+        min_area=min_area,
+        max_area=max_area,
+        limit=limit,
+        cursor=cursor
+    )
+    # Anonymous pages are the same for everyone, so they are rendered once and served from the listing cache
+    if current_user is None:
+        return Response(content=await ad_service.get_anonymous_ads_page(**filters), media_type="application/json")
+    return ModelJSONResponse(AdPage, await ad_service.get_all_ads(**filters, current_user=current_user))
 
 
-@router.get("/", response_model=List[AdOut])
-def list_ads(
-        q: Optional[str] = Query(None, min_length=1, description="Search string"),
+@router.get("/facets", response_model=AdFacetsOut)
+async def get_ad_facets(
+        response: Response,
+        q: Optional[str] = Query(None, min_length=1, description="Search string (supports quotes, OR and -exclusion)"),
+        lang: Optional[LanguageEnum] = Query(None, description="Search language; stems Russian and English words"),
         category_id: Optional[int] = None,
+        include_descendants: bool = Query(False, description="Also match ads in the subcategories of category_id"),
         min_price: Optional[int] = None,
         max_price: Optional[int] = None,
         deal_type: Optional[DealType] = None,
         rooms_count: Optional[int] = None,
         city: Optional[str] = None,
+        street: Optional[str] = None,
+        fuzzy: bool = Query(False, description="Match city and street by similarity, tolerating misspellings"),
         min_area: Optional[float] = None,
         max_area: Optional[float] = None,
-        db: Session = Depends(get_db),
-        current_user: Optional[User] = Depends(get_current_user_optional)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    ad_service = AdService(db)
-
-    return ad_service.get_all_ads(
+    """
+    Counts per category, deal type, rooms count and city, plus price and area histograms,
+    for the ads matching the same filters as the listing
+    """
+    ad_service = AsyncAdService(db)
+    facets = await ad_service.get_ad_facets(
         search_query=q,
+        search_lang=lang,
         category_id=category_id,
+        include_descendants=include_descendants,
         min_price=min_price,
         max_price=max_price,
         deal_type=deal_type,
         rooms_count=rooms_count,
         city=city,
+        street=street,
+        fuzzy=fuzzy,
         min_area=min_area,
-        max_area=max_area,
-        current_user=current_user
+        max_area=max_area
     )
+    response.headers["Cache-Control"] = f"public, max-age={settings.AD_FACETS_CACHE_TTL_SECONDS}"
+    return facets
 
 
 @router.post("/", response_model=AdOut, status_code=status.HTTP_201_CREATED)
-def create_ad(
+async def create_ad(
         ad_data: AdCreate,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        db: AsyncSession = Depends(get_async_db),
+        current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    ad_service = AdService(db)
-    return ad_service.create_ad(ad_data, current_user.id)
+    ad_service = AsyncAdService(db)
+    return await ad_service.create_ad(ad_data, current_user.id)
 
 
 @router.get("/nearby", response_model=List[AdOut])
-def get_nearby_ads(
+async def get_nearby_ads(
         latitude: float = Query(..., ge=-90, le=90),
         longitude: float = Query(..., ge=-180, le=180),
         radius_km: float = Query(5.0, ge=0.1, le=50),
-        db: Session = Depends(get_db),
-        current_user: Optional[User] = Depends(get_current_user_optional)
+        limit: int = Query(DEFAULT_NEARBY_LIMIT, ge=1, le=MAX_NEARBY_LIMIT),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional)
+):
+    ad_service = AsyncAdService(db)
+    ads = await ad_service.get_ads_by_location(latitude, longitude, radius_km, limit, current_user)
+    return ModelJSONResponse(List[AdOut], ads)
+
+
+@router.get("/clusters", response_model=List[AdClusterOut])
+async def get_ad_clusters(
+        response: Response,
+        min_latitude: float = Query(..., ge=-90, le=90),
+        min_longitude: float = Query(..., ge=-180, le=180),
+        max_latitude: float = Query(..., ge=-90, le=90),
+        max_longitude: float = Query(..., ge=-180, le=180),
+        zoom: int = Query(..., ge=0, le=22),
+        deal_type: Optional[DealType] = None,
+        category_id: Optional[int] = None,
+        include_descendants: bool = Query(False, description="Also match ads in the subcategories of category_id"),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    ad_service = AdService(db)
-    ads = ad_service.get_ads_by_location(latitude, longitude, radius_km)
-    # annotate favourites on result set
-    return ad_service._annotate_favourites(ads, current_user)
+    """
+    Grid-bucketed ad counts, centroids and price ranges for drawing a map viewport
+    """
+    ad_service = AsyncAdService(db)
+    clusters = await ad_service.get_ad_clusters(
+        min_latitude, min_longitude, max_latitude, max_longitude, zoom, deal_type, category_id, include_descendants
+    )
+    response.headers["Cache-Control"] = f"public, max-age={settings.AD_CLUSTER_CACHE_TTL_SECONDS}"
+    return clusters
 
 
-@router.get('/mine', response_model=List[AdOut])
-def get_my_ads(
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+@router.get('/mine', response_model=AdPage)
+async def get_my_ads(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    ad_service = AdService(db)
-    return ad_service.get_ads_by_user(current_user.id, current_user)
+    ad_service = AsyncAdService(db)
+    page = await ad_service.get_ads_by_user(current_user.id, current_user, limit=limit, cursor=cursor)
+    return ModelJSONResponse(AdPage, page)
 
 
-@router.get('/user/{user_id}', response_model=List[AdOut])
-def get_user_ads(
+@router.get('/user/{user_id}', response_model=AdPage)
+async def get_user_ads(
         user_id: UUID,
-        db: Session = Depends(get_db),
-        current_user: Optional[User] = Depends(get_current_user_optional)
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional)
 ):
-    ad_service = AdService(db)
-    return ad_service.get_ads_by_user(user_id, current_user)
+    ad_service = AsyncAdService(db)
+    page = await ad_service.get_ads_by_user(user_id, current_user, limit=limit, cursor=cursor)
+    return ModelJSONResponse(AdPage, page)
 
 
 @router.get("/{ad_id}", response_model=AdOut)
-def get_ad(ad_id: int, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user_optional)):
-    ad_service = AdService(db)
-    return ad_service.get_ad_or_404(ad_id, current_user, increment_views=True)
+async def get_ad(
+        ad_id: int,
+        request: Request,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional)
+):
+    ad_service = AsyncAdService(db)
+    ad = AdOut.model_validate(await ad_service.get_ad_or_404(ad_id, current_user, increment_views=True))
+    # views_count changes on every hit, so it is left out of the ETag. Shared caches must not answer
+    # for us either: every view has to reach the server to be counted, 304 revalidations included.
+    headers = {
+        "ETag": make_etag(request.url.path, ad.model_dump_json(exclude={"views_count"})),
+        "Cache-Control": "private, no-cache",
+    }
+    return ModelJSONResponse(AdOut, ad, headers=headers)
 
 
 @router.patch("/{ad_id}", response_model=AdOut)
-def update_ad(
+async def update_ad(
         ad_id: int,
         ad_update: AdUpdate,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        db: AsyncSession = Depends(get_async_db),
+        current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    ad_service = AdService(db)
-    ad = ad_service.get_ad_or_404(ad_id)
+    ad_service = AsyncAdService(db)
+    ad = await ad_service.get_ad_or_404(ad_id)
     if ad.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return ad_service.update_ad(ad_id, ad_update)
+    return await ad_service.update_ad(ad_id, ad_update)
 
 
 @router.patch("/{ad_id}/category", response_model=AdOut)
-def update_ad_category(
+async def update_ad_category(
         ad_id: int,
         category_update: AdCategoryUpdate,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        db: AsyncSession = Depends(get_async_db),
+        current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    ad_service = AdService(db)
-    ad = ad_service.get_ad_or_404(ad_id)
+    ad_service = AsyncAdService(db)
+    ad = await ad_service.get_ad_or_404(ad_id)
     if ad.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return ad_service.update_ad_category(ad_id, category_update.category_id)
+    return await ad_service.update_ad_category(ad_id, category_update.category_id)
 
 
 @router.delete("/{ad_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_ad(
+async def delete_ad(
         ad_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        db: AsyncSession = Depends(get_async_db),
+        current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    ad_service = AdService(db)
-    ad = ad_service.get_ad_or_404(ad_id)
+    ad_service = AsyncAdService(db)
+    ad = await ad_service.get_ad_or_404(ad_id)
     if ad.user_id != current_user.id and current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    ad_service.delete_ad(ad_id)
\ No newline at end of file
+    await ad_service.delete_ad(ad_id)
\ No newline at end of file
@@ -1,12 +1,20 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db
-from app.models.user import User
-from app.schemas.ad import AdOut, UploadFileResponse
-from app.services.ad_service import AdService
+from app.api.deps import get_async_db, get_current_user, get_current_user_sync, get_db
+from app.schemas.ad import (
+    AdOut,
+    PresignedUploadOut,
+    PresignedUploadRequest,
+    UploadCompleteRequest,
+    UploadFileResponse,
+    UploadKind,
+)
+from app.services.ad_service import AdService, AsyncAdService
+from app.services.user_cache import AuthenticatedUser
 
 router = APIRouter(prefix="/api/v1/ads", tags=["Ad Images"])
 
@@ -15,7 +23,8 @@ router = APIRouter(prefix="/api/v1/ads", tags=["Ad Images"])
 def add_images_to_ad(
     ad_id: int,
     image_urls: List[str],
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     ad_service = AdService(db)
     ad = ad_service.get_ad_or_404(ad_id)
@@ -29,7 +38,7 @@ def remove_image_from_ad(
     ad_id: int,
     image_url: str = Query(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     ad_service = AdService(db)
     ad = ad_service.get_ad_or_404(ad_id)
@@ -43,7 +52,7 @@ def add_documents_to_ad(
     ad_id: int,
     document_urls: List[str],
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     ad_service = AdService(db)
     ad = ad_service.get_ad_or_404(ad_id)
@@ -57,7 +66,7 @@ def remove_document_from_ad(
     ad_id: int,
     document_url: str = Query(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     ad_service = AdService(db)
     ad = ad_service.get_ad_or_404(ad_id)
@@ -66,6 +75,38 @@ def remove_document_from_ad(
     return ad_service.remove_document_from_ad(ad_id, document_url)
 
 
+@router.post("/{ad_id}/uploads", response_model=PresignedUploadOut)
+async def create_presigned_upload(
+    ad_id: int,
+    upload: PresignedUploadRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Presigned POST for uploading an image or document of the ad straight to S3;
+    call /uploads/complete with the returned key once the upload has finished
+    """
+    ad_service = AsyncAdService(db)
+    ad = await ad_service.get_ad_or_404(ad_id)
+    if ad.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await ad_service.create_presigned_upload(ad_id, upload)
+
+
+@router.post("/{ad_id}/uploads/complete", response_model=AdOut)
+async def complete_presigned_upload(
+    ad_id: int,
+    upload: UploadCompleteRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    ad_service = AsyncAdService(db)
+    ad = await ad_service.get_ad_or_404(ad_id)
+    if ad.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await ad_service.complete_presigned_upload(ad_id, upload)
+
+
 @router.post(
     "/upload-image",
     response_model=UploadFileResponse,
@@ -74,7 +115,7 @@ def remove_document_from_ad(
 async def upload_image(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     ad_service = AdService(db)
     return await ad_service.upload_file(file)
@@ -88,7 +129,29 @@ async def upload_image(
 async def upload_document(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     ad_service = AdService(db)
     return await ad_service.upload_file(file)
+
+
+@router.post(
+    "/upload-stream",
+    response_model=UploadFileResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_stream(
+    request: Request,
+    kind: UploadKind = Query(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Upload an image or document sent as the raw request body (not multipart/form-data).
+    The body is streamed to S3 without being buffered, and its type is detected from its content.
+    """
+    content_length = request.headers.get("content-length")
+    ad_service = AsyncAdService(db)
+    return await ad_service.upload_stream(
+        request.stream(), kind, int(content_length) if content_length and content_length.isdigit() else None
+    )
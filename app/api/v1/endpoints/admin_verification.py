@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.api.deps import get_db, get_admin_user
-from app.models.user import User
+from app.api.deps import get_async_db, get_admin_user
 from app.schemas.ad import (
     GoldVerificationRequestOut,
     GoldVerificationRequestUpdate
 )
 from app.services.verification_service import VerificationService
+from app.services.user_cache import AuthenticatedUser
 
 router = APIRouter(prefix="/api/v1/admin/verification", tags=["Admin - Gold Verification"])
 
@@ -24,8 +24,8 @@ router = APIRouter(prefix="/api/v1/admin/verification", tags=["Admin - Gold Veri
     }
 )
 async def get_pending_gold_requests(
-    admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: AuthenticatedUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all pending gold verification requests
@@ -33,7 +33,7 @@ async def get_pending_gold_requests(
     Admin only endpoint to view all requests waiting for approval/rejection.
     """
     verification_service = VerificationService(db)
-    return verification_service.get_pending_gold_requests()
+    return await verification_service.get_pending_gold_requests()
 
 
 @router.put(
@@ -51,8 +51,8 @@ async def get_pending_gold_requests(
 async def process_gold_verification_request(
     request_id: int,
     update_data: GoldVerificationRequestUpdate,
-    admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: AuthenticatedUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Process a gold verification request (approve or reject)
@@ -61,7 +61,7 @@ async def process_gold_verification_request(
     When approved, the ad gets gold status and appears higher in listings.
     """
     verification_service = VerificationService(db)
-    return verification_service.process_gold_verification_request(
+    return await verification_service.process_gold_verification_request(
         request_id, update_data, admin_user
     )
 
@@ -77,8 +77,8 @@ async def process_gold_verification_request(
     }
 )
 async def get_all_gold_requests(
-    admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: AuthenticatedUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all gold verification requests (all statuses)
@@ -86,4 +86,4 @@ async def get_all_gold_requests(
     Admin only endpoint to view all gold verification requests regardless of status.
     """
     verification_service = VerificationService(db)
-    return verification_service.get_all_gold_requests()
+    return await verification_service.get_all_gold_requests()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_async_db
 from app.schemas.auth import LoginAdminRequest, Token, RefreshTokenRequest
 
 from app.services.auth_service import AuthService
@@ -24,11 +24,11 @@ router = APIRouter(
 )
 async def login_admin(
     request: LoginAdminRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Token:
     """Login admin user"""
     auth_service = AuthService(db)
-    return auth_service.login_admin(request)
+    return await auth_service.login_admin(request)
 
 
 @router.post(
@@ -41,10 +41,10 @@ async def login_admin(
         500: {'description': 'Internal Server Error'}
     }
 )
-def refresh_token(
+async def refresh_token(
     request: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Token:
     """Refresh access token"""
     auth_service = AuthService(db)
-    return auth_service.refresh_token(request.refresh_token)
+    return await auth_service.refresh_token(request.refresh_token)
@@ -1,22 +1,24 @@
-from fastapi import APIRouter, Depends, status, UploadFile, File
+from fastapi import APIRouter, Depends, Query, Request, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_user_sync
+from app.api.http_cache import ETagRoute, make_etag, not_modified
 from app.services.category_service import CategoryService
-from app.services.ad_service import AdService
+from app.services.ad_service import AdService, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.user_cache import AuthenticatedUser
 from app.schemas.category import CategoryCreate, CategoryOut, CategoryUpdate, CategoryWithChildren
-from app.schemas.ad import AdOut
-from app.models.user import User
+from app.schemas.ad import AdPage
+from app.utils.json_response import ModelJSONResponse
 
-router = APIRouter(prefix="/api/v1/categories", tags=["Categories"])
+router = APIRouter(prefix="/api/v1/categories", tags=["Categories"], route_class=ETagRoute)
 
 
 @router.post("/", response_model=CategoryOut, status_code=status.HTTP_201_CREATED)
 def create_category(
         category: CategoryCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: AuthenticatedUser = Depends(get_current_user_sync)
 ):
     return CategoryService.create_category(category, current_user, db)
 
@@ -26,7 +28,7 @@ async def upload_category_icon(
         category_id: int,
         icon: UploadFile = File(...),
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: AuthenticatedUser = Depends(get_current_user_sync)
 ):
     """
     Upload icon for a category
@@ -38,7 +40,7 @@ async def upload_category_icon(
 async def delete_category_icon(
         category_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: AuthenticatedUser = Depends(get_current_user_sync)
 ):
     """
     Delete icon for a category
@@ -47,17 +49,26 @@ async def delete_category_icon(
 
 
 @router.get("/", response_model=List[CategoryOut])
-def list_categories(db: Session = Depends(get_db)):
+def list_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag(request.url.path, CategoryService.get_tree_version(db))
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
     return CategoryService.get_all_categories(db)
 
 
 @router.get("/root", response_model=List[CategoryWithChildren])
-def list_root_categories(db: Session = Depends(get_db)):
+def list_root_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag(request.url.path, CategoryService.get_tree_version(db))
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
     return CategoryService.get_root_categories(db)
 
 
 @router.get("/{category_id}", response_model=CategoryOut)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+def get_category(category_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag(request.url.path, CategoryService.get_tree_version(db))
+    if (cached := not_modified(request, response, etag)) is not None:
+        return cached
     return CategoryService.get_category_by_id(category_id, db)
 
 
@@ -66,7 +77,7 @@ def update_category(
         category_id: int,
         category_update: CategoryUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: AuthenticatedUser = Depends(get_current_user_sync)
 ):
     return CategoryService.update_category(category_id, category_update, current_user, db)
 
@@ -75,22 +86,29 @@ def update_category(
 def delete_category(
         category_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: AuthenticatedUser = Depends(get_current_user_sync)
 ):
     CategoryService.delete_category(category_id, current_user, db)
 
 
-@router.get("/{category_id}/ads", response_model=List[AdOut])
+@router.get("/{category_id}/ads", response_model=AdPage)
 def list_ads_by_category(
         category_id: int,
+        include_descendants: bool = Query(False, description="Also list ads in the subcategories"),
         min_price: Optional[int] = None,
         max_price: Optional[int] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
         db: Session = Depends(get_db)
 ):
     CategoryService.get_category_by_id(category_id, db)
     ad_service = AdService(db)
-    return ad_service.get_all_ads(
+    page = ad_service.get_all_ads(
         category_id=category_id, 
+        include_descendants=include_descendants,
         min_price=min_price, 
-        max_price=max_price
+        max_price=max_price,
+        limit=limit,
+        cursor=cursor
     )
+    return ModelJSONResponse(AdPage, page)
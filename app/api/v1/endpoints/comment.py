@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.schemas.comment import CommentCreate, CommentOut
 from app.services.comment_service import CommentService
-from app.api.deps import get_db, get_current_user
+from app.services.user_cache import AuthenticatedUser
+from app.api.deps import get_db, get_current_user_sync
 
 router = APIRouter(prefix="/api/v1", tags=["Comments"])
 
@@ -12,7 +13,7 @@ def create_comment_for_ad(
     ad_id: int,
     comment_in: CommentCreate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user_sync),
 ):
     service = CommentService(db)
     return service.create_comment(ad_id=ad_id, user_id=current_user.id, comment_in=comment_in)
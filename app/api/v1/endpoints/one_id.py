@@ -1,15 +1,15 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_async_db, get_current_user
 from app.services.one_id_service import OneIDService
+from app.services.user_cache import AuthenticatedUser
 from app.schemas.one_id import (
     OneIDCodeRequest,
     UserWithOneIDResponse,
     OneIDInfoResponse
 )
-from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +19,8 @@ router = APIRouter(prefix="/api/v1/auth", tags=["One ID Verification"])
 @router.post("/one_id", response_model=UserWithOneIDResponse)
 async def verify_with_one_id(
     request: OneIDCodeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Verify current user with One ID authorization code
@@ -38,7 +38,7 @@ async def verify_with_one_id(
         user_info = await one_id_service.get_user_info(token_response.access_token)
         
         # Update current user with One ID information
-        updated_user = one_id_service.update_current_user_with_one_id(current_user, user_info)
+        updated_user = await one_id_service.update_current_user_with_one_id(current_user, user_info)
         
         # Check if the returned user is different from current user
         if updated_user.id != current_user.id:
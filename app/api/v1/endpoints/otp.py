@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_async_db
 from app.schemas.auth import Token
 from app.schemas.otp import OTPRequest, OTPVerify, OTPResponse
 from app.services.auth_service import AuthService
@@ -23,7 +23,7 @@ router = APIRouter(
 )
 async def request_otp(
     request: OTPRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> OTPResponse:
     user_service = UserService(db)
     otp_service = OTPService(db)
@@ -45,7 +45,7 @@ async def request_otp(
 )
 async def login_with_otp(
     request: OTPVerify,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Token:
     user_service = UserService(db)
     otp_service = OTPService(db)
@@ -2,33 +2,35 @@ from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.api.deps import get_db, get_admin_user, get_current_user_optional
+from app.api.deps import get_db, get_admin_user_sync, get_current_user_optional_sync
+from app.api.http_cache import ETagRoute
 from app.schemas.popular_ad import PopularAdCreate
 from app.schemas.ad import AdOut
-from app.models.user import User
 from app.services.popular_ad import PopularAdService
+from app.services.user_cache import AuthenticatedUser
+from app.utils.json_response import ModelJSONResponse
 
-router = APIRouter(prefix="/api/v1/popular-ads", tags=["Popular Ads"])
+router = APIRouter(prefix="/api/v1/popular-ads", tags=["Popular Ads"], route_class=ETagRoute)
 
 @router.get("/", response_model=List[AdOut])
 def list_popular_ads(
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional_sync)
 ):
     service = PopularAdService(db)
-    return service.get_all_popular_ads(current_user)
+    return ModelJSONResponse(List[AdOut], service.get_all_popular_ads(current_user))
 
 
-@router.post("/", response_model=AdOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(get_admin_user)])
+@router.post("/", response_model=AdOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(get_admin_user_sync)])
 def add_popular_ad(
     data: PopularAdCreate,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_admin_user)
+    admin: AuthenticatedUser = Depends(get_admin_user_sync)
 ):
     service = PopularAdService(db)
     return service.create_popular_ad(data, admin.id)
 
-@router.delete("/{ad_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_admin_user)])
+@router.delete("/{ad_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_admin_user_sync)])
 def remove_popular_ad(
     ad_id: int,
     db: Session = Depends(get_db)
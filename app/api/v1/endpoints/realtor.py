@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.api.deps import get_db
+from app.api.http_cache import ETagRoute
 from app.services.realtor_service import RealtorService
 from app.schemas.user import UserOut
 from pydantic import BaseModel, ConfigDict
@@ -18,16 +19,20 @@ class RealtorRankingOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-router = APIRouter(prefix="/api/v1/realtors", tags=["Realtors"])
+router = APIRouter(prefix="/api/v1/realtors", tags=["Realtors"], route_class=ETagRoute)
 
 
 @router.get("/ranking", response_model=List[RealtorRankingOut])
-def get_realtor_ranking(db: Session = Depends(get_db)):
+def get_realtor_ranking(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
     """
     Get realtors ranked by their ads' total favourites and views
     """
     realtor_service = RealtorService(db)
-    ranking_data = realtor_service.get_realtor_ranking()
+    ranking_data = realtor_service.get_realtor_ranking(limit=limit, offset=offset)
     
     # Convert to response format
     result = []
@@ -1,12 +1,14 @@
 from typing import List
 from uuid import UUID
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
-from app.api.deps import get_db, get_admin_user, get_current_user
+from app.utils.json_response import ModelJSONResponse
+from app.api.deps import get_async_db, get_admin_user, get_current_user
 from app.schemas.user import UserAdminCreate, UserUpdate, UserOut
 from app.services.user_service import UserService
+from app.services.user_cache import AuthenticatedUser
 from app.schemas.ad import AdOut
 
 router = APIRouter(
@@ -24,7 +26,7 @@ router = APIRouter(
         401: {'description': 'Unauthorized'}
     }
 )
-async def list_users(db: Session = Depends(get_db)) -> List[UserOut]:
+async def list_users(db: AsyncSession = Depends(get_async_db)) -> List[UserOut]:
     user_service = UserService(db)
     return await user_service.get_all_users()
 
@@ -41,7 +43,7 @@ async def list_users(db: Session = Depends(get_db)) -> List[UserOut]:
 )
 async def create_admin(
     user: UserAdminCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     user_service = UserService(db)
     return await user_service.create_admin(user.username, user.password)
@@ -58,10 +60,10 @@ async def create_admin(
 )
 async def get_user(
     user_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     user_service = UserService(db)
-    return user_service.get_user_by_id(user_id)
+    return await user_service.get_user_by_id(user_id)
 
 
 @router.patch(
@@ -77,7 +79,7 @@ async def get_user(
 async def update_user(
     user_id: UUID,
     user_data: UserUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     user_service = UserService(db)
     return await user_service.update_user(user_id, user_data)
@@ -94,7 +96,7 @@ async def update_user(
 )
 async def delete_user(
     user_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> None:
     user_service = UserService(db)
     await user_service.delete_user(user_id)
@@ -103,29 +105,29 @@ async def delete_user(
 @router.post('/me/favourites/{ad_id}', status_code=status.HTTP_201_CREATED)
 async def add_favourite(
     ad_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     service = UserService(db)
-    fav = service.add_favourite(current_user.id, ad_id)
+    fav = await service.add_favourite(current_user.id, ad_id)
     return {"id": fav.id, "ad_id": fav.ad_id, "created_at": fav.created_at}
 
 
 @router.delete('/me/favourites/{ad_id}', status_code=status.HTTP_204_NO_CONTENT)
 async def remove_favourite(
     ad_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     service = UserService(db)
-    service.remove_favourite(current_user.id, ad_id)
+    await service.remove_favourite(current_user.id, ad_id)
     return
 
 
 @router.get('/me/favourites', response_model=List[AdOut])
 async def list_my_favourites(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     service = UserService(db)
-    return service.list_favourites(current_user.id)
+    return ModelJSONResponse(List[AdOut], await service.list_favourites(current_user.id))
@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.api.deps import get_db, get_current_user
-from app.models.user import User
+from app.api.deps import get_async_db, get_current_user
 from app.schemas.ad import (
     GoldVerificationRequestCreate,
     GoldVerificationRequestOut,
     GoldVerificationRequestUpdate
 )
 from app.services.verification_service import VerificationService
+from app.services.user_cache import AuthenticatedUser
 
 router = APIRouter(prefix="/api/v1/verification", tags=["Gold Verification"])
 
@@ -26,8 +26,8 @@ router = APIRouter(prefix="/api/v1/verification", tags=["Gold Verification"])
 )
 async def request_gold_verification(
     request_data: GoldVerificationRequestCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Request gold verification for an ad
@@ -36,7 +36,7 @@ async def request_gold_verification(
     Only one pending request per ad is allowed.
     """
     verification_service = VerificationService(db)
-    return verification_service.request_gold_verification(request_data, current_user)
+    return await verification_service.request_gold_verification(request_data, current_user)
 
 
 @router.get(
@@ -49,14 +49,14 @@ async def request_gold_verification(
     }
 )
 async def get_my_gold_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all gold verification requests made by the current user
     """
     verification_service = VerificationService(db)
-    return verification_service.get_user_gold_requests(current_user)
+    return await verification_service.get_user_gold_requests(current_user)
 
 
 @router.delete(
@@ -72,8 +72,8 @@ async def get_my_gold_requests(
 )
 async def cancel_gold_verification_request(
     request_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cancel a pending gold verification request
@@ -82,4 +82,4 @@ async def cancel_gold_verification_request(
     Only pending requests can be cancelled.
     """
     verification_service = VerificationService(db)
-    return verification_service.cancel_gold_verification_request(request_id, current_user)
+    return await verification_service.cancel_gold_verification_request(request_id, current_user)
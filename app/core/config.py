@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import SecretStr, PostgresDsn
 from pydantic_settings import BaseSettings
 
@@ -13,6 +13,41 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = 5
     DB_MAX_OVERFLOW: int = 10
 
+    # Buffered ad view counts are written every N seconds or once this many ads are pending
+    VIEW_COUNT_FLUSH_INTERVAL_SECONDS: float = 5.0
+    VIEW_COUNT_FLUSH_THRESHOLD: int = 1000
+
+    # Map cluster responses are cached in-process and by clients/CDN for this long
+    AD_CLUSTER_CACHE_TTL_SECONDS: int = 60
+    AD_FACETS_CACHE_TTL_SECONDS: int = 30
+    # Anonymous listing pages are cached per worker; changes to ads drop the affected pages at once
+    AD_LISTING_CACHE_SIZE: int = 1024
+    AD_LISTING_CACHE_TTL_SECONDS: int = 30
+    # The category tree is cached in memory; other workers' changes are picked up within this many seconds
+    CATEGORY_TREE_CHECK_INTERVAL_SECONDS: float = 5.0
+    # Cache-Control max-age of anonymous read endpoints (categories, ads, popular ads, realtor ranking)
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 60
+
+    # Serve realtor ranking from the realtor_leaderboard materialized view, refreshed every N seconds
+    REALTOR_LEADERBOARD_ENABLED: bool = False
+    REALTOR_LEADERBOARD_REFRESH_SECONDS: float = 300.0
+
+    # Debug/ops: log callbacks blocking the event loop longer than the threshold, per route
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_THRESHOLD_MS: float = 100.0
+    LOOP_MONITOR_INTERVAL_MS: float = 50.0
+
+    # Authenticated users (id, role, flags) cached per worker to skip the per-request lookup
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+
+    # Verified JWT claims cached per worker until the token expires
+    TOKEN_CLAIMS_CACHE_SIZE: int = 10000
+
+    # bcrypt runs on this many worker threads; further callers queue, at most N admitted at once
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
     SECRET_KEY: SecretStr
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
@@ -30,6 +65,26 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION_NAME: str = 'us-east-1'
     AWS_S3_BUCKET_NAME: str
+    # Custom S3 endpoint, e.g. a local S3 stand-in (MinIO, moto server) for tests and benchmarks
+    AWS_S3_ENDPOINT_URL: Optional[str] = None
+
+    # Uploads run on S3_UPLOAD_WORKERS threads sharing one client; further uploads queue
+    S3_UPLOAD_WORKERS: int = 8
+    S3_MAX_PENDING_UPLOADS: int = 64
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    # Files above the threshold are uploaded in concurrent multipart chunks
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_MULTIPART_CONCURRENCY: int = 4
+    # Lifetime of presigned direct-upload URLs
+    S3_PRESIGNED_UPLOAD_EXPIRES_SECONDS: int = 900
+    # Thumbnail/WebP renditions of uploaded images are generated in IMAGE_PIPELINE_WORKERS processes
+    IMAGE_PIPELINE_WORKERS: int = 2
+    IMAGE_PIPELINE_MAX_PENDING: int = 16
+    IMAGE_VARIANT_QUALITY: int = 80
+    # Uploads are shared by content; files without references are deleted from S3 after a grace period
+    STORED_FILE_SWEEP_INTERVAL_SECONDS: float = 3600.0
+    STORED_FILE_GRACE_HOURS: float = 24.0
 
     # One ID (Yagona identifikatsiya tizimi) settings
     ONE_ID_CLIENT_ID: str
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_ROUTE = "<unknown>"
+
+
+class EventLoopMonitor:
+    """
+    Debug/ops detector for code that blocks the event loop.
+
+    A heartbeat task wakes up every interval seconds and measures how late it was scheduled (loop lag).
+    A watchdog thread watches that heartbeat: once the loop has not come back for threshold seconds,
+    it logs the stack of the loop thread together with the route being served, and the stall is
+    counted against that route when the loop recovers.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = settings.LOOP_MONITOR_THRESHOLD_MS,
+        interval_ms: float = settings.LOOP_MONITOR_INTERVAL_MS,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._lag_samples = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._last_beat = time.monotonic()
+        self._stalled_route: Optional[str] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join()
+        self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._last_beat - self.interval
+            self._record_lag(max(lag, 0.0))
+
+    def _record_lag(self, lag: float) -> None:
+        with self._lock:
+            self._lag_samples += 1
+            self._lag_total += lag
+            self._lag_max = max(self._lag_max, lag)
+            if lag < self.threshold:
+                return
+            route = self._stalled_route or UNKNOWN_ROUTE
+            self._stalled_route = None
+            tally = self._routes.setdefault(route, {"stalls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            tally["stalls"] += 1
+            tally["total_ms"] += lag * 1000
+            tally["max_ms"] = max(tally["max_ms"], lag * 1000)
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms by {route}")
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+            beat = self._last_beat
+            if beat == reported_beat or time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            # The heartbeat is overdue: the loop thread is stuck in whatever it is running right now
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported_beat = beat
+            route = self._route_of(frame)
+            with self._lock:
+                self._stalled_route = route
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"Event loop blocked for over {self.threshold * 1000:.0f}ms by {route}\n{stack}"
+            )
+
+    @staticmethod
+    def _route_of(frame) -> str:
+        """
+        Find the request being served by walking up the await chain to the innermost ASGI frame
+        with an HTTP scope; the route template is known once routing has matched
+        """
+        while frame is not None:
+            scope = frame.f_locals.get("scope")
+            if isinstance(scope, dict) and scope.get("type") == "http":
+                route = scope.get("route")
+                path = getattr(route, "path", None) or scope.get("path")
+                return f"{scope.get('method')} {path}"
+            frame = frame.f_back
+        return UNKNOWN_ROUTE
+
+    def stats(self) -> dict:
+        """Loop lag summary and the per-route stall tally, worst routes first"""
+        with self._lock:
+            routes = sorted(self._routes.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "lag": {
+                    "samples": self._lag_samples,
+                    "avg_ms": self._lag_total / self._lag_samples * 1000 if self._lag_samples else 0.0,
+                    "max_ms": self._lag_max * 1000,
+                },
+                "routes": [{"route": route, **tally} for route, tally in routes],
+            }
+
+
+# Global instance
+loop_monitor = EventLoopMonitor()
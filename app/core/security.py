@@ -1,12 +1,27 @@
+import hashlib
+import time
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 
 from app.core.config import settings
+from app.utils.cache import TTLCache
+from app.utils.executor import BoundedExecutor
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+# Verified token claims by token digest, each kept until the token's exp
+token_claims_cache = TTLCache(maxsize=settings.TOKEN_CLAIMS_CACHE_SIZE, ttl=0)
+
+
+# bcrypt costs ~200ms of CPU per call and releases the GIL, so it runs on its own threads
+password_hash_pool = BoundedExecutor(
+    name="password-hash",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -16,6 +31,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password hash pool, for use on the event loop"""
+    return await password_hash_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password hash pool, for use on the event loop"""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
     payload = data.copy()
     expire = datetime.now() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -29,14 +54,25 @@ def create_access_token(data: dict) -> str:
 
 
 def decode_access_token(token: str) -> Optional[Dict]:
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_claims_cache.get(key)
+    if claims is not None:
+        return dict(claims)
+
     try:
-        return jwt.decode(
+        claims = jwt.decode(
             token,
             settings.SECRET_KEY.get_secret_value(),
             algorithms=[settings.ALGORITHM]
         )
     except JWTError:
         return None
+
+    # Only signed, unexpired tokens get here; cache them for the rest of their lifetime
+    exp = claims.get('exp')
+    if isinstance(exp, (int, float)):
+        token_claims_cache.set(key, claims, ttl=exp - time.time())
+    return dict(claims)
     
 
 def create_refresh_token(data: dict) -> str:
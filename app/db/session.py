@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
@@ -16,3 +18,21 @@ SessionLocal = sessionmaker(
     autoflush=False,
     bind=engine
 )
+
+# Same database through asyncpg, for handlers that must not block the event loop
+async_engine = create_async_engine(
+    url=make_url(str(settings.DATABASE_URL)).set(drivername="postgresql+asyncpg"),
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    echo=settings.DEBUG
+)
+
+# expire_on_commit=False: attributes of committed objects stay loaded, so serializing
+# them after commit() does not trigger implicit (and, on asyncio, forbidden) lazy IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
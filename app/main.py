@@ -1,24 +1,74 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+import asyncio
 import logging
 import time
 
 from app.core.config import settings
+from app.core.loop_monitor import loop_monitor
+from app.core.security import password_hash_pool, token_claims_cache
+from app.api.deps import get_admin_user
 from app.api.v1.router import api_router
+from app.services.ad_service import cluster_cache, facets_cache
+from app.services.category_tree import category_tree_cache
+from app.services.image_pipeline import image_pipeline
+from app.services.listing_cache import listing_cache
+from app.services.realtor_service import refresh_leaderboard_periodically
+from app.services.stored_file_service import sweep_unreferenced_files_periodically
+from app.services.user_cache import authenticated_user_cache
+from app.utils.s3_upload import s3_service
+from app.services.view_counter import view_counter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
+
+    # Periodically flush buffered ad views; the final flush runs on shutdown
+    await view_counter.start()
+
+    leaderboard_task = None
+    if settings.REALTOR_LEADERBOARD_ENABLED:
+        leaderboard_task = asyncio.create_task(
+            refresh_leaderboard_periodically(settings.REALTOR_LEADERBOARD_REFRESH_SECONDS)
+        )
+
+    # Delete files that lost their last reference, once the grace period has passed
+    sweep_task = asyncio.create_task(sweep_unreferenced_files_periodically(
+        settings.STORED_FILE_SWEEP_INTERVAL_SECONDS, timedelta(hours=settings.STORED_FILE_GRACE_HOURS)
+    ))
+
+    yield
+
+    for task in (leaderboard_task, sweep_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await view_counter.stop()
+    await loop_monitor.stop()
+    await image_pipeline.stop()
+    password_hash_pool.shutdown()
+    s3_service.executor.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     version=settings.PROJECT_VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -69,5 +119,32 @@ async def general_exception_handler(request: Request, exc: Exception):
 async def health_check():
     return {"status": "healthy", "timestamp": time.time()}
 
+# In-process cache sizes and hit/miss counters of this worker
+@app.get("/debug/caches", dependencies=[Depends(get_admin_user)])
+async def cache_stats():
+    return {
+        "token_claims": token_claims_cache.stats(),
+        "authenticated_users": authenticated_user_cache.stats(),
+        "ad_clusters": cluster_cache.stats(),
+        "ad_facets": facets_cache.stats(),
+        "ad_listing": listing_cache.stats(),
+        "category_tree": category_tree_cache.stats(),
+    }
+
+# Queue times of this worker's bcrypt and S3 upload pools, and the image pipeline backlog
+@app.get("/debug/executors", dependencies=[Depends(get_admin_user)])
+async def executor_stats():
+    return {
+        "password_hash": password_hash_pool.stats(),
+        "s3_upload": s3_service.executor.stats(),
+        "image_pipeline": image_pipeline.stats(),
+    }
+
+# Event loop stall tally, only served while the monitor runs
+if settings.LOOP_MONITOR_ENABLED:
+    @app.get("/debug/event-loop", dependencies=[Depends(get_admin_user)])
+    async def event_loop_stats():
+        return loop_monitor.stats()
+
 # Include API router
 app.include_router(api_router)
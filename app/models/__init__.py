@@ -2,7 +2,7 @@
 # Import order matters - import base models first, then dependent models
 
 # Base models (no dependencies)
-from app.models.category import Category, CategoryName, LanguageEnum
+from app.models.category import Category, CategoryClosure, CategoryName, LanguageEnum
 
 # Models that depend on base models
 from app.models.user import User, UserRole
@@ -11,10 +11,12 @@ from app.models.comment import Comment
 from app.models.otp import OTP
 from app.models.popular_ad import PopularAd
 from app.models.favourite import Favourite
+from app.models.stored_file import StoredFile
 
 # This ensures all models are imported and available when SQLAlchemy initializes
 __all__ = [
     "Category",
+    "CategoryClosure",
     "CategoryName", 
     "LanguageEnum",
     "User",
@@ -25,5 +27,6 @@ __all__ = [
     "Comment",
     "OTP",
     "PopularAd",
-    "Favourite"
+    "Favourite",
+    "StoredFile"
 ]
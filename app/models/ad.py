@@ -5,19 +5,25 @@ from sqlalchemy import (
     UUID,
     Boolean,
     Column,
+    Computed,
     DateTime,
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    any_,
+    select,
 )
-from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import column_property, deferred, relationship
 from sqlalchemy.sql import func
 
 from app.db.base import Base
+from app.models.stored_file import StoredFile
+from app.utils.images import IMAGE_VARIANTS
 
 
 class DealType(enum.Enum):
@@ -36,7 +42,30 @@ class GoldVerificationStatus(enum.Enum):
     rejected = "rejected"
 
 
+def _search_vector_expression(config: str) -> str:
+    """SQL for a weighted tsvector over the searchable ad fields using the given text search configuration"""
+    return (
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(description, '')), 'B') || "
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce(city, '') || ' ' || coalesce(street, '')), 'C')"
+    )
+
+
 class Ad(Base):
+    __table_args__ = (
+        # Keyset pagination on (created_at DESC, id DESC)
+        Index("ix_ad_created_at_id", "created_at", "id"),
+        Index("ix_ad_category_id_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_ad_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Full-text search
+        Index("ix_ad_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_ad_search_vector_ru", "search_vector_ru", postgresql_using="gin"),
+        Index("ix_ad_search_vector_en", "search_vector_en", postgresql_using="gin"),
+        # Substring and fuzzy matching on location (pg_trgm)
+        Index("ix_ad_city_trgm", "city", postgresql_using="gin", postgresql_ops={"city": "gin_trgm_ops"}),
+        Index("ix_ad_street_trgm", "street", postgresql_using="gin", postgresql_ops={"street": "gin_trgm_ops"}),
+    )
+
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
 
@@ -72,6 +101,12 @@ class Ad(Base):
 
     # Images - storing as array of URLs
     image_urls = Column(ARRAY(String), nullable=True, default=[])
+    # Those of image_urls with every IMAGE_VARIANTS rendition generated, loaded with the ad
+    variant_image_urls = column_property(
+        select(func.array_agg(StoredFile.url))
+        .where(StoredFile.url == any_(image_urls), StoredFile.variants.contains(list(IMAGE_VARIANTS)))
+        .scalar_subquery()
+    )
 
     # Documents - storing as array of URLs
     document_urls = Column(ARRAY(String), nullable=True, default=[])
@@ -97,6 +132,17 @@ class Ad(Base):
         comment="Number of times the ad has been viewed",
     )
 
+    # Full-text search vectors (generated by the database, never loaded by default)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(_search_vector_expression("simple"), persisted=True))
+    )
+    search_vector_ru = deferred(
+        Column(TSVECTOR, Computed(_search_vector_expression("russian"), persisted=True))
+    )
+    search_vector_en = deferred(
+        Column(TSVECTOR, Computed(_search_vector_expression("english"), persisted=True))
+    )
+
     # Relationships
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"))
     user = relationship("User", back_populates="ads")
@@ -114,6 +160,14 @@ class Ad(Base):
     )
 
 
+# Nearby search (cube + earthdistance extensions)
+Index(
+    "ix_ad_earth_location",
+    func.ll_to_earth(Ad.latitude, Ad.longitude),
+    postgresql_using="gist",
+)
+
+
 class GoldVerificationRequest(Base):
     """Model for tracking gold verification requests"""
 
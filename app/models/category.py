@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, Sequence
 from sqlalchemy.orm import relationship
 from enum import Enum
 
@@ -11,6 +11,10 @@ class LanguageEnum(str, Enum):
     en = "en"
 
 
+# Bumped after every committed change to categories; workers reload their cached tree when it moves
+category_tree_version = Sequence("category_tree_version", metadata=Base.metadata)
+
+
 class Category(Base):
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
@@ -33,3 +37,14 @@ class CategoryName(Base):
 
     category_id = Column(Integer, ForeignKey("category.id"), nullable=False)
     category = relationship("Category", back_populates="names")
+
+
+class CategoryClosure(Base):
+    """Every (ancestor, descendant) pair of the category tree, including each category with itself at depth 0"""
+    ancestor_id = Column(Integer, ForeignKey("category.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("category.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_category_closure_descendant_id", "descendant_id"),
+    )
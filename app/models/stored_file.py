@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db.base import Base
+
+
+class StoredFile(Base):
+    """
+    Reference count of an uploaded file. Uploads are content-addressed, so one object
+    can back the images, documents and category icons of many records.
+    Rows that drop to zero references are swept, together with the object, after a grace period.
+    """
+    __tablename__ = "stored_file"
+
+    url = Column(String, primary_key=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # Names of the image renditions generated for the file (see IMAGE_VARIANTS); null until they exist
+    variants = Column(ARRAY(String), nullable=True)
+
+    __table_args__ = (
+        # Serves the sweep of unreferenced files
+        Index("ix_stored_file_unreferenced", "updated_at", postgresql_where=text("ref_count = 0")),
+    )
@@ -1,11 +1,12 @@
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field, field_validator, HttpUrl, model_validator
-from typing import Optional, List
+from pydantic import AliasChoices, AliasPath, BaseModel, EmailStr, Field, field_validator, HttpUrl, model_validator
+from typing import Dict, Optional, List, Union
 from enum import Enum
 from datetime import datetime
 
 from app.schemas.category import CategoryOut
 from app.schemas.user import UserOut
+from app.utils.images import variant_urls
 
 
 class DealType(str, Enum):
@@ -24,6 +25,18 @@ class GoldVerificationStatus(str, Enum):
     rejected = "rejected"
 
 
+class UploadKind(str, Enum):
+    image = "image"
+    document = "document"
+
+
+class ImageVariantsOut(BaseModel):
+    """WebP renditions of one of image_urls; listed once they have been generated"""
+    original: str
+    thumbnail: str
+    medium: str
+
+
 class AdBase(BaseModel):
     # Basic information
     title: str
@@ -145,6 +158,8 @@ class AdUpdate(BaseModel):
 class AdOut(AdBase):
     id: int
     user_id: Optional[UUID] = None
+    # Stored emails were validated on input; re-running email_validator on every listed ad dominated serialization
+    email: str = Field(..., json_schema_extra={"format": "email"})
     category: CategoryOut
     views_count: int = 0
     user: Optional[UserOut] = None
@@ -153,7 +168,11 @@ class AdOut(AdBase):
     gold_verification_requests: Optional[List['GoldVerificationRequestNoAdOut']] = None
     
     # Computed fields - verification status from related data
-    is_author_verified: bool = False
+    # Author verification is read from the eager-loaded Ad.user relationship
+    is_author_verified: bool = Field(
+        False,
+        validation_alias=AliasChoices('is_author_verified', AliasPath('user', 'is_verified'))
+    )
     is_gold_verified: bool = False
     gold_verification_status: Optional[GoldVerificationStatus] = None
     gold_verification_requested_at: Optional[datetime] = None
@@ -163,27 +182,29 @@ class AdOut(AdBase):
     # Favourites info (computed)
     is_favourited: Optional[bool] = None
 
+    # Distance from the requested point, only set by the nearby search
+    distance_km: Optional[float] = None
+
+    # Images whose renditions have been generated (Ad.variant_image_urls), only used to compute image_variants
+    variant_image_urls: Optional[List[str]] = Field(None, exclude=True)
+
+    # Small renditions of the uploaded images, in image_urls order (computed)
+    image_variants: List[ImageVariantsOut] = []
+
+    @model_validator(mode='after')
+    def compute_image_variants(self):
+        """Rendition URLs of the images uploaded to our bucket whose renditions have been generated"""
+        generated = set(self.variant_image_urls or ())
+        self.image_variants = [
+            ImageVariantsOut(original=url, **variants)
+            for url in self.image_urls or []
+            if url in generated and (variants := variant_urls(url)) is not None
+        ]
+        return self
+
     @model_validator(mode='after')
     def compute_verification_status(self):
-        """Compute verification status from user and gold verification requests"""
-        # Author verification from DB by user_id
-        if self.user_id:
-            try:
-                from app.db.session import SessionLocal
-                from app.models.user import User
-                db = SessionLocal()
-                user = db.query(User).filter(User.id == self.user_id).first()
-                if user:
-                    self.is_author_verified = user.is_verified
-            except Exception:
-                # Fail-safe: leave as default False if DB access fails
-                pass
-            finally:
-                try:
-                    db.close()
-                except Exception:
-                    pass
-        
+        """Compute gold verification status from already loaded gold verification requests"""
         # Gold verification from latest request
         if self.gold_verification_requests:
             # Get the latest gold verification request
@@ -200,6 +221,35 @@ class AdOut(AdBase):
         from_attributes = True
 
 
+class AdClusterOut(BaseModel):
+    """Ads of one map grid cell"""
+    latitude: float = Field(..., description="Centroid latitude of the ads in the cell")
+    longitude: float = Field(..., description="Centroid longitude of the ads in the cell")
+    count: int
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+
+
+class FacetCount(BaseModel):
+    value: Union[int, str]
+    count: int
+
+
+class HistogramBucket(BaseModel):
+    min: Optional[float] = Field(None, description="Inclusive lower bound; null for the lowest bucket")
+    max: Optional[float] = Field(None, description="Exclusive upper bound; null for the highest bucket")
+    count: int
+
+
+class AdFacetsOut(BaseModel):
+    categories: List[FacetCount]
+    deal_types: List[FacetCount]
+    rooms_counts: List[FacetCount]
+    cities: List[FacetCount]
+    price: List[HistogramBucket]
+    area: List[HistogramBucket]
+
+
 class UploadFileResponse(BaseModel):
     url: HttpUrl
 
@@ -207,6 +257,26 @@ class UploadFileResponse(BaseModel):
         from_attributes = True
 
 
+class PresignedUploadRequest(BaseModel):
+    kind: UploadKind
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str
+
+
+class PresignedUploadOut(BaseModel):
+    # POST the file as multipart/form-data to url, with fields first and the file last
+    url: str
+    fields: Dict[str, str]
+    key: str
+    max_size: int
+    expires_in: int
+
+
+class UploadCompleteRequest(BaseModel):
+    kind: UploadKind
+    key: str
+
+
 class GoldVerificationRequestBase(BaseModel):
     request_reason: Optional[str] = None
 
@@ -255,3 +325,9 @@ class GoldVerificationRequestNoAdOut(GoldVerificationRequestBase):
 
     class Config:
         from_attributes = True
+
+
+class AdPage(BaseModel):
+    """A page of ads with the cursor pointing at the next page"""
+    items: List[AdOut]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page")
@@ -1,24 +1,83 @@
+import math
+import os
 import uuid
-import boto3
 from fastapi import HTTPException, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy import Integer, any_, cast, literal, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, REAL
 from sqlalchemy.sql import func
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 from datetime import datetime
 
-from app.models.ad import Ad, DealType
+from app.models.ad import Ad, DealType, GoldVerificationRequest
 from app.models.favourite import Favourite
-from app.schemas.ad import AdCreate, AdUpdate
-from app.models.user import User
-from app.models.category import Category
-from sqlalchemy.orm import joinedload
+from app.schemas.ad import AdCreate, AdPage, AdUpdate, PresignedUploadRequest, UploadCompleteRequest, UploadKind
+from app.models.category import Category, LanguageEnum
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.core.config import settings
+from app.services.category_tree import category_tree_cache
+from app.services.image_pipeline import image_pipeline
+from app.services.listing_cache import ListingTags, listing_cache
+from app.services.stored_file_service import StoredFileService, claim_stored_file
+from app.services.user_cache import AuthenticatedUser
+from app.services.view_counter import view_counter
+from app.utils.cache import TTLCache
+from app.utils.json_response import dump_json
+from app.utils.pagination import decode_cursor, next_cursor_for
+from app.utils.s3_upload import SNIFF_SIZE, s3_service, sniff_content_type
 
 # Constants
-COORDINATE_CONVERSION_FACTOR = 111.0  # 1 degree ≈ 111 km
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.pdf'}
+UPLOAD_CONTENT_TYPES = {
+    UploadKind.image: {'image/jpeg', 'image/png', 'image/gif', 'image/webp'},
+    UploadKind.document: {'application/pdf'},
+}
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_NEARBY_LIMIT = 50
+MAX_NEARBY_LIMIT = 500
+# Map clusters: grid cells per 256px map tile edge, and at most per request (about 16x16 tiles)
+CLUSTER_CELLS_PER_TILE = 4
+MAX_CLUSTER_CELLS = 4096
+
+# Facets: histogram bucket edges for price and total area
+PRICE_HISTOGRAM_EDGES = [0, 20000, 40000, 60000, 80000, 100000, 150000, 200000, 300000, 500000]
+AREA_HISTOGRAM_EDGES = [0.0, 30.0, 50.0, 70.0, 90.0, 120.0, 150.0, 200.0, 300.0]
+# Rendered inline rather than bound: grouping() must repeat the GROUP BY expressions exactly
+PRICE_HISTOGRAM_BOUNDS = literal_column(f"ARRAY[{', '.join(map(str, PRICE_HISTOGRAM_EDGES))}]::integer[]")
+AREA_HISTOGRAM_BOUNDS = literal_column(f"ARRAY[{', '.join(map(str, AREA_HISTOGRAM_EDGES))}]::float8[]")
+
+cluster_cache = TTLCache(maxsize=1024, ttl=settings.AD_CLUSTER_CACHE_TTL_SECONDS)
+facets_cache = TTLCache(maxsize=512, ttl=settings.AD_FACETS_CACHE_TTL_SECONDS)
+
+# Loader options needed to serialize an Ad as AdOut without any lazy loads.
+# Many-to-one relationships are joined, collections use selectinload to avoid row explosion.
+AD_OUT_LOADER_OPTIONS = (
+    joinedload(Ad.user),
+    joinedload(Ad.category, innerjoin=True).selectinload(Category.names),
+    selectinload(Ad.gold_verification_requests).options(
+        joinedload(GoldVerificationRequest.requester),
+        joinedload(GoldVerificationRequest.processor),
+    ),
+)
+
+# Text search configuration and generated tsvector column per search language.
+# PostgreSQL has no Uzbek configuration, so Uzbek uses the language-agnostic "simple" one.
+TEXT_SEARCH_CONFIGS = {
+    None: ("simple", Ad.search_vector),
+    LanguageEnum.uz: ("simple", Ad.search_vector),
+    LanguageEnum.ru: ("russian", Ad.search_vector_ru),
+    LanguageEnum.en: ("english", Ad.search_vector_en),
+}
+
+
+def presigned_upload_prefix(ad_id: int) -> str:
+    """S3 key prefix of the direct uploads issued for an ad"""
+    return f"ads/{ad_id}/"
 
 
 class AdService:
@@ -26,15 +85,22 @@ class AdService:
     def __init__(self, db: Session):
         self.db = db
 
-    def _apply_search_filter(self, query, search_query: str):
-        """Apply search filter to the query"""
-        like_query = f"%{search_query}%"
-        return query.filter(
-            (Ad.title.ilike(like_query)) |
-            (Ad.description.ilike(like_query)) |
-            (Ad.city.ilike(like_query)) |
-            (Ad.street.ilike(like_query))
-        )
+    def _apply_search_filter(self, query, search_query: str, search_lang: Optional[LanguageEnum] = None):
+        """Apply full-text search filter to the query and return it together with the relevance expression"""
+        config, search_vector = TEXT_SEARCH_CONFIGS[search_lang]
+        ts_query = func.websearch_to_tsquery(config, search_query)
+        rank = func.ts_rank(search_vector, ts_query)
+        return query.filter(search_vector.op('@@')(ts_query)), rank
+
+    def _apply_category_filter(self, query, category_id: Optional[int], include_descendants: bool = False):
+        """Apply category filter to the query, optionally matching the whole subtree of the category"""
+        if category_id is None:
+            return query
+        if not include_descendants:
+            return query.filter(Ad.category_id == category_id)
+        # Subtree ids come from the cached category tree; one array parameter keeps the statement cacheable
+        subtree_ids = sorted(category_tree_cache.get(self.db).subtree_ids(category_id))
+        return query.filter(Ad.category_id == any_(literal(subtree_ids, ARRAY(Integer))))
 
     def _apply_price_filter(self, query, min_price: Optional[int], max_price: Optional[int]):
         """Apply price filters to the query"""
@@ -44,10 +110,25 @@ class AdService:
             query = query.filter(Ad.price <= max_price)
         return query
 
-    def _apply_location_filter(self, query, city: Optional[str]):
-        """Apply city filter to the query"""
-        if city is not None:
-            query = query.filter(Ad.city.ilike(f"%{city}%"))
+    def _apply_location_filter(
+            self,
+            query,
+            city: Optional[str],
+            street: Optional[str] = None,
+            fuzzy: bool = False
+    ):
+        """
+        Apply city and street filters to the query.
+        Fuzzy mode uses the pg_trgm similarity operator so that misspellings and
+        transliterations (e.g. "Toshkent" / "Tashkent") still match.
+        """
+        for column, value in ((Ad.city, city), (Ad.street, street)):
+            if value is None:
+                continue
+            if fuzzy:
+                query = query.filter(column.op('%')(value))
+            else:
+                query = query.filter(column.ilike(f"%{value}%"))
         return query
 
     def _apply_area_filter(self, query, min_area: Optional[float], max_area: Optional[float]):
@@ -58,7 +139,77 @@ class AdService:
             query = query.filter(Ad.total_area <= max_area)
         return query
 
-    def _annotate_favourites(self, ads: List[Ad], current_user: Optional[User]) -> List[Ad]:
+    def _apply_filters(
+            self,
+            query,
+            search_query: Optional[str] = None,
+            search_lang: Optional[LanguageEnum] = None,
+            category_id: Optional[int] = None,
+            min_price: Optional[int] = None,
+            max_price: Optional[int] = None,
+            deal_type: Optional[DealType] = None,
+            rooms_count: Optional[int] = None,
+            city: Optional[str] = None,
+            street: Optional[str] = None,
+            fuzzy: bool = False,
+            min_area: Optional[float] = None,
+            max_area: Optional[float] = None,
+            include_descendants: bool = False,
+    ):
+        """Apply the ad listing filters; returns the query and the search relevance expression (None without search)"""
+        rank = None
+        if search_query:
+            query, rank = self._apply_search_filter(query, search_query, search_lang)
+
+        query = self._apply_category_filter(query, category_id, include_descendants)
+
+        query = self._apply_price_filter(query, min_price, max_price)
+
+        if deal_type is not None:
+            query = query.filter(Ad.deal_type == deal_type)
+
+        if rooms_count is not None:
+            query = query.filter(Ad.rooms_count == rooms_count)
+
+        query = self._apply_location_filter(query, city, street, fuzzy)
+        query = self._apply_area_filter(query, min_area, max_area)
+        return query, rank
+
+    def _paginate(self, query, limit: int, cursor: Optional[str], rank=None) -> Tuple[List[Ad], Optional[str]]:
+        """
+        Apply keyset pagination on (created_at DESC, id DESC), or on (rank DESC, created_at DESC, id DESC)
+        when a search relevance expression is given, and return the page with the next cursor
+        """
+        order_by = [Ad.created_at.desc(), Ad.id.desc()]
+        if rank is not None:
+            query = query.add_columns(rank.label("search_rank"))
+            order_by.insert(0, rank.desc())
+
+        if cursor:
+            created_at, ad_id, cursor_rank = decode_cursor(cursor)
+            if (cursor_rank is None) != (rank is None):
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+            if rank is None:
+                query = query.filter(tuple_(Ad.created_at, Ad.id) < tuple_(created_at, ad_id))
+            else:
+                # ts_rank returns real, so compare against the cursor rank at the same precision
+                query = query.filter(
+                    tuple_(rank, Ad.created_at, Ad.id) < tuple_(cast(cursor_rank, REAL), created_at, ad_id)
+                )
+
+        # Fetch one extra row to find out whether another page exists
+        rows = query.order_by(*order_by).limit(limit + 1).all()
+        if rank is None:
+            ads = rows
+        else:
+            ads = []
+            for ad, search_rank in rows:
+                # transient attribute used to build the next cursor
+                ad.search_rank = search_rank
+                ads.append(ad)
+        return ads[:limit], next_cursor_for(ads, limit)
+
+    def _annotate_favourites(self, ads: List[Ad], current_user: Optional[AuthenticatedUser]) -> List[Ad]:
         """Attach transient attributes is_favourited and favourites_count to each ad."""
         if not ads:
             return ads
@@ -88,13 +239,19 @@ class AdService:
             city: Optional[str] = None,
             min_area: Optional[float] = None,
             max_area: Optional[float] = None,
-            current_user: Optional[User] = None,
-    ) -> List[Ad]:
+            current_user: Optional[AuthenticatedUser] = None,
+            limit: int = DEFAULT_PAGE_SIZE,
+            cursor: Optional[str] = None,
+            search_lang: Optional[LanguageEnum] = None,
+            street: Optional[str] = None,
+            fuzzy: bool = False,
+            include_descendants: bool = False,
+    ) -> dict:
         """
-        Get all ads with optional filtering
+        Get a page of ads with optional filtering
         
         Args:
-            search_query: Text to search in title, description, city, or street
+            search_query: Web-search style query matched against title, description, city and street
             category_id: Filter by category ID
             min_price: Minimum price filter
             max_price: Maximum price filter
@@ -103,61 +260,188 @@ class AdService:
             city: Filter by city name
             min_area: Minimum area filter
             max_area: Maximum area filter
+            limit: Maximum number of ads to return
+            cursor: Opaque cursor returned as next_cursor by the previous page
+            search_lang: Language whose text search configuration is used for search_query
+            street: Filter by street name
+            fuzzy: Match city and street by trigram similarity instead of substring
+            include_descendants: Also match ads in the subcategories of category_id
             
         Returns:
-            List of filtered ads
+            Dict with the filtered ads under "items" and the cursor of the next page under "next_cursor"
         """
-        query = self.db.query(Ad).options(
-            joinedload(Ad.user),
-            joinedload(Ad.gold_verification_requests)
+        query, rank = self._apply_filters(
+            self.db.query(Ad).options(*AD_OUT_LOADER_OPTIONS),
+            search_query=search_query,
+            search_lang=search_lang,
+            category_id=category_id,
+            min_price=min_price,
+            max_price=max_price,
+            deal_type=deal_type,
+            rooms_count=rooms_count,
+            city=city,
+            street=street,
+            fuzzy=fuzzy,
+            min_area=min_area,
+            max_area=max_area,
+            include_descendants=include_descendants,
         )
 
-        # Apply search filter if search query is provided
-        if search_query:
-            query = self._apply_search_filter(query, search_query)
-
+        # Search results are ordered by relevance
+        ads, next_cursor = self._paginate(query, limit, cursor, rank)
+        return {
+            "items": self._annotate_favourites(ads, current_user),
+            "next_cursor": next_cursor
+        }
+
+    def render_anonymous_ads_page(self, cache_key: tuple, **filters) -> bytes:
+        """Render a page of get_all_ads() for anonymous users as JSON and store it in the listing cache"""
+        generation = listing_cache.generation()
+        page = self.get_all_ads(**filters)
+        body = dump_json(AdPage, page)
+
+        category_id = filters.get("category_id")
+        category_ids = None
         if category_id is not None:
-            query = query.filter(Ad.category_id == category_id)
-
-        query = self._apply_price_filter(query, min_price, max_price)
-
-        if deal_type is not None:
-            query = query.filter(Ad.deal_type == deal_type)
-
-        if rooms_count is not None:
-            query = query.filter(Ad.rooms_count == rooms_count)
-
-        query = self._apply_location_filter(query, city)
-        query = self._apply_area_filter(query, min_area, max_area)
-
-        # Order by verification status: gold verified first, then others
-        # Gold verification status is computed from GoldVerificationRequest
-        query = query.order_by(Ad.created_at.desc())
-
-        ads = query.all()
-        return self._annotate_favourites(ads, current_user)
+            category_ids = (
+                category_tree_cache.get(self.db).subtree_ids(category_id)
+                if filters.get("include_descendants") else frozenset((category_id,))
+            )
+        city = filters.get("city")
+        deal_type = filters.get("deal_type")
+        tags = ListingTags(
+            category_ids=category_ids,
+            city=city.strip().lower() if city else None,
+            fuzzy_city=filters.get("fuzzy", False),
+            deal_type=deal_type.value if deal_type is not None else None,
+        )
+        listing_cache.set(cache_key, body, tags, generation)
+        return body
 
-    def get_ads_by_user(self, user_id: int, current_user: Optional[User] = None) -> List[Ad]:
-        """Get all ads created by a specific user"""
-        ads = (
+    def get_ads_by_user(
+            self,
+            user_id: int,
+            current_user: Optional[AuthenticatedUser] = None,
+            limit: int = DEFAULT_PAGE_SIZE,
+            cursor: Optional[str] = None,
+    ) -> dict:
+        """Get a page of ads created by a specific user"""
+        query = (
             self.db.query(Ad)
-            .options(
-                joinedload(Ad.user),
-                joinedload(Ad.gold_verification_requests)
-            )
+            .options(*AD_OUT_LOADER_OPTIONS)
             .filter(Ad.user_id == user_id)
-            .all()
         )
-        return self._annotate_favourites(ads, current_user)
+        ads, next_cursor = self._paginate(query, limit, cursor)
+        return {
+            "items": self._annotate_favourites(ads, current_user),
+            "next_cursor": next_cursor
+        }
 
-    def get_ad_or_404(self, ad_id: int, current_user: Optional[User] = None, increment_views: bool = False) -> Ad:
+    def get_ad_facets(
+            self,
+            search_query: Optional[str] = None,
+            search_lang: Optional[LanguageEnum] = None,
+            category_id: Optional[int] = None,
+            min_price: Optional[int] = None,
+            max_price: Optional[int] = None,
+            deal_type: Optional[DealType] = None,
+            rooms_count: Optional[int] = None,
+            city: Optional[str] = None,
+            street: Optional[str] = None,
+            fuzzy: bool = False,
+            min_area: Optional[float] = None,
+            max_area: Optional[float] = None,
+            include_descendants: bool = False,
+    ) -> dict:
+        """
+        Count the ads matching the listing filters per category, deal type, rooms count and city,
+        and bucket them into price and area histograms, in a single GROUPING SETS scan
+        """
+        # Search and location matching are case-insensitive, so normalize them for the cache key
+        search_query = search_query.strip().lower() if search_query else None
+        city = city.strip().lower() if city else None
+        street = street.strip().lower() if street else None
+        filters = dict(
+            search_query=search_query,
+            search_lang=search_lang,
+            category_id=category_id,
+            min_price=min_price,
+            max_price=max_price,
+            deal_type=deal_type,
+            rooms_count=rooms_count,
+            city=city,
+            street=street,
+            fuzzy=fuzzy,
+            min_area=min_area,
+            max_area=max_area,
+            include_descendants=include_descendants,
+        )
+        cache_key = tuple(sorted(filters.items()))
+        facets = facets_cache.get(cache_key)
+        if facets is not None:
+            return facets
+
+        dimensions = {
+            "categories": Ad.category_id,
+            "deal_types": Ad.deal_type,
+            "rooms_counts": Ad.rooms_count,
+            "cities": Ad.city,
+            "price": func.width_bucket(Ad.price, PRICE_HISTOGRAM_BOUNDS),
+            "area": func.width_bucket(Ad.total_area, AREA_HISTOGRAM_BOUNDS),
+        }
+        query = self.db.query(
+            *[expression.label(name) for name, expression in dimensions.items()],
+            # grouping() is 0 for the columns of the grouping set a row belongs to
+            *[func.grouping(expression).label(f"{name}_grouping") for name, expression in dimensions.items()],
+            func.count(Ad.id).label("count"),
+        )
+        query, _ = self._apply_filters(query, **filters)
+        rows = query.group_by(func.grouping_sets(*dimensions.values())).all()
+
+        facets = {name: [] for name in dimensions}
+        for row in rows:
+            for name in dimensions:
+                value = getattr(row, name)
+                if getattr(row, f"{name}_grouping") == 0 and value is not None:
+                    facets[name].append((value, row.count))
+                    break
+
+        result = {
+            "categories": self._facet_counts(facets["categories"]),
+            "deal_types": self._facet_counts((deal.value, count) for deal, count in facets["deal_types"]),
+            "rooms_counts": self._facet_counts(facets["rooms_counts"]),
+            "cities": self._facet_counts(facets["cities"]),
+            "price": self._histogram(facets["price"], PRICE_HISTOGRAM_EDGES),
+            "area": self._histogram(facets["area"], AREA_HISTOGRAM_EDGES),
+        }
+        facets_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def _facet_counts(values) -> List[dict]:
+        """Facet values ordered by descending count"""
+        return [
+            {"value": value, "count": count}
+            for value, count in sorted(values, key=lambda item: item[1], reverse=True)
+        ]
+
+    @staticmethod
+    def _histogram(buckets, edges: list) -> List[dict]:
+        """Map width_bucket() indexes to [min, max) ranges; the outer buckets are open-ended"""
+        return [
+            {
+                "min": edges[index - 1] if index > 0 else None,
+                "max": edges[index] if index < len(edges) else None,
+                "count": count
+            }
+            for index, count in sorted(buckets)
+        ]
+
+    def get_ad_or_404(self, ad_id: int, current_user: Optional[AuthenticatedUser] = None, increment_views: bool = False) -> Ad:
         """Get ad by ID or raise 404 if not found"""
         ad = (
             self.db.query(Ad)
-            .options(
-                joinedload(Ad.user),
-                joinedload(Ad.gold_verification_requests)
-            )
+            .options(*AD_OUT_LOADER_OPTIONS)
             .filter(Ad.id == ad_id)
             .first()
         )
@@ -168,9 +452,7 @@ class AdService:
         
         # Increment views if requested
         if increment_views:
-            ad.views_count = (ad.views_count or 0) + 1
-            self.db.commit()
-            self.db.refresh(ad)
+            self._record_view(ad)
         
         return ad
 
@@ -180,11 +462,15 @@ class AdService:
         if not ad:
             raise HTTPException(status_code=404, detail="Ad not found")
         
-        ad.views_count = (ad.views_count or 0) + 1
-        self.db.commit()
-        self.db.refresh(ad)
+        self._record_view(ad)
         return ad
 
+    def _record_view(self, ad: Ad) -> None:
+        """Buffer a view in the write-behind counter instead of committing it on the request"""
+        view_counter.record(ad.id)
+        # Show buffered views in the response without marking the ad as dirty
+        set_committed_value(ad, 'views_count', (ad.views_count or 0) + view_counter.pending(ad.id))
+
     def create_ad(self, ad_data: AdCreate, user_id: int) -> Ad:
         """Create a new ad"""
         if not ad_data.category_id:
@@ -197,69 +483,105 @@ class AdService:
 
         new_ad = Ad(**ad_data.model_dump(), user_id=user_id)
         self.db.add(new_ad)
+        StoredFileService(self.db).retain([*(new_ad.image_urls or []), *(new_ad.document_urls or [])])
         self.db.commit()
-        self.db.refresh(new_ad)
-        return new_ad
+        listing_cache.invalidate_ad(new_ad)
+        # Reload with the AdOut loader profile so that serializing the new ad needs no lazy loads
+        return self.get_ad_or_404(new_ad.id)
 
     def update_ad(self, ad_id: int, ad_data: AdUpdate) -> Ad:
         """Update an existing ad"""
         ad = self.get_ad_or_404(ad_id)
         update_data = ad_data.model_dump(exclude_unset=True)
 
+        stored_files = StoredFileService(self.db)
+        for key in ("image_urls", "document_urls"):
+            if key in update_data:
+                stored_files.replace(getattr(ad, key) or [], update_data[key] or [])
+
+        # The ad leaves the listing pages of its old category, city and deal type and joins the new ones
+        previous = (ad.category_id, ad.city, ad.deal_type)
         for key, value in update_data.items():
             if hasattr(ad, key):
                 setattr(ad, key, value)
 
         self.db.commit()
         self.db.refresh(ad)
+        listing_cache.invalidate(*previous)
+        listing_cache.invalidate_ad(ad)
         return ad
 
     def update_ad_category(self, ad_id: int, category_id: int) -> Ad:
         """Update the category of an ad"""
         ad = self.get_ad_or_404(ad_id)
+        previous_category_id = ad.category_id
         ad.category_id = category_id
         self.db.commit()
         self.db.refresh(ad)
+        listing_cache.invalidate(previous_category_id, ad.city, ad.deal_type)
+        listing_cache.invalidate_ad(ad)
         return ad
 
     def delete_ad(self, ad_id: int) -> None:
         """Delete an ad"""
         ad = self.get_ad_or_404(ad_id)
+        listing_values = (ad.category_id, ad.city, ad.deal_type)
+        StoredFileService(self.db).release([*(ad.image_urls or []), *(ad.document_urls or [])])
         self.db.delete(ad)
         self.db.commit()
+        listing_cache.invalidate(*listing_values)
 
     def add_images_to_ad(self, ad_id: int, image_urls: List[str]) -> Ad:
         """Add multiple images to an existing ad"""
         ad = self.get_ad_or_404(ad_id)
 
-        if ad.image_urls is None:
-            ad.image_urls = []
-
-        ad.image_urls.extend(image_urls)
+        # Assign a new list: in-place changes to an ARRAY column are not detected by the ORM
+        ad.image_urls = [*(ad.image_urls or []), *image_urls]
+        StoredFileService(self.db).retain(image_urls)
         self.db.commit()
         self.db.refresh(ad)
+        listing_cache.invalidate_ad(ad)
         return ad
 
     def add_documents_to_ad(self, ad_id: int, document_urls: List[str]) -> Ad:
         """Add multiple documents to an existing ad"""
         ad = self.get_ad_or_404(ad_id)
 
-        if ad.document_urls is None:
-            ad.document_urls = []
-
-        ad.document_urls.extend(document_urls)
+        ad.document_urls = [*(ad.document_urls or []), *document_urls]
+        StoredFileService(self.db).retain(document_urls)
         self.db.commit()
         self.db.refresh(ad)
+        listing_cache.invalidate_ad(ad)
         return ad
 
+    def attach_upload(self, ad_id: int, url: str, kind: UploadKind) -> Tuple[Ad, bool]:
+        """
+        Attach an uploaded file to the ad unless it is attached already,
+        and return the ad and whether the file was attached now
+        """
+        # Lock the ad and reload its URLs, so that repeated completions of one upload attach it once
+        ad = self.db.query(Ad).populate_existing().filter(Ad.id == ad_id).with_for_update(of=Ad).first()
+        if not ad:
+            raise HTTPException(status_code=404, detail="Ad not found")
+        if url in (ad.image_urls or []) or url in (ad.document_urls or []):
+            return self.get_ad_or_404(ad_id), False
+        if kind == UploadKind.image:
+            return self.add_images_to_ad(ad_id, [url]), True
+        return self.add_documents_to_ad(ad_id, [url]), True
+
     def remove_document_from_ad(self, ad_id: int, document_url: str) -> Ad:
         """Remove a specific document from an ad"""
         ad = self.get_ad_or_404(ad_id)
 
         if ad.document_urls and document_url in ad.document_urls:
-            ad.document_urls.remove(document_url)
+            document_urls = list(ad.document_urls)
+            document_urls.remove(document_url)
+            ad.document_urls = document_urls
+            # The file itself is deleted once no other ad or category references it
+            StoredFileService(self.db).release([document_url])
             self.db.commit()
             self.db.refresh(ad)
+            listing_cache.invalidate_ad(ad)
 
         return ad
 
@@ -268,27 +590,125 @@ class AdService:
         ad = self.get_ad_or_404(ad_id)
 
         if ad.image_urls and image_url in ad.image_urls:
-            ad.image_urls.remove(image_url)
+            image_urls = list(ad.image_urls)
+            image_urls.remove(image_url)
+            ad.image_urls = image_urls
+            # The file itself is deleted once no other ad or category references it
+            StoredFileService(self.db).release([image_url])
             self.db.commit()
             self.db.refresh(ad)
+            listing_cache.invalidate_ad(ad)
 
         return ad
 
-    def get_ads_by_location(self, latitude: float, longitude: float, radius_km: float = 5.0) -> List[Ad]:
-        """Get ads within a certain radius from given coordinates"""
-        # Simple distance calculation (for more accurate results, use PostGIS)
-        lat_diff = radius_km / COORDINATE_CONVERSION_FACTOR
-        lng_diff = radius_km / (COORDINATE_CONVERSION_FACTOR * abs(latitude))
-
-        query = self.db.query(Ad).filter(
-            Ad.latitude.between(latitude - lat_diff, latitude + lat_diff),
-            Ad.longitude.between(longitude - lng_diff, longitude + lng_diff)
+    def get_ads_by_location(
+            self,
+            latitude: float,
+            longitude: float,
+            radius_km: float = 5.0,
+            limit: int = DEFAULT_NEARBY_LIMIT,
+            current_user: Optional[AuthenticatedUser] = None
+    ) -> List[Ad]:
+        """
+        Get the ads nearest to the given coordinates within radius_km, closest first.
+        Candidates come from the GiST-indexed earth_box() around the point and are then
+        filtered by their exact great-circle distance (earth_distance). The index also returns them
+        nearest first (<->, straight-line distance, which orders like earth_distance), so the scan
+        stops after limit rows instead of sorting every ad in the radius.
+        """
+        radius_m = radius_km * 1000
+        origin = func.ll_to_earth(latitude, longitude)
+        location = func.ll_to_earth(Ad.latitude, Ad.longitude)
+        distance_m = func.earth_distance(origin, location)
+
+        rows = (
+            self.db.query(Ad, distance_m.label("distance_m"))
+            .options(*AD_OUT_LOADER_OPTIONS)
+            .filter(
+                func.earth_box(origin, radius_m).op('@>')(location),
+                distance_m <= radius_m
+            )
+            .order_by(location.op('<->')(origin))
+            .limit(limit)
+            .all()
         )
 
-        return query.all()
+        ads = []
+        for ad, distance in rows:
+            # transient attribute to be picked by schema field
+            ad.distance_km = round(distance / 1000, 3)
+            ads.append(ad)
+        return self._annotate_favourites(ads, current_user)
+
+    def get_ad_clusters(
+            self,
+            min_latitude: float,
+            min_longitude: float,
+            max_latitude: float,
+            max_longitude: float,
+            zoom: int,
+            deal_type: Optional[DealType] = None,
+            category_id: Optional[int] = None,
+            include_descendants: bool = False,
+    ) -> List[dict]:
+        """
+        Bucket the ads inside a bounding box into a zoom-dependent grid and return,
+        per non-empty cell, the ad count, centroid and min/max price.
+        Boxes spanning more than MAX_CLUSTER_CELLS cells are bucketed at the highest zoom that fits.
+        """
+        if min_latitude > max_latitude or min_longitude > max_longitude:
+            raise HTTPException(status_code=400, detail="Invalid bounding box")
+
+        # Zoom 0 cells are 90° wide, so some zoom always fits
+        for zoom in range(zoom, -1, -1):
+            cell = 360.0 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+            # Snap the box outwards to whole cells so that overlapping viewports share cache entries
+            min_row, max_row = math.floor(min_latitude / cell), math.floor(max_latitude / cell)
+            min_col, max_col = math.floor(min_longitude / cell), math.floor(max_longitude / cell)
+            if (max_row - min_row + 1) * (max_col - min_col + 1) <= MAX_CLUSTER_CELLS:
+                break
+
+        cache_key = (zoom, min_row, max_row, min_col, max_col, deal_type, category_id, include_descendants)
+        clusters = cluster_cache.get(cache_key)
+        if clusters is not None:
+            return clusters
+
+        query = self.db.query(
+            func.count(Ad.id).label("count"),
+            func.avg(Ad.latitude).label("latitude"),
+            func.avg(Ad.longitude).label("longitude"),
+            func.min(Ad.price).label("min_price"),
+            func.max(Ad.price).label("max_price"),
+        ).filter(
+            Ad.latitude >= min_row * cell,
+            Ad.latitude < (max_row + 1) * cell,
+            Ad.longitude >= min_col * cell,
+            Ad.longitude < (max_col + 1) * cell,
+        )
+        if deal_type is not None:
+            query = query.filter(Ad.deal_type == deal_type)
+        query = self._apply_category_filter(query, category_id, include_descendants)
+
+        rows = query.group_by(
+            func.floor(Ad.latitude / cell),
+            func.floor(Ad.longitude / cell)
+        ).all()
+
+        clusters = [
+            {
+                "latitude": float(row.latitude),
+                "longitude": float(row.longitude),
+                "count": row.count,
+                "min_price": row.min_price,
+                "max_price": row.max_price,
+            }
+            for row in rows
+        ]
+        cluster_cache.set(cache_key, clusters)
+        return clusters
 
-    def _validate_file(self, file: UploadFile) -> None:
-        """Validate uploaded file"""
+    def _validate_file(self, file: UploadFile) -> str:
+        """Validate uploaded file and return its content type, sniffed from the leading bytes"""
         if not file.filename:
             raise HTTPException(status_code=400, detail="File must have a filename")
         
@@ -299,29 +719,166 @@ class AdService:
                 detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
             )
 
+        if file.size is not None and file.size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
+            )
+
+        content_type = sniff_content_type(file.file.read(SNIFF_SIZE))
+        file.file.seek(0)
+        if content_type is None:
+            raise HTTPException(status_code=400, detail="File content does not match an allowed type")
+        return content_type
+
     async def upload_file(self, file: UploadFile) -> dict:
         """Upload file to S3 and return the URL"""
-        self._validate_file(file)
-        
-        s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION_NAME
+        content_type = self._validate_file(file)
+
+        # Shared pooled client; the transfer runs on the S3 executor, off the event loop
+        # Content-addressed: a repeated file is not sent again and keeps its existing renditions
+        url, uploaded = await s3_service.store_file(
+            file, folder=None, content_type=content_type, claim=claim_stored_file
         )
+        if uploaded:
+            image_pipeline.submit(s3_service.key_from_url(url))
+        return {'url': url}
+
+class AsyncAdService:
+    """
+    AdService for handlers running on the event loop.
 
-        file_extension = file.filename.split(".")[-1]
-        s3_file_name = f"{uuid.uuid4()}.{file_extension}"
+    The queries are shared with AdService and executed through AsyncSession.run_sync(), which drives
+    the sync ORM code over asyncpg without blocking the loop. Returned ads are fully loaded with
+    AD_OUT_LOADER_OPTIONS, so serializing them afterwards does no IO.
+    """
 
-        try:
-            s3_client.upload_fileobj(
-                file.file,
-                settings.AWS_S3_BUCKET_NAME,
-                s3_file_name,
-                ExtraArgs={'ACL': 'public-read'}
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _run(self, method: str, *args, **kwargs):
+        return await self.db.run_sync(
+            lambda session: getattr(AdService(session), method)(*args, **kwargs)
+        )
+
+    async def get_all_ads(self, **filters) -> dict:
+        return await self._run("get_all_ads", **filters)
+
+    async def get_anonymous_ads_page(self, **filters) -> bytes:
+        """JSON page of get_all_ads() for anonymous users, from the listing cache when possible"""
+        cache_key = listing_cache.make_key(filters)
+        body = listing_cache.get(cache_key)
+        if body is None:
+            body = await self._run("render_anonymous_ads_page", cache_key, **filters)
+        return body
+
+    async def get_ads_by_user(self, user_id, current_user: Optional[AuthenticatedUser] = None, **page) -> dict:
+        return await self._run("get_ads_by_user", user_id, current_user, **page)
+
+    async def get_ad_facets(self, **filters) -> dict:
+        return await self._run("get_ad_facets", **filters)
+
+    async def get_ad_or_404(self, ad_id: int, current_user: Optional[AuthenticatedUser] = None, increment_views: bool = False) -> Ad:
+        return await self._run("get_ad_or_404", ad_id, current_user, increment_views)
+
+    async def get_ads_by_location(self, *args, **kwargs) -> List[Ad]:
+        return await self._run("get_ads_by_location", *args, **kwargs)
+
+    async def get_ad_clusters(self, *args, **kwargs) -> List[dict]:
+        return await self._run("get_ad_clusters", *args, **kwargs)
+
+    async def create_ad(self, ad_data: AdCreate, user_id) -> Ad:
+        return await self._run("create_ad", ad_data, user_id)
+
+    async def update_ad(self, ad_id: int, ad_data: AdUpdate) -> Ad:
+        return await self._run("update_ad", ad_id, ad_data)
+
+    async def update_ad_category(self, ad_id: int, category_id: int) -> Ad:
+        return await self._run("update_ad_category", ad_id, category_id)
+
+    async def delete_ad(self, ad_id: int) -> None:
+        return await self._run("delete_ad", ad_id)
+
+    async def add_images_to_ad(self, ad_id: int, image_urls: List[str]) -> Ad:
+        return await self._run("add_images_to_ad", ad_id, image_urls)
+
+    async def add_documents_to_ad(self, ad_id: int, document_urls: List[str]) -> Ad:
+        return await self._run("add_documents_to_ad", ad_id, document_urls)
+
+    async def create_presigned_upload(self, ad_id: int, upload: PresignedUploadRequest) -> dict:
+        """
+        Issue a presigned POST for uploading an image or document of an ad straight to S3.
+        The policy pins the key and content type and caps the size at MAX_FILE_SIZE.
+        The key is claimed up front, so objects of uploads that are never completed are swept.
+        """
+        if upload.content_type not in UPLOAD_CONTENT_TYPES[upload.kind]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Content type not allowed. Allowed types: {', '.join(sorted(UPLOAD_CONTENT_TYPES[upload.kind]))}"
             )
-            return {
-                'url': f"https://{settings.AWS_S3_BUCKET_NAME}.s3.amazonaws.com/{s3_file_name}"
-            }
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
\ No newline at end of file
+        file_extension = os.path.splitext(upload.filename)[1].lower()
+        if file_extension not in ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+            )
+
+        key = f"{presigned_upload_prefix(ad_id)}{uuid.uuid4()}{file_extension}"
+        await claim_stored_file(s3_service.public_url(key))
+        expires_in = settings.S3_PRESIGNED_UPLOAD_EXPIRES_SECONDS
+        presigned = s3_service.create_presigned_post(key, upload.content_type, MAX_FILE_SIZE, expires_in)
+        return {
+            "url": presigned["url"],
+            "fields": presigned["fields"],
+            "key": key,
+            "max_size": MAX_FILE_SIZE,
+            "expires_in": expires_in,
+        }
+
+    async def upload_stream(
+            self, chunks: AsyncIterator[bytes], kind: UploadKind, content_length: Optional[int] = None
+    ) -> dict:
+        """
+        Upload a file sent as the raw request body straight to S3 and return the URL.
+        Oversized bodies are refused from Content-Length before they are read, or as soon as they
+        exceed MAX_FILE_SIZE when the length is not declared.
+        """
+        if content_length is not None and content_length > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
+            )
+
+        url, uploaded = await s3_service.store_stream(
+            chunks, UPLOAD_CONTENT_TYPES[kind], MAX_FILE_SIZE, claim=claim_stored_file
+        )
+        if uploaded and kind == UploadKind.image:
+            image_pipeline.submit(s3_service.key_from_url(url))
+        return {'url': url}
+
+    async def complete_presigned_upload(self, ad_id: int, upload: UploadCompleteRequest) -> Ad:
+        """
+        Attach a file uploaded through create_presigned_upload to the ad, after checking that the
+        object exists, fits the limits and starts with the magic bytes of its declared type.
+        Completing an upload again returns the ad unchanged.
+        """
+        if not upload.key.startswith(presigned_upload_prefix(ad_id)):
+            raise HTTPException(status_code=400, detail="Upload does not belong to this ad")
+
+        url = s3_service.public_url(upload.key)
+        # Restart the grace period before checking the object, as uploads do (see claim_stored_file)
+        await claim_stored_file(url)
+        head = await s3_service.head_object(upload.key)
+        if head is None:
+            raise HTTPException(status_code=400, detail="Uploaded file not found")
+        content_type = head.get("ContentType")
+        if head["ContentLength"] > MAX_FILE_SIZE or content_type not in UPLOAD_CONTENT_TYPES[upload.kind]:
+            raise HTTPException(status_code=400, detail="Uploaded file is too large or of a disallowed type")
+        # The POST policy pins the declared type only; the content itself is checked here
+        if sniff_content_type(await s3_service.download_prefix(upload.key, SNIFF_SIZE)) != content_type:
+            raise HTTPException(status_code=400, detail="Uploaded file content does not match its type")
+
+        ad, attached = await self._run("attach_upload", ad_id, url, upload.kind)
+        if attached and upload.kind == UploadKind.image:
+            image_pipeline.submit(upload.key)
+        return ad
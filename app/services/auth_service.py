@@ -1,13 +1,14 @@
 from typing import Optional
 from datetime import datetime
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import (
     create_access_token,
     create_refresh_token,
     decode_access_token,
-    verify_password
+    verify_password_async
 )
 from app.models.user import User, UserRole
 from app.schemas.auth import LoginAdminRequest, Token
@@ -16,19 +17,21 @@ from app.services.user_service import UserService
 
 class AuthService:
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def authenticate_admin(self, username: str, password: str) -> Optional[User]:
+    async def authenticate_admin(self, username: str, password: str) -> Optional[User]:
         """Authenticate admin user with username and password"""
-        user = self.db.query(User).filter(User.username == username, User.role == UserRole.ADMIN).first()
-        if not user or not verify_password(password, user.password):
+        user = await self.db.scalar(
+            select(User).where(User.username == username, User.role == UserRole.ADMIN)
+        )
+        if not user or not await verify_password_async(password, user.password):
             return None
         return user
 
-    def login_admin(self, request: LoginAdminRequest) -> Token:
+    async def login_admin(self, request: LoginAdminRequest) -> Token:
         """Login admin user and return access token"""
-        user = self.authenticate_admin(request.username, request.password)
+        user = await self.authenticate_admin(request.username, request.password)
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid credentials')
 
@@ -43,7 +46,7 @@ class AuthService:
             refresh_token=refresh_token
         )
     
-    def refresh_token(self, refresh_token: str) -> Token:
+    async def refresh_token(self, refresh_token: str) -> Token:
         """Refresh access token using refresh token"""
         payload = decode_access_token(refresh_token)
 
@@ -51,7 +54,7 @@ class AuthService:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
         
         user_service = UserService(self.db)
-        user = user_service.get_user_by_id(payload['sub'])
+        user = await user_service.get_user_by_id(payload['sub'])
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
         
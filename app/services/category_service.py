@@ -1,15 +1,64 @@
+from typing import Optional
+
 from fastapi import HTTPException, status, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, literal, select, true
+from sqlalchemy.orm import Session, aliased
 
-from app.models.category import Category, CategoryName
-from app.models.user import User, UserRole
+from app.models.category import Category, CategoryClosure, CategoryName
+from app.models.user import UserRole
 from app.schemas.category import CategoryCreate, CategoryUpdate
+from app.services.category_tree import category_tree_cache
+from app.services.listing_cache import listing_cache
+from app.services.stored_file_service import StoredFileService, claim_stored_file
+from app.services.user_cache import AuthenticatedUser
 from app.utils.s3_upload import s3_service
 
+# Transaction-level advisory lock key serializing changes to the category tree
+CATEGORY_TREE_LOCK_KEY = 7_301_002_201
+
 
 class CategoryService:
     @staticmethod
-    def verify_admin(current_user: User):
+    def _lock_tree(db: Session):
+        """
+        Hold the tree lock until the transaction ends. Closure rows are derived from the current
+        paths, so a concurrent move must not change them in between (or create a cycle).
+        """
+        db.execute(select(func.pg_advisory_xact_lock(CATEGORY_TREE_LOCK_KEY)))
+
+    @staticmethod
+    def _add_closure(db: Session, category_id: int, parent_id: Optional[int]):
+        """Insert the closure rows of a new leaf category: itself, and every ancestor of its parent"""
+        rows = select(literal(category_id), literal(category_id), literal(0))
+        if parent_id:
+            rows = rows.union_all(
+                select(CategoryClosure.ancestor_id, literal(category_id), CategoryClosure.depth + 1)
+                .where(CategoryClosure.descendant_id == parent_id)
+            )
+        db.execute(insert(CategoryClosure).from_select(["ancestor_id", "descendant_id", "depth"], rows))
+
+    @staticmethod
+    def _move_closure(db: Session, category_id: int, parent_id: int):
+        """Re-link the subtree of a category below its new parent"""
+        subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+        # Drop the paths from the old ancestors into the subtree; paths inside the subtree stay
+        db.execute(
+            delete(CategoryClosure)
+            .where(CategoryClosure.descendant_id.in_(subtree), CategoryClosure.ancestor_id.not_in(subtree))
+            .execution_options(synchronize_session=False)
+        )
+        above, below = aliased(CategoryClosure), aliased(CategoryClosure)
+        db.execute(insert(CategoryClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            # Every new ancestor with every subtree member
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .select_from(above)
+            .join(below, true())
+            .where(above.descendant_id == parent_id, below.ancestor_id == category_id)
+        ))
+
+    @staticmethod
+    def verify_admin(current_user: AuthenticatedUser):
         if current_user.role != UserRole.ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -18,7 +67,7 @@ class CategoryService:
         return current_user
 
     @staticmethod
-    async def upload_category_icon(category_id: int, icon_file: UploadFile, current_user: User, db: Session):
+    async def upload_category_icon(category_id: int, icon_file: UploadFile, current_user: AuthenticatedUser, db: Session):
         """
         Upload icon for a specific category
         """
@@ -44,17 +93,16 @@ class CategoryService:
             )
         
         try:
-            # Delete old icon if exists
-            if category.icon:
-                await s3_service.delete_file(category.icon)
-            
             # Upload new icon
-            icon_url = await s3_service.upload_file(icon_file, folder="category_icons")
+            icon_url = await s3_service.upload_file(icon_file, folder="category_icons", claim=claim_stored_file)
             
-            # Update category with new icon URL
+            # Update category with new icon URL; the old icon is deleted once nothing references it
+            StoredFileService(db).replace([category.icon], [icon_url])
             category.icon = icon_url
             db.commit()
             db.refresh(category)
+            category_tree_cache.bump(db)
+            listing_cache.clear()
             
             return category
             
@@ -65,7 +113,7 @@ class CategoryService:
             )
 
     @staticmethod
-    async def delete_category_icon(category_id: int, current_user: User, db: Session):
+    async def delete_category_icon(category_id: int, current_user: AuthenticatedUser, db: Session):
         """
         Delete icon for a specific category
         """
@@ -80,13 +128,15 @@ class CategoryService:
             raise HTTPException(status_code=400, detail="Category has no icon to delete")
         
         try:
-            # Delete from S3
-            await s3_service.delete_file(category.icon)
+            # Release the file; it is deleted from S3 once nothing references it
+            StoredFileService(db).release([category.icon])
             
             # Remove icon URL from category
             category.icon = None
             db.commit()
             db.refresh(category)
+            category_tree_cache.bump(db)
+            listing_cache.clear()
             
             return {"message": "Icon deleted successfully"}
             
@@ -97,8 +147,9 @@ class CategoryService:
             )
 
     @staticmethod
-    def create_category(category_data: CategoryCreate, current_user: User, db: Session):
+    def create_category(category_data: CategoryCreate, current_user: AuthenticatedUser, db: Session):
         CategoryService.verify_admin(current_user)
+        CategoryService._lock_tree(db)
 
         if category_data.parent_id:
             parent = db.query(Category).filter(Category.id == category_data.parent_id).first()
@@ -110,7 +161,10 @@ class CategoryService:
             icon=category_data.icon
         )
         db.add(new_category)
-        db.commit()
+        StoredFileService(db).retain([new_category.icon])
+        # Flush for the id; the category, its closure rows and names are committed together
+        db.flush()
+        CategoryService._add_closure(db, new_category.id, new_category.parent_id)
 
         for lang, name in category_data.names.items():
             category_name = CategoryName(
@@ -122,26 +176,33 @@ class CategoryService:
 
         db.commit()
         db.refresh(new_category)
+        category_tree_cache.bump(db)
         return new_category
 
+    @staticmethod
+    def get_tree_version(db: Session) -> int:
+        """Version stamp of the cached category tree; changes whenever any category does"""
+        return category_tree_cache.get(db).version
+
     @staticmethod
     def get_all_categories(db: Session):
-        return db.query(Category).all()
+        return list(category_tree_cache.get(db).categories.values())
 
     @staticmethod
     def get_root_categories(db: Session):
-        return db.query(Category).filter(Category.parent_id == None).all()
+        return category_tree_cache.get(db).roots
 
     @staticmethod
     def get_category_by_id(category_id: int, db: Session):
-        category = db.query(Category).filter(Category.id == category_id).first()
+        """Cached category with its names and subcategories, for reading only"""
+        category = category_tree_cache.get(db).categories.get(category_id)
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
 
         return category
 
     @staticmethod
-    def update_category(category_id: int, category_data: CategoryUpdate, current_user: User, db: Session):
+    def update_category(category_id: int, category_data: CategoryUpdate, current_user: AuthenticatedUser, db: Session):
         CategoryService.verify_admin(current_user)
 
         category = db.query(Category).filter(Category.id == category_id).first()
@@ -156,16 +217,36 @@ class CategoryService:
             if parent.id == category_id:
                 raise HTTPException(status_code=400, detail="A category cannot be its own parent")
 
-        for key, value in category_data.model_dump().items():
+            if category_data.parent_id != category.parent_id:
+                CategoryService._lock_tree(db)
+                is_descendant = db.query(CategoryClosure).filter(
+                    CategoryClosure.ancestor_id == category_id,
+                    CategoryClosure.descendant_id == category_data.parent_id
+                ).first()
+                if is_descendant:
+                    raise HTTPException(status_code=400, detail="A category cannot be moved below its own subcategory")
+                CategoryService._move_closure(db, category_id, category_data.parent_id)
+
+        if category_data.icon is not None:
+            StoredFileService(db).replace([category.icon], [category_data.icon])
+
+        # names holds {lang: name} on input; its serializer only handles CategoryName rows
+        if category_data.names is not None:
+            category.names = [CategoryName(lang=lang, name=name) for lang, name in category_data.names.items()]
+
+        for key, value in category_data.model_dump(exclude={"names"}).items():
             if value is not None:
                 setattr(category, key, value)
 
         db.commit()
         db.refresh(category)
+        category_tree_cache.bump(db)
+        # Listing pages embed category names, and subtree filters depend on the parent links
+        listing_cache.clear()
         return category
 
     @staticmethod
-    def delete_category(category_id: int, current_user: User, db: Session):
+    def delete_category(category_id: int, current_user: AuthenticatedUser, db: Session):
         # Verify admin privileges
         CategoryService.verify_admin(current_user)
 
@@ -179,5 +260,7 @@ class CategoryService:
         if category.ads:
             raise HTTPException(status_code=400, detail="Cannot delete category with associated ads")
 
+        StoredFileService(db).release([category.icon])
         db.delete(category)
-        db.commit()
\ No newline at end of file
+        db.commit()
+        category_tree_cache.bump(db)
\ No newline at end of file
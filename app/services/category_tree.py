@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.category import Category, CategoryName, category_tree_version
+
+
+@dataclass(frozen=True)
+class CachedCategoryName:
+    lang: str
+    name: str
+
+
+@dataclass(frozen=True)
+class CachedCategory:
+    """Immutable category node; attribute names match Category so the category schemas accept it"""
+    id: int
+    parent_id: Optional[int]
+    icon: Optional[str]
+    names: Tuple[CachedCategoryName, ...]
+    subcategories: Tuple["CachedCategory", ...]
+
+
+@dataclass(frozen=True)
+class CategoryTree:
+    version: int
+    categories: Mapping[int, CachedCategory]
+    roots: Tuple[CachedCategory, ...]
+    # Category id -> ids of the category and all of its subcategories
+    descendants: Mapping[int, FrozenSet[int]]
+
+    def subtree_ids(self, category_id: int) -> FrozenSet[int]:
+        return self.descendants.get(category_id, frozenset((category_id,)))
+
+
+class CategoryTreeCache:
+    """
+    The whole category tree, names included, held in memory by every worker.
+
+    CategoryService bumps the category_tree_version sequence after each committed change.
+    Readers compare the sequence with the version of their tree at most every check_interval
+    seconds and reload the tree when it has moved, so other workers pick up changes within that time.
+    """
+
+    # A sequence reports last_value=1 both before and after its first nextval(); is_called tells them apart
+    VERSION_QUERY = text("SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM category_tree_version")
+
+    def __init__(self, check_interval: float = settings.CATEGORY_TREE_CHECK_INTERVAL_SECONDS):
+        self.check_interval = check_interval
+        self.loads = 0
+        self._tree: Optional[CategoryTree] = None
+        # Oldest version this worker may serve: set by its own bumps, so it never serves a tree it changed
+        self._min_version = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> CategoryTree:
+        tree = self._tree
+        if tree is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return tree
+
+        # No lock is held across the queries: under AsyncSession.run_sync they yield to the event loop,
+        # and another request blocking the loop thread on the lock would deadlock the worker.
+        # Concurrent readers may load the same version twice; the newest tree wins.
+        # Read the version before the rows: a change committed in between only causes another reload.
+        version = db.execute(self.VERSION_QUERY).scalar_one()
+        if tree is None or tree.version != version:
+            loaded = self._load(db, version)
+            with self._lock:
+                self.loads += 1
+                if loaded.version >= self._min_version and (self._tree is None or self._tree.version <= loaded.version):
+                    self._tree = loaded
+            tree = loaded
+        self._checked_at = time.monotonic()
+        return tree
+
+    def bump(self, db: Session) -> None:
+        """Mark the tree as changed; call after committing a change to categories"""
+        version = db.execute(select(category_tree_version.next_value())).scalar_one()
+        with self._lock:
+            self._min_version = max(self._min_version, version)
+            self._tree = None
+
+    def clear(self) -> None:
+        """Drop the local copy; the next get() reloads it"""
+        with self._lock:
+            self._tree = None
+
+    @staticmethod
+    def _load(db: Session, version: int) -> CategoryTree:
+        names: Dict[int, List[CachedCategoryName]] = defaultdict(list)
+        for category_id, lang, name in db.execute(
+            select(CategoryName.category_id, CategoryName.lang, CategoryName.name).order_by(CategoryName.id)
+        ):
+            names[category_id].append(CachedCategoryName(lang=lang, name=name))
+
+        rows = db.execute(select(Category.id, Category.parent_id, Category.icon).order_by(Category.id)).all()
+        children: Dict[Optional[int], List[int]] = defaultdict(list)
+        for row in rows:
+            children[row.parent_id].append(row.id)
+
+        # Build bottom-up so that each node is created with its final, immutable children
+        categories: Dict[int, CachedCategory] = {}
+        descendants: Dict[int, FrozenSet[int]] = {}
+        rows_by_id = {row.id: row for row in rows}
+
+        def build(category_id: int) -> CachedCategory:
+            row = rows_by_id[category_id]
+            node = CachedCategory(
+                id=row.id,
+                parent_id=row.parent_id,
+                icon=row.icon,
+                names=tuple(names[row.id]),
+                subcategories=tuple(build(child_id) for child_id in children[row.id])
+            )
+            categories[row.id] = node
+            descendants[row.id] = frozenset((row.id,)).union(
+                *(descendants[child.id] for child in node.subcategories)
+            )
+            return node
+
+        roots = tuple(build(category_id) for category_id in children[None])
+        # Categories caught in a parent cycle are unreachable from the roots; keep them addressable by id
+        for row in rows:
+            if row.id not in categories:
+                categories[row.id] = CachedCategory(
+                    id=row.id, parent_id=row.parent_id, icon=row.icon, names=tuple(names[row.id]), subcategories=()
+                )
+        return CategoryTree(version=version, categories=categories, roots=roots, descendants=descendants)
+
+    def stats(self) -> dict:
+        tree = self._tree
+        return {
+            "version": tree.version if tree is not None else None,
+            "categories": len(tree.categories) if tree is not None else 0,
+            "loads": self.loads,
+        }
+
+
+# Global instance
+category_tree_cache = CategoryTreeCache()
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import suppress
+from typing import Set
+
+from app.core.config import settings
+from app.services.stored_file_service import record_image_variants
+from app.utils.images import IMAGE_VARIANTS, VARIANT_CONTENT_TYPE, has_variants, render_variants, variant_key
+from app.utils.s3_upload import s3_service
+
+logger = logging.getLogger(__name__)
+
+
+class ImageDerivativePipeline:
+    """
+    Background generation of the IMAGE_VARIANTS renditions of uploaded images.
+
+    submit() returns immediately; the original is downloaded from S3, resized in a process pool
+    so that the CPU work never runs on request workers or under the GIL, and each rendition is
+    uploaded next to the original, then recorded on the stored file row. At most max_pending
+    images are held in memory at once. Ads only list the renditions recorded for their images.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self._pool = self._create_pool()
+        self._slots = asyncio.Semaphore(max_pending)
+        self._tasks: Set[asyncio.Task] = set()
+        self.processed = 0
+        self.failed = 0
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs the event loop and boto3 threads is not safe
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, key: str) -> None:
+        """Schedule the renditions of an uploaded object; non-image keys are ignored"""
+        if not has_variants(key):
+            return
+        task = asyncio.create_task(self._process(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, key: str) -> None:
+        async with self._slots:
+            pool = self._pool
+            try:
+                data = await s3_service.download_bytes(key)
+                variants = await asyncio.get_running_loop().run_in_executor(pool, render_variants, data)
+                await asyncio.gather(*(
+                    s3_service.upload_bytes(variant_key(key, variant), variants[variant], VARIANT_CONTENT_TYPE)
+                    for variant in IMAGE_VARIANTS
+                ))
+                await record_image_variants(s3_service.public_url(key), list(IMAGE_VARIANTS))
+                self.processed += 1
+            except BrokenProcessPool:
+                # A worker died (e.g. killed on a decompression bomb); later images get a fresh pool
+                self.failed += 1
+                logger.exception(f"Image worker crashed while processing {key}")
+                if self._pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._create_pool()
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Failed to generate image variants of {key}")
+
+    def stats(self) -> dict:
+        return {"pending": len(self._tasks), "processed": self.processed, "failed": self.failed}
+
+    async def stop(self) -> None:
+        """Cancel the images still waiting and shut the worker processes down"""
+        for task in list(self._tasks):
+            task.cancel()
+        for task in list(self._tasks):
+            with suppress(asyncio.CancelledError):
+                await task
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+image_pipeline = ImageDerivativePipeline(
+    max_workers=settings.IMAGE_PIPELINE_WORKERS,
+    max_pending=settings.IMAGE_PIPELINE_MAX_PENDING
+)
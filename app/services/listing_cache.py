@@ -0,0 +1,182 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import FrozenSet, Hashable, Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class ListingTags:
+    """
+    What a cached listing page depends on: the category ids, city and deal type it was filtered by.
+    None means the page was not filtered on that dimension, so any ad can appear in it.
+    """
+    category_ids: Optional[FrozenSet[int]] = None
+    city: Optional[str] = None
+    fuzzy_city: bool = False
+    deal_type: Optional[str] = None
+
+    def matches(self, category_id: Optional[int], city: Optional[str], deal_type: Optional[str]) -> bool:
+        """Whether an ad with these values can appear in the page"""
+        if self.category_ids is not None and category_id not in self.category_ids:
+            return False
+        if self.deal_type is not None and deal_type != self.deal_type:
+            return False
+        if self.city is not None and not self.fuzzy_city:
+            # The listing matches cities by substring; similarity matches are not predictable here
+            return self.city in (city or "").lower()
+        return True
+
+
+class ListingCacheBackend(ABC):
+    """
+    Storage for rendered listing pages.
+
+    The default backend keeps pages in process memory, so a change invalidates only this worker's
+    copies and other workers catch up when their entries expire. Multi-worker deployments can plug in
+    a shared store (e.g. Redis keys plus a set of keys per tag) by implementing these methods;
+    generation() must change on every invalidation so that pages rendered before it are not stored.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return a stored page, or None if it is missing or expired"""
+
+    @abstractmethod
+    def set(self, key: Hashable, body: bytes, tags: ListingTags, ttl: float, generation: int) -> None:
+        """Store a page unless an invalidation happened since generation was read"""
+
+    @abstractmethod
+    def invalidate(self, category_id: Optional[int], city: Optional[str], deal_type: Optional[str]) -> int:
+        """Drop the pages an ad with these values can appear in and return how many were dropped"""
+
+    @abstractmethod
+    def generation(self) -> int:
+        """Counter moved by every invalidation"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every page"""
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryListingCacheBackend(ListingCacheBackend):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, body, _ = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return body
+
+    def set(self, key: Hashable, body: bytes, tags: ListingTags, ttl: float, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + ttl, body, tags)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, category_id: Optional[int], city: Optional[str], deal_type: Optional[str]) -> int:
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, (_, _, tags) in self._data.items() if tags.matches(category_id, city, deal_type)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data)}
+
+
+class ListingCache:
+    """
+    Rendered pages of the anonymous ad listing, keyed on the normalized query parameters.
+
+    Pages carry ListingTags; AdService invalidates the ones an ad can appear in, before and after
+    each change, so that unrelated filter combinations stay cached. Authenticated users are never
+    served from here because their pages include is_favourited.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[ListingCacheBackend] = None,
+        ttl: float = settings.AD_LISTING_CACHE_TTL_SECONDS,
+    ):
+        self.backend = backend or InMemoryListingCacheBackend(settings.AD_LISTING_CACHE_SIZE)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def make_key(filters: dict) -> tuple:
+        """Cache key of a listing query; text filters are matched case-insensitively, so normalize them"""
+        normalized = {}
+        for name, value in filters.items():
+            if name in ("search_query", "city", "street") and value:
+                value = value.strip().lower()
+            elif isinstance(value, Enum):
+                value = value.value
+            normalized[name] = value
+        return tuple(sorted(normalized.items()))
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self.backend.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def generation(self) -> int:
+        return self.backend.generation()
+
+    def set(self, key: Hashable, body: bytes, tags: ListingTags, generation: int) -> None:
+        self.backend.set(key, body, tags, self.ttl, generation)
+
+    def invalidate(self, category_id: Optional[int], city: Optional[str], deal_type) -> None:
+        if isinstance(deal_type, Enum):
+            deal_type = deal_type.value
+        self.invalidated += self.backend.invalidate(category_id, city, deal_type)
+
+    def invalidate_ad(self, ad) -> None:
+        """Drop the pages an ad can appear in, e.g. after it was created, changed or deleted"""
+        self.invalidate(ad.category_id, ad.city, ad.deal_type)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), "hits": self.hits, "misses": self.misses, "invalidated": self.invalidated}
+
+
+# Global instance
+listing_cache = ListingCache()
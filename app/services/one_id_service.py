@@ -3,10 +3,13 @@ import logging
 from typing import Optional, Dict, Any, List
 from urllib.parse import urlencode, quote
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.core.config import settings
 from app.models.user import User, OneIDInfo
+from app.services.user_cache import AuthenticatedUser, invalidate_authenticated_user
 from app.schemas.one_id import (
     OneIDUserInfo,
     OneIDLegalInfo,
@@ -19,7 +22,7 @@ logger = logging.getLogger(__name__)
 class OneIDService:
     """Service for handling One ID (Yagona identifikatsiya tizimi) integration"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.base_url = "https://sso.egov.uz/sso/oauth"
         self.client_id = settings.ONE_ID_CLIENT_ID
@@ -149,7 +152,7 @@ class OneIDService:
                 logger.error(f"Error during logout: {e}")
                 return False
 
-    def update_current_user_with_one_id(self, current_user: User, one_id_user: OneIDUserInfo) -> User:
+    async def update_current_user_with_one_id(self, current_user: AuthenticatedUser, one_id_user: OneIDUserInfo) -> User:
         """
         Update current user with One ID information
         
@@ -161,13 +164,17 @@ class OneIDService:
             Updated user object from database
         """
         # Check if One ID info already exists for this user
-        one_id_info = self.db.query(OneIDInfo).filter(OneIDInfo.user_id == current_user.id).first()
+        one_id_info = await self.db.scalar(select(OneIDInfo).where(OneIDInfo.user_id == current_user.id))
         
         # Check if this One ID user_id is already used by another user
-        existing_one_id = self.db.query(OneIDInfo).filter(
-            OneIDInfo.one_id_user_id == one_id_user.user_id,
-            OneIDInfo.user_id != current_user.id
-        ).first()
+        existing_one_id = await self.db.scalar(
+            select(OneIDInfo)
+            .options(selectinload(OneIDInfo.user))
+            .where(
+                OneIDInfo.one_id_user_id == one_id_user.user_id,
+                OneIDInfo.user_id != current_user.id
+            )
+        )
         
         if existing_one_id:
             # This One ID is already linked to another user, update that user's info
@@ -225,19 +232,26 @@ class OneIDService:
             )
             self.db.add(one_id_info)
         
+        user = await self.db.get(User, current_user.id)
+
         # Update user name if not set
-        if not current_user.name:
-            current_user.name = one_id_user.full_name
+        if not user.name:
+            user.name = one_id_user.full_name
         
         # Mark user as verified since they have One ID info
-        current_user.is_verified = True
+        user.is_verified = True
         
-        self.db.commit()
-        self.db.refresh(current_user)
-        self.db.refresh(one_id_info)
-        return current_user
+        await self.db.commit()
+        invalidate_authenticated_user(user.id)
+        # Reload the user with its One ID info, which the response serializes
+        return await self.db.scalar(
+            select(User)
+            .options(selectinload(User.one_id_info))
+            .where(User.id == user.id)
+            .execution_options(populate_existing=True)
+        )
 
-    def get_user_by_one_id(self, one_id_user_id: str) -> Optional[User]:
+    async def get_user_by_one_id(self, one_id_user_id: str) -> Optional[User]:
         """
         Get user by One ID user ID
         
@@ -247,10 +261,12 @@ class OneIDService:
         Returns:
             User object if found, None otherwise
         """
-        one_id_info = self.db.query(OneIDInfo).filter(OneIDInfo.one_id_user_id == one_id_user_id).first()
+        one_id_info = await self.db.scalar(
+            select(OneIDInfo).options(selectinload(OneIDInfo.user)).where(OneIDInfo.one_id_user_id == one_id_user_id)
+        )
         return one_id_info.user if one_id_info else None
 
-    def get_user_by_pin(self, pin: str) -> Optional[User]:
+    async def get_user_by_pin(self, pin: str) -> Optional[User]:
         """
         Get user by PIN (JShShIR)
         
@@ -260,5 +276,7 @@ class OneIDService:
         Returns:
             User object if found, None otherwise
         """
-        one_id_info = self.db.query(OneIDInfo).filter(OneIDInfo.pin == pin).first()
+        one_id_info = await self.db.scalar(
+            select(OneIDInfo).options(selectinload(OneIDInfo.user)).where(OneIDInfo.pin == pin)
+        )
         return one_id_info.user if one_id_info else None
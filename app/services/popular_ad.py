@@ -1,19 +1,20 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 from sqlalchemy import exists
 from typing import Optional
 
 from app.models.ad import Ad, GoldVerificationRequest, GoldVerificationStatus
-from app.models.user import User
 from app.models.favourite import Favourite
 from app.schemas.popular_ad import PopularAdCreate
+from app.services.ad_service import AD_OUT_LOADER_OPTIONS
+from app.services.user_cache import AuthenticatedUser
 
 
 class PopularAdService:
     def __init__(self, db: Session):
         self.db = db
 
-    def _annotate_favourites(self, ads: list[Ad], current_user: Optional[User]) -> list[Ad]:
+    def _annotate_favourites(self, ads: list[Ad], current_user: Optional[AuthenticatedUser]) -> list[Ad]:
         """Attach transient attributes is_favourited to each ad."""
         if not ads:
             return ads
@@ -34,7 +35,7 @@ class PopularAdService:
 
     def create_popular_ad(self, data: PopularAdCreate, admin_id):
         # Deprecated: popularity is derived from gold verification now
-        ad = self.db.query(Ad).filter(Ad.id == data.ad_id).first()
+        ad = self.db.query(Ad).options(*AD_OUT_LOADER_OPTIONS).filter(Ad.id == data.ad_id).first()
         if not ad:
             raise HTTPException(status_code=404, detail="Ad not found")
         has_approved = self.db.query(
@@ -54,14 +55,11 @@ class PopularAdService:
             raise HTTPException(status_code=404, detail="Ad not found")
         return None
 
-    def get_all_popular_ads(self, current_user: Optional[User] = None):
+    def get_all_popular_ads(self, current_user: Optional[AuthenticatedUser] = None):
         # Popular ads are ads with approved gold verification
         ads = (
             self.db.query(Ad)
-            .options(
-                joinedload(Ad.user),
-                joinedload(Ad.gold_verification_requests)
-            )
+            .options(*AD_OUT_LOADER_OPTIONS)
             .filter(
                 exists().where(
                     (GoldVerificationRequest.ad_id == Ad.id) &
@@ -1,60 +1,121 @@
+import asyncio
+import logging
+
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import column, func, table, text
+from starlette.concurrency import run_in_threadpool
 from typing import List, Dict
-from uuid import UUID
 
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.models.user import User, UserRole
 from app.models.ad import Ad
 from app.models.favourite import Favourite
 
+logger = logging.getLogger(__name__)
+
+# Materialized view created by migration, refreshed by refresh_leaderboard_periodically()
+realtor_leaderboard = table(
+    "realtor_leaderboard",
+    column("user_id"),
+    column("total_ads"),
+    column("total_views"),
+    column("total_favourites"),
+    column("ranking_score"),
+)
+
 
 class RealtorService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_realtor_ranking(self) -> List[Dict]:
+    def get_realtor_ranking(self, limit: int = 20, offset: int = 0) -> List[Dict]:
         """
         Get realtors ranked by their ads' total favourites and views
         Ranking is based on:
         1. Total favourites count (sum of all favourites for realtor's ads)
         2. Total views count (sum of all views for realtor's ads)
+
+        Served from the materialized leaderboard when REALTOR_LEADERBOARD_ENABLED is set,
+        otherwise computed live in a single grouped query.
         """
-        # Get all realtors
-        realtors = self.db.query(User).filter(User.role == UserRole.REALTOR).all()
-        
-        ranking = []
-        
-        for realtor in realtors:
-            # Get all ads by this realtor
-            ads = self.db.query(Ad).filter(Ad.user_id == realtor.id).all()
-            ad_ids = [ad.id for ad in ads] if ads else []
-            
-            # Calculate total favourites count
-            total_favourites = 0
-            if ad_ids:
-                total_favourites = self.db.query(func.count(Favourite.id)).filter(
-                    Favourite.ad_id.in_(ad_ids)
-                ).scalar() or 0
-            
-            # Calculate total views count
-            total_views = 0
-            if ad_ids:
-                total_views = self.db.query(func.sum(Ad.views_count)).filter(
-                    Ad.id.in_(ad_ids)
-                ).scalar() or 0
-            
-            # Calculate ranking score (weighted: favourites * 2 + views)
-            ranking_score = (total_favourites * 2) + total_views
-            
-            ranking.append({
+        if settings.REALTOR_LEADERBOARD_ENABLED:
+            query = (
+                self.db.query(
+                    User,
+                    realtor_leaderboard.c.total_ads,
+                    realtor_leaderboard.c.total_views,
+                    realtor_leaderboard.c.total_favourites,
+                    realtor_leaderboard.c.ranking_score,
+                )
+                .join(realtor_leaderboard, realtor_leaderboard.c.user_id == User.id)
+                .order_by(realtor_leaderboard.c.ranking_score.desc(), User.id)
+            )
+        else:
+            query = self._live_ranking_query()
+
+        rows = query.limit(limit).offset(offset).all()
+        return [
+            {
                 "realtor": realtor,
-                "total_favourites": total_favourites,
-                "total_views": total_views,
-                "total_ads": len(ad_ids),
-                "ranking_score": ranking_score
-            })
-        
-        # Sort by ranking score (descending)
-        ranking.sort(key=lambda x: x["ranking_score"], reverse=True)
-        
-        return ranking
+                "total_favourites": int(total_favourites),
+                "total_views": int(total_views),
+                "total_ads": int(total_ads),
+                "ranking_score": int(ranking_score)
+            }
+            for realtor, total_ads, total_views, total_favourites, ranking_score in rows
+        ]
+
+    def _live_ranking_query(self):
+        """Rank realtors in one statement: realtor LEFT JOIN ads LEFT JOIN per-ad favourite counts"""
+        favourite_counts = (
+            self.db.query(
+                Favourite.ad_id.label("ad_id"),
+                func.count(Favourite.id).label("favourites_count")
+            )
+            .group_by(Favourite.ad_id)
+            .subquery()
+        )
+
+        total_ads = func.count(Ad.id)
+        total_views = func.coalesce(func.sum(Ad.views_count), 0)
+        total_favourites = func.coalesce(func.sum(favourite_counts.c.favourites_count), 0)
+        # Weighted: favourites * 2 + views
+        ranking_score = (total_favourites * 2 + total_views).label("ranking_score")
+
+        return (
+            self.db.query(
+                User,
+                total_ads.label("total_ads"),
+                total_views.label("total_views"),
+                total_favourites.label("total_favourites"),
+                ranking_score,
+            )
+            .outerjoin(Ad, Ad.user_id == User.id)
+            .outerjoin(favourite_counts, favourite_counts.c.ad_id == Ad.id)
+            .filter(User.role == UserRole.REALTOR)
+            .group_by(User.id)
+            .order_by(ranking_score.desc(), User.id)
+        )
+
+    def refresh_leaderboard(self) -> None:
+        """Refresh the materialized leaderboard without blocking readers"""
+        self.db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY realtor_leaderboard"))
+        self.db.commit()
+
+
+async def refresh_leaderboard_periodically(interval: float) -> None:
+    """Background task refreshing the materialized realtor leaderboard every interval seconds"""
+    def refresh():
+        db = SessionLocal()
+        try:
+            RealtorService(db).refresh_leaderboard()
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(refresh)
+        except Exception as e:
+            logger.error(f"Failed to refresh realtor leaderboard: {e}")
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Integer, String, column, delete, select, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.db.session import AsyncSessionLocal
+from app.models.stored_file import StoredFile
+from app.utils.s3_upload import s3_service
+
+logger = logging.getLogger(__name__)
+
+# Files deleted per sweep transaction; their rows stay locked while the objects are deleted
+SWEEP_BATCH_SIZE = 100
+
+
+class StoredFileService:
+    """
+    Reference counting of uploaded files. Changes are executed in the caller's transaction,
+    so they are committed or rolled back together with the records that reference the files.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def retain(self, urls: Iterable[Optional[str]]) -> None:
+        """Count one new reference per URL"""
+        counts = Counter(url for url in urls if url)
+        if not counts:
+            return
+        stmt = insert(StoredFile).values([{"url": url, "ref_count": count} for url, count in counts.items()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StoredFile.url],
+            set_={"ref_count": StoredFile.ref_count + stmt.excluded.ref_count, "updated_at": func.now()}
+        )
+        self.db.execute(stmt)
+
+    def release(self, urls: Iterable[Optional[str]]) -> None:
+        """Drop one reference per URL; files left without references are swept later"""
+        counts = Counter(url for url in urls if url)
+        if not counts:
+            return
+        released = values(
+            column("url", String), column("count", Integer), name="released_files"
+        ).data(list(counts.items()))
+        self.db.execute(
+            update(StoredFile)
+            .values(ref_count=func.greatest(StoredFile.ref_count - released.c.count, 0), updated_at=func.now())
+            .where(StoredFile.url == released.c.url)
+            .execution_options(synchronize_session=False)
+        )
+
+    def replace(self, old_urls: Iterable[Optional[str]], new_urls: Iterable[Optional[str]]) -> None:
+        """Move references from old_urls to new_urls, leaving the URLs present in both untouched"""
+        old = Counter(url for url in old_urls if url)
+        new = Counter(url for url in new_urls if url)
+        self.retain((new - old).elements())
+        self.release((old - new).elements())
+
+    def touch(self, urls: Iterable[Optional[str]]) -> None:
+        """Restart the grace period of files about to be handed out again; unknown files get a row without references"""
+        urls = {url for url in urls if url}
+        if not urls:
+            return
+        stmt = insert(StoredFile).values([{"url": url, "ref_count": 0} for url in urls])
+        self.db.execute(stmt.on_conflict_do_update(index_elements=[StoredFile.url], set_={"updated_at": func.now()}))
+
+    def record_variants(self, url: str, variants: List[str]) -> None:
+        """Record the image renditions stored next to a file"""
+        self.db.execute(
+            update(StoredFile)
+            .values(variants=variants)
+            .where(StoredFile.url == url)
+            .execution_options(synchronize_session=False)
+        )
+
+    def lock_unreferenced(self, grace: timedelta, limit: int) -> List[str]:
+        """
+        Lock up to limit rows without references for longer than grace and return their URLs.
+        Rows locked by a concurrent touch() are skipped; the lock holds until the transaction ends.
+        """
+        return list(self.db.execute(
+            select(StoredFile.url)
+            .where(StoredFile.ref_count == 0, StoredFile.updated_at < func.now() - grace)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all())
+
+    def forget(self, urls: Iterable[str]) -> None:
+        """Delete the rows of files whose objects were deleted"""
+        urls = list(urls)
+        if urls:
+            self.db.execute(
+                delete(StoredFile).where(StoredFile.url.in_(urls)).execution_options(synchronize_session=False)
+            )
+
+
+async def claim_stored_file(url: str) -> None:
+    """
+    Touch a file in its own transaction before an upload checks whether its object exists.
+    The row lock orders the upload against the sweep: either the sweep sees the fresh row and keeps
+    the file, or it has deleted the object before the touch goes through and the upload stores it again.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(lambda session: StoredFileService(session).touch([url]))
+        await db.commit()
+
+
+async def record_image_variants(url: str, variants: List[str]) -> None:
+    """Record in its own transaction that the renditions of an image have been uploaded, so ads list them"""
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(lambda session: StoredFileService(session).record_variants(url, variants))
+        await db.commit()
+
+
+async def sweep_unreferenced_files(grace: timedelta) -> int:
+    """Delete the files without references for longer than grace, objects first, and return how many"""
+    swept = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            urls = await db.run_sync(
+                lambda session: StoredFileService(session).lock_unreferenced(grace, SWEEP_BATCH_SIZE)
+            )
+            # Keep the rows of objects that failed to delete for the next sweep; foreign URLs have no object
+            deleted = [
+                url for url in urls
+                if not url.startswith(s3_service.public_url("")) or await s3_service.delete_file(url)
+            ]
+            await db.run_sync(lambda session: StoredFileService(session).forget(deleted))
+            await db.commit()
+        swept += len(deleted)
+        if len(urls) < SWEEP_BATCH_SIZE or not deleted:
+            return swept
+
+
+async def sweep_unreferenced_files_periodically(interval: float, grace: timedelta) -> None:
+    """
+    Background task deleting the S3 objects of files that have had no references for the grace period.
+    The grace period protects uploads, which may return the URL of a file that has just lost its
+    last reference, until they are attached to a record; uploads restart it with claim_stored_file.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sweep_unreferenced_files(grace)
+        except Exception as e:
+            logger.error(f"Failed to sweep unreferenced files: {e}")
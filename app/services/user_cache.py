@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User, UserRole
+from app.utils.cache import TTLCache
+
+# Authenticated users by id (str), so that authenticated requests skip the per-request User lookup.
+# Entries are dropped when the user changes in this process; other workers see changes after the TTL.
+authenticated_user_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS
+)
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """The user fields authentication and authorization need"""
+    id: UUID
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+
+
+def _cache_key(user_id) -> Optional[str]:
+    """Normalized cache key for a token subject; None if it is not a user id"""
+    try:
+        return str(UUID(str(user_id)))
+    except ValueError:
+        return None
+
+
+def _user_query(key: str):
+    return select(User.id, User.role, User.is_active, User.is_verified).where(User.id == UUID(key))
+
+
+def _remember(key: str, row) -> Optional[AuthenticatedUser]:
+    if row is None:
+        return None
+    user = AuthenticatedUser(**row._mapping)
+    authenticated_user_cache.set(key, user)
+    return user
+
+
+async def get_authenticated_user(db: AsyncSession, user_id: str) -> Optional[AuthenticatedUser]:
+    """Return the cached user for a token subject, loading it on a miss; None if it does not exist"""
+    key = _cache_key(user_id)
+    if key is None:
+        return None
+
+    user = authenticated_user_cache.get(key)
+    if user is not None:
+        return user
+    return _remember(key, (await db.execute(_user_query(key))).first())
+
+
+def get_authenticated_user_sync(db: Session, user_id: str) -> Optional[AuthenticatedUser]:
+    """get_authenticated_user for sync sessions"""
+    key = _cache_key(user_id)
+    if key is None:
+        return None
+
+    user = authenticated_user_cache.get(key)
+    if user is not None:
+        return user
+    return _remember(key, db.execute(_user_query(key)).first())
+
+
+def invalidate_authenticated_user(user_id) -> None:
+    """Drop a user from the cache after it was updated or deleted"""
+    authenticated_user_cache.delete(str(user_id))
@@ -2,26 +2,31 @@ from typing import List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.models.ad import Ad
 from app.models.favourite import Favourite
 from app.models.user import User, UserRole
 from app.schemas.user import UserUpdate
+from app.services.ad_service import AD_OUT_LOADER_OPTIONS
+from app.services.stored_file_service import StoredFileService
+from app.services.user_cache import invalidate_authenticated_user
 
 
 class UserService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_all_users(self) -> List[User]:
         """Get all users"""
-        return self.db.query(User).all()
+        return (await self.db.scalars(select(User))).all()
 
-    def create_admin(self, username: str, password: str) -> User:
+    async def create_admin(self, username: str, password: str) -> User:
         """Create a new admin user"""
-        user = self.get_by_username(username=username)
+        user = await self.get_by_username(username=username)
         if user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,116 +35,131 @@ class UserService:
 
         user = User(
             username=username,
-            password=hash_password(password),
+            password=await hash_password_async(password),
             role=UserRole.ADMIN,
         )
 
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         return user
 
     async def get_by_phone(self, phone_number: str) -> User:
         """Get user by phone number"""
-        user = self.db.query(User).filter(User.phone_number == phone_number).first()
+        user = await self.db.scalar(select(User).where(User.phone_number == phone_number))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
         return user
 
-    def get_by_username(self, username: str) -> Optional[User]:
+    async def get_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
-        return self.db.query(User).filter(User.username == username).first()
+        return await self.db.scalar(select(User).where(User.username == username))
 
     async def get_or_create_by_phone(
         self, phone_number: str, role: UserRole = UserRole.USER
     ) -> Tuple[User, bool]:
         """Get user by phone number or create if not exists"""
-        user = self.db.query(User).filter(User.phone_number == phone_number).first()
+        user = await self.db.scalar(select(User).where(User.phone_number == phone_number))
         created = False
 
         if not user:
             user = User(phone_number=phone_number, role=role)
             self.db.add(user)
-            self.db.commit()
-            self.db.refresh(user)
+            await self.db.commit()
+            await self.db.refresh(user)
             created = True
 
         return user, created
 
-    def get_user_by_id(self, user_id: str) -> User:
-        """Get user by ID (UUID string)"""
+    async def get_user_by_id(self, user_id: str, *options) -> User:
+        """Get user by ID (UUID string); options are extra loader options for the query"""
         try:
             # Convert string to UUID if needed
             if isinstance(user_id, str):
                 user_id = UUID(user_id)
-
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-                )
-            return user
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user ID format"
             )
 
+        user = await self.db.scalar(select(User).options(*options).where(User.id == user_id))
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        return user
+
+    async def get_profile(self, user_id) -> User:
+        """Get user together with the One ID information shown on the profile"""
+        return await self.get_user_by_id(user_id, selectinload(User.one_id_info))
+
     async def update_user(self, user_id: int, user_data: UserUpdate) -> User:
         """Update user information"""
-        user = self.get_user_by_id(user_id)
+        user = await self.get_user_by_id(user_id)
+        update_data = user_data.model_dump(exclude_unset=True)
 
-        for key, value in user_data.model_dump(exclude_unset=True).items():
+        if "avatar" in update_data:
+            old_avatar, new_avatar = user.avatar, update_data["avatar"]
+            await self.db.run_sync(lambda session: StoredFileService(session).replace([old_avatar], [new_avatar]))
+
+        for key, value in update_data.items():
             if key == "password":
-                value = hash_password(value)
+                value = await hash_password_async(value)
             setattr(user, key, value)
 
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        invalidate_authenticated_user(user.id)
+        await self.db.refresh(user)
         return user
 
     async def delete_user(self, user_id: int) -> None:
         """Delete user"""
-        user = self.get_user_by_id(user_id)
-        self.db.delete(user)
-        self.db.commit()
+        user = await self.get_user_by_id(user_id)
+        avatar = user.avatar
+        await self.db.run_sync(lambda session: StoredFileService(session).release([avatar]))
+        await self.db.delete(user)
+        await self.db.commit()
+        invalidate_authenticated_user(user.id)
 
     # Favourites
-    def add_favourite(self, user_id, ad_id) -> Favourite:
-        ad = self.db.query(Ad).filter(Ad.id == ad_id).first()
+    async def add_favourite(self, user_id, ad_id) -> Favourite:
+        ad = await self.db.scalar(select(Ad.id).where(Ad.id == ad_id))
         if not ad:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Ad not found"
             )
-        existing = (
-            self.db.query(Favourite)
-            .filter(Favourite.user_id == user_id, Favourite.ad_id == ad_id)
-            .first()
+        existing = await self.db.scalar(
+            select(Favourite).where(Favourite.user_id == user_id, Favourite.ad_id == ad_id)
         )
         if existing:
             return existing
         fav = Favourite(user_id=user_id, ad_id=ad_id)
         self.db.add(fav)
-        self.db.commit()
-        self.db.refresh(fav)
+        await self.db.commit()
+        await self.db.refresh(fav)
         return fav
 
-    def remove_favourite(self, user_id, ad_id) -> None:
-        fav = (
-            self.db.query(Favourite)
-            .filter(Favourite.user_id == user_id, Favourite.ad_id == ad_id)
-            .first()
+    async def remove_favourite(self, user_id, ad_id) -> None:
+        fav = await self.db.scalar(
+            select(Favourite).where(Favourite.user_id == user_id, Favourite.ad_id == ad_id)
         )
         if not fav:
             return
-        self.db.delete(fav)
-        self.db.commit()
+        await self.db.delete(fav)
+        await self.db.commit()
 
-    def list_favourites(self, user_id) -> List[Ad]:
+    async def list_favourites(self, user_id) -> List[Ad]:
         fav_ad_ids = (
-            self.db.query(Favourite.ad_id)
-            .filter(Favourite.user_id == user_id)
-            .subquery()
+            select(Favourite.ad_id)
+            .where(Favourite.user_id == user_id)
+            .scalar_subquery()
         )
-        return self.db.query(Ad).filter(Ad.id.in_(fav_ad_ids)).all()
+        return (
+            await self.db.scalars(
+                select(Ad)
+                .options(*AD_OUT_LOADER_OPTIONS)
+                .where(Ad.id.in_(fav_ad_ids))
+            )
+        ).all()
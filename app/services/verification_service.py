@@ -1,32 +1,64 @@
 from typing import Optional, List
 from datetime import datetime
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.models.ad import Ad, GoldVerificationRequest, GoldVerificationStatus
-from app.models.user import User
+from app.models.category import Category
 from app.schemas.ad import GoldVerificationRequestCreate, GoldVerificationRequestUpdate
+from app.services.listing_cache import listing_cache
+from app.services.user_cache import AuthenticatedUser
+
+# Loader options needed to serialize a request as GoldVerificationRequestOut without lazy loads
+GOLD_REQUEST_OUT_LOADER_OPTIONS = (
+    joinedload(GoldVerificationRequest.ad, innerjoin=True)
+    .joinedload(Ad.category, innerjoin=True)
+    .selectinload(Category.names),
+    joinedload(GoldVerificationRequest.requester),
+    joinedload(GoldVerificationRequest.processor),
+)
 
 
 class VerificationService:
     """Service for handling ad verification logic"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def request_gold_verification(
+    async def _get_request_out(self, request_id: int) -> GoldVerificationRequest:
+        """
+        (Re)load a request with everything GoldVerificationRequestOut serializes
+        """
+        return await self.db.scalar(
+            select(GoldVerificationRequest)
+            .options(*GOLD_REQUEST_OUT_LOADER_OPTIONS)
+            .where(GoldVerificationRequest.id == request_id)
+            .execution_options(populate_existing=True)
+        )
+
+    async def _list_requests_out(self, *criteria) -> List[GoldVerificationRequest]:
+        return (
+            await self.db.scalars(
+                select(GoldVerificationRequest)
+                .options(*GOLD_REQUEST_OUT_LOADER_OPTIONS)
+                .where(*criteria)
+            )
+        ).all()
+
+    async def request_gold_verification(
         self, 
         request_data: GoldVerificationRequestCreate, 
-        user: User
+        user: AuthenticatedUser
     ) -> GoldVerificationRequest:
         """
         Create a gold verification request for an ad
         """
         # Check if ad exists and belongs to user
-        ad = self.db.query(Ad).filter(
-            and_(Ad.id == request_data.ad_id, Ad.user_id == user.id)
-        ).first()
+        ad = await self.db.scalar(
+            select(Ad.id).where(and_(Ad.id == request_data.ad_id, Ad.user_id == user.id))
+        )
         
         if not ad:
             raise HTTPException(
@@ -42,12 +74,14 @@ class VerificationService:
             )
 
         # Check if there's already a pending request
-        existing_request = self.db.query(GoldVerificationRequest).filter(
-            and_(
-                GoldVerificationRequest.ad_id == request_data.ad_id,
-                GoldVerificationRequest.status == GoldVerificationStatus.pending
+        existing_request = await self.db.scalar(
+            select(GoldVerificationRequest.id).where(
+                and_(
+                    GoldVerificationRequest.ad_id == request_data.ad_id,
+                    GoldVerificationRequest.status == GoldVerificationStatus.pending
+                )
             )
-        ).first()
+        )
 
         if existing_request:
             raise HTTPException(
@@ -64,36 +98,38 @@ class VerificationService:
         )
 
         self.db.add(verification_request)
-        self.db.commit()
-        self.db.refresh(verification_request)
-        return verification_request
+        await self.db.commit()
+        request_out = await self._get_request_out(verification_request.id)
+        # Listed ads carry their gold verification state
+        listing_cache.invalidate_ad(request_out.ad)
+        return request_out
 
-    def get_pending_gold_requests(self) -> List[GoldVerificationRequest]:
+    async def get_pending_gold_requests(self) -> List[GoldVerificationRequest]:
         """
         Get all pending gold verification requests (admin only)
         """
-        return self.db.query(GoldVerificationRequest).filter(
+        return await self._list_requests_out(
             GoldVerificationRequest.status == GoldVerificationStatus.pending
-        ).all()
+        )
 
-    def get_all_gold_requests(self) -> List[GoldVerificationRequest]:
+    async def get_all_gold_requests(self) -> List[GoldVerificationRequest]:
         """
         Get all gold verification requests (admin only)
         """
-        return self.db.query(GoldVerificationRequest).all()
+        return await self._list_requests_out()
 
-    def process_gold_verification_request(
+    async def process_gold_verification_request(
         self, 
         request_id: int, 
         update_data: GoldVerificationRequestUpdate, 
-        admin_user: User
+        admin_user: AuthenticatedUser
     ) -> GoldVerificationRequest:
         """
         Process a gold verification request (approve or reject)
         """
-        verification_request = self.db.query(GoldVerificationRequest).filter(
-            GoldVerificationRequest.id == request_id
-        ).first()
+        verification_request = await self.db.scalar(
+            select(GoldVerificationRequest).where(GoldVerificationRequest.id == request_id)
+        )
 
         if not verification_request:
             raise HTTPException(
@@ -113,40 +149,43 @@ class VerificationService:
         verification_request.processed_by = admin_user.id
         verification_request.processed_at = datetime.utcnow()
 
-        self.db.commit()
-        self.db.refresh(verification_request)
-        return verification_request
+        await self.db.commit()
+        request_out = await self._get_request_out(verification_request.id)
+        listing_cache.invalidate_ad(request_out.ad)
+        return request_out
 
-    def get_user_gold_requests(self, user: User) -> List[GoldVerificationRequest]:
+    async def get_user_gold_requests(self, user: AuthenticatedUser) -> List[GoldVerificationRequest]:
         """
         Get all gold verification requests made by a user
         """
-        return self.db.query(GoldVerificationRequest).filter(
+        return await self._list_requests_out(
             GoldVerificationRequest.requested_by == user.id
-        ).all()
+        )
 
-    def get_ad_gold_requests(self, ad_id: int) -> List[GoldVerificationRequest]:
+    async def get_ad_gold_requests(self, ad_id: int) -> List[GoldVerificationRequest]:
         """
         Get all gold verification requests for a specific ad
         """
-        return self.db.query(GoldVerificationRequest).filter(
+        return await self._list_requests_out(
             GoldVerificationRequest.ad_id == ad_id
-        ).all()
+        )
 
-    def cancel_gold_verification_request(
+    async def cancel_gold_verification_request(
         self, 
         request_id: int, 
-        user: User
+        user: AuthenticatedUser
     ) -> GoldVerificationRequest:
         """
         Cancel a pending gold verification request (only by the requester)
         """
-        verification_request = self.db.query(GoldVerificationRequest).filter(
-            and_(
-                GoldVerificationRequest.id == request_id,
-                GoldVerificationRequest.requested_by == user.id
+        verification_request = await self.db.scalar(
+            select(GoldVerificationRequest).where(
+                and_(
+                    GoldVerificationRequest.id == request_id,
+                    GoldVerificationRequest.requested_by == user.id
+                )
             )
-        ).first()
+        )
 
         if not verification_request:
             raise HTTPException(
@@ -165,6 +204,7 @@ class VerificationService:
         verification_request.admin_comment = "Cancelled by user"
         verification_request.processed_at = datetime.utcnow()
 
-        self.db.commit()
-        self.db.refresh(verification_request)
-        return verification_request
+        await self.db.commit()
+        request_out = await self._get_request_out(verification_request.id)
+        listing_cache.invalidate_ad(request_out.ad)
+        return request_out
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from sqlalchemy import Integer, column, update, values
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.ad import Ad
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCountBackend(ABC):
+    """
+    Storage for view-count deltas that have not been written to the database yet.
+
+    The default backend keeps deltas in process memory. Multi-worker deployments can plug in
+    a shared store (e.g. Redis hashes) by implementing these methods; drain() must atomically
+    take and clear the pending deltas so that each view is flushed by exactly one worker.
+    """
+
+    @abstractmethod
+    def add(self, ad_id: int, count: int = 1) -> int:
+        """Add views for an ad and return the number of ads with pending deltas"""
+
+    @abstractmethod
+    def pending(self, ad_id: int) -> int:
+        """Return the buffered views of an ad"""
+
+    @abstractmethod
+    def drain(self) -> Dict[int, int]:
+        """Take all pending deltas, leaving the backend empty"""
+
+
+class InMemoryViewCountBackend(ViewCountBackend):
+    def __init__(self):
+        self._deltas: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, ad_id: int, count: int = 1) -> int:
+        with self._lock:
+            self._deltas[ad_id] = self._deltas.get(ad_id, 0) + count
+            return len(self._deltas)
+
+    def pending(self, ad_id: int) -> int:
+        with self._lock:
+            return self._deltas.get(ad_id, 0)
+
+    def drain(self) -> Dict[int, int]:
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            return deltas
+
+
+class ViewCounter:
+    """
+    Write-behind accumulator for Ad.views_count.
+
+    Views are buffered in the backend and written with a single
+    UPDATE ... FROM (VALUES ...) every flush_interval seconds, as soon as
+    flush_threshold distinct ads are pending, and on shutdown.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[ViewCountBackend] = None,
+        flush_interval: float = settings.VIEW_COUNT_FLUSH_INTERVAL_SECONDS,
+        flush_threshold: int = settings.VIEW_COUNT_FLUSH_THRESHOLD,
+    ):
+        self.backend = backend or InMemoryViewCountBackend()
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+
+    def record(self, ad_id: int, count: int = 1) -> None:
+        """Buffer views for an ad; safe to call from request threads"""
+        pending_ads = self.backend.add(ad_id, count)
+        if pending_ads >= self.flush_threshold and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._flush_requested.set)
+
+    def pending(self, ad_id: int) -> int:
+        return self.backend.pending(ad_id)
+
+    def flush(self) -> int:
+        """Write all buffered deltas to the database and return the number of updated ads"""
+        deltas = self.backend.drain()
+        if not deltas:
+            return 0
+
+        deltas_table = values(
+            column("id", Integer), column("delta", Integer), name="view_deltas"
+        ).data(list(deltas.items()))
+        stmt = (
+            update(Ad)
+            # Keep updated_at: a view is not a modification of the ad
+            .values(views_count=Ad.views_count + deltas_table.c.delta, updated_at=Ad.updated_at)
+            .where(Ad.id == deltas_table.c.id)
+        )
+
+        try:
+            with engine.begin() as connection:
+                connection.execute(stmt)
+        except Exception as e:
+            # Put the deltas back so that the views are retried on the next flush
+            for ad_id, count in deltas.items():
+                self.backend.add(ad_id, count)
+            logger.error(f"Failed to flush view counts: {e}")
+            raise
+        return len(deltas)
+
+    async def start(self) -> None:
+        """Start the periodic background flush on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._flush_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background flush and write whatever is still buffered; a failed write is logged, not raised"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception:
+            # Already logged by flush(); the rest of shutdown must still run
+            logger.error("Buffered ad views were not written on shutdown")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                # Already logged by flush(); keep the loop alive
+                pass
+
+
+# Global instance
+view_counter = ViewCounter()
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for blocking work awaited from the event loop.
+
+    At most max_workers jobs run at once and at most max_pending callers are admitted;
+    the rest wait on the semaphore, which gives callers backpressure instead of an unbounded
+    executor queue. Queue time, from the call until a worker picks the job up, is recorded for stats().
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    async def run(self, func: Callable, *args, **kwargs):
+        queued_at = time.monotonic()
+
+        def timed():
+            self._record_queue_time(time.monotonic() - queued_at)
+            return func(*args, **kwargs)
+
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+
+    def _record_queue_time(self, queue_time: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.queue_time_total += queue_time
+            self.queue_time_max = max(self.queue_time_max, queue_time)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "avg_queue_ms": self.queue_time_total / self.calls * 1000 if self.calls else 0.0,
+                "max_queue_ms": self.queue_time_max * 1000,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,59 @@
+import io
+import os
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# Derivative name -> longest side in pixels; each is stored as WebP next to the original
+IMAGE_VARIANTS = {
+    "thumbnail": 320,
+    "medium": 1280,
+}
+VARIANT_CONTENT_TYPE = "image/webp"
+VARIANT_SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+def public_base_url() -> str:
+    """URL prefix of public objects in the uploads bucket; path-style on a custom endpoint"""
+    if settings.AWS_S3_ENDPOINT_URL:
+        return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{settings.AWS_S3_BUCKET_NAME}/"
+    return f"https://{settings.AWS_S3_BUCKET_NAME}.s3.amazonaws.com/"
+
+
+def has_variants(key: str) -> bool:
+    return os.path.splitext(key)[1].lower() in VARIANT_SOURCE_EXTENSIONS
+
+
+def variant_key(key: str, variant: str) -> str:
+    """uploads/abc.jpg -> uploads/abc.thumbnail.webp"""
+    return f"{os.path.splitext(key)[0]}.{variant}.webp"
+
+
+def variant_urls(url: str) -> Optional[Dict[str, str]]:
+    """Derivative URLs of an uploaded image, or None for documents and images stored elsewhere"""
+    base = public_base_url()
+    if not url.startswith(base) or not has_variants(url):
+        return None
+    return {variant: f"{base}{variant_key(url[len(base):], variant)}" for variant in IMAGE_VARIANTS}
+
+
+def render_variants(data: bytes) -> Dict[str, bytes]:
+    """
+    Resize an original image into every variant, encoded as WebP.
+    CPU-bound: runs in the image pipeline's worker processes, which is also the only place Pillow is imported.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        # Phone photos are stored sideways with an EXIF rotation; bake it in, thumbnails drop EXIF
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    variants = {}
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, format="WEBP", quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+        variants[variant] = buffer.getvalue()
+    return variants
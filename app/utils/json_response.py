@@ -0,0 +1,41 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(model_type: Any) -> TypeAdapter:
+    """Shared TypeAdapter of a response type; building one compiles its validator and serializer"""
+    return TypeAdapter(model_type)
+
+
+def dump_json(model_type: Any, content: Any) -> bytes:
+    """
+    Validate content (ORM objects included) into model_type once and serialize it straight to JSON
+    bytes in pydantic-core. The output is the same as FastAPI renders for response_model=model_type.
+    """
+    adapter = type_adapter(model_type)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+class ModelJSONResponse(Response):
+    """
+    JSON response rendered with dump_json().
+
+    Endpoints returning a Response skip FastAPI's response_model handling, which validates the content,
+    dumps it to Python objects and encodes those again with the stdlib json module. Keep response_model
+    on the route so that the OpenAPI schema is unchanged.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        model_type: Any,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+    ):
+        super().__init__(content=dump_json(model_type, content), status_code=status_code, headers=headers)
@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(created_at: datetime, item_id: int, rank: Optional[float] = None) -> str:
+    """
+    Encode the (rank, created_at, id) keyset position of the last returned item
+    into an opaque, URL-safe cursor string. rank is only set for relevance-ordered pages.
+    """
+    data = {"created_at": created_at.isoformat(), "id": item_id}
+    if rank is not None:
+        data["rank"] = rank
+    payload = json.dumps(data)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, Optional[float]]:
+    """
+    Decode a cursor produced by encode_cursor back into (created_at, id, rank)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        rank = payload.get("rank")
+        return (
+            datetime.fromisoformat(payload["created_at"]),
+            int(payload["id"]),
+            float(rank) if rank is not None else None,
+        )
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def next_cursor_for(items: list, limit: int) -> Optional[str]:
+    """
+    Return the cursor for the next page, given a result fetched with limit + 1 rows.
+    The extra row (if present) only signals that another page exists and is dropped by the caller.
+    """
+    if len(items) <= limit:
+        return None
+    last = items[limit - 1]
+    return encode_cursor(last.created_at, last.id, getattr(last, "search_rank", None))
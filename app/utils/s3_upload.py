@@ -1,49 +1,165 @@
 import boto3
+import hashlib
+import logging
 import os
-from fastapi import UploadFile, HTTPException
-from typing import Optional
 import uuid
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi import UploadFile, HTTPException
+from typing import AsyncIterator, Awaitable, Callable, Optional, Set, Tuple
 from datetime import datetime
 from app.core.config import settings
+from app.utils.executor import BoundedExecutor
+from app.utils.images import IMAGE_VARIANTS, has_variants, public_base_url, variant_key
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+HASH_CHUNK_SIZE = 1 * MB
+
+# Leading bytes identifying the accepted file types; RIFF/WEBP has the container size in between
+SNIFF_SIZE = 12
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'application/pdf': 'pdf',
+}
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Content type from the magic bytes at the start of a file, None if it is not an accepted type"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'%PDF-'):
+        return 'application/pdf'
+    return None
+
+
+def content_key(digest: str, content_type: str, folder: Optional[str] = None) -> str:
+    """Content-addressed key; the extension follows the content type, so .jpg and .jpeg copies share a key"""
+    key = f"{digest}.{CONTENT_TYPE_EXTENSIONS[content_type]}"
+    return f"{folder}/{key}" if folder else key
+
+
+def is_not_found(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
 
 class S3UploadService:
     def __init__(self):
+        # One client per process: boto3 clients are thread-safe and keep a pool of
+        # connections that must cover every upload worker and its multipart parts
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             region_name=settings.AWS_REGION_NAME,
+            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                retries={'max_attempts': 3, 'mode': 'standard'},
+            ),
         )
         self.bucket_name = settings.AWS_S3_BUCKET_NAME
-        
+
         if not self.bucket_name:
             raise ValueError("S3_BUCKET_NAME environment variable is required")
 
-    async def upload_file(self, file: UploadFile, folder: str = "uploads") -> str:
+        # Files above the threshold are sent as concurrent multipart uploads
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * MB,
+            max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+        )
+        # Blocking boto3 calls run here, off the event loop
+        self.executor = BoundedExecutor(
+            name="s3-upload",
+            max_workers=settings.S3_UPLOAD_WORKERS,
+            max_pending=settings.S3_MAX_PENDING_UPLOADS
+        )
+
+    def public_url(self, key: str) -> str:
+        """Public URL of an object; path-style on a custom endpoint such as a local S3 stand-in"""
+        return f"{public_base_url()}{key}"
+
+    def key_from_url(self, file_url: str) -> str:
+        return file_url.replace(self.public_url(""), "")
+
+    async def upload_file(
+            self,
+            file: UploadFile,
+            folder: Optional[str] = "uploads",
+            claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
         """
         Upload file to S3 and return the URL
         """
-        try:
-            # Generate unique filename
-            file_extension = file.filename.split('.')[-1] if file.filename else 'jpg'
-            unique_filename = f"{folder}/{uuid.uuid4()}.{file_extension}"
-            
-            # Upload file to S3
+        url, _ = await self.store_file(file, folder, claim=claim)
+        return url
+
+    async def store_file(
+            self,
+            file: UploadFile,
+            folder: Optional[str] = "uploads",
+            content_type: Optional[str] = None,
+            claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Tuple[str, bool]:
+        """
+        Upload file to S3 under a key derived from its content and return the URL,
+        and whether it was uploaded now; identical content that is already stored is not sent again.
+        content_type overrides the type sniffed from the content, e.g. with one sniffed already.
+        claim is awaited with the URL before checking whether the object exists (see claim_stored_file).
+        """
+        def hash_file() -> Tuple[str, str]:
+            # Hash the spooled upload in chunks; the key must be known before the PUT
+            detected_type = content_type or sniff_content_type(file.file.read(SNIFF_SIZE))
+            if detected_type not in CONTENT_TYPE_EXTENSIONS:
+                raise HTTPException(status_code=400, detail="File content does not match an allowed type")
+            file.file.seek(0)
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: file.file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+            file.file.seek(0)
+            return content_key(digest.hexdigest(), detected_type, folder), detected_type
+
+        def store(key: str, detected_type: str) -> bool:
+            try:
+                self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+                return False
+            except ClientError as e:
+                if not is_not_found(e):
+                    raise
+
             self.s3_client.upload_fileobj(
                 file.file,
                 self.bucket_name,
-                unique_filename,
+                key,
                 ExtraArgs={
-                    'ContentType': file.content_type,
+                    'ContentType': detected_type,
                     'ACL': 'public-read'
-                }
+                },
+                Config=self.transfer_config
             )
-            
-            # Generate public URL
-            file_url = f"https://{self.bucket_name}.s3.amazonaws.com/{unique_filename}"
-            
-            return file_url
-            
+            return True
+
+        try:
+            key, detected_type = await self.executor.run(hash_file)
+            if claim is not None:
+                await claim(self.public_url(key))
+            uploaded = await self.executor.run(store, key, detected_type)
+            return self.public_url(key), uploaded
+
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -52,20 +168,224 @@ class S3UploadService:
         finally:
             file.file.close()
 
+    async def store_stream(
+            self,
+            chunks: AsyncIterator[bytes],
+            allowed_types: Set[str],
+            max_size: int,
+            folder: Optional[str] = None,
+            claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Tuple[str, bool]:
+        """
+        Upload a request body to S3 as it arrives and return the URL, and whether it was uploaded now.
+
+        At most one multipart part (S3_MULTIPART_CHUNK_MB) is held in memory. The type is sniffed from
+        the first bytes and the upload is aborted as soon as the body exceeds max_size. Like store_file the
+        key is derived from the content: bodies larger than one part are uploaded to a temporary key under
+        tmp/ and copied to their final key inside S3 (a lifecycle rule on tmp/ should clean up leftovers).
+        claim is awaited with the URL before checking whether the object exists, as in store_file.
+        """
+        part_size = settings.S3_MULTIPART_CHUNK_MB * MB
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        size = 0
+        content_type = None
+        temp_key = None
+        upload_id = None
+        parts = []
+
+        def check_type() -> str:
+            sniffed = sniff_content_type(bytes(buffer[:SNIFF_SIZE]))
+            if sniffed not in allowed_types:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File type not allowed. Allowed types: {', '.join(sorted(allowed_types))}"
+                )
+            return sniffed
+
+        async def upload_part(body: bytes) -> None:
+            response = await self.executor.run(
+                self.s3_client.upload_part,
+                Bucket=self.bucket_name,
+                Key=temp_key,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=body
+            )
+            parts.append({'ETag': response['ETag'], 'PartNumber': len(parts) + 1})
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File size too large. Maximum size is {max_size // MB}MB"
+                    )
+                digest.update(chunk)
+                buffer += chunk
+                if content_type is None and len(buffer) >= SNIFF_SIZE:
+                    content_type = check_type()
+
+                if len(buffer) >= part_size:
+                    if upload_id is None:
+                        temp_key = f"tmp/{uuid.uuid4()}"
+                        upload = await self.executor.run(
+                            self.s3_client.create_multipart_upload,
+                            Bucket=self.bucket_name,
+                            Key=temp_key,
+                            ContentType=content_type
+                        )
+                        upload_id = upload['UploadId']
+                    await upload_part(bytes(buffer[:part_size]))
+                    del buffer[:part_size]
+
+            if size == 0:
+                raise HTTPException(status_code=400, detail="File is empty")
+            if content_type is None:
+                content_type = check_type()
+
+            key = content_key(digest.hexdigest(), content_type, folder)
+            if claim is not None:
+                await claim(self.public_url(key))
+            uploaded = await self.head_object(key) is None
+
+            if upload_id is None:
+                # The whole body fit in one part: its key is already known, so store it directly
+                if uploaded:
+                    await self.executor.run(
+                        self.s3_client.put_object,
+                        Bucket=self.bucket_name,
+                        Key=key,
+                        Body=bytes(buffer),
+                        ContentType=content_type,
+                        ACL='public-read'
+                    )
+                return self.public_url(key), uploaded
+
+            if buffer:
+                await upload_part(bytes(buffer))
+                buffer.clear()
+            await self.executor.run(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=temp_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            upload_id = None
+
+            if uploaded:
+                await self.executor.run(
+                    self.s3_client.copy_object,
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    CopySource={'Bucket': self.bucket_name, 'Key': temp_key},
+                    ContentType=content_type,
+                    MetadataDirective='REPLACE',
+                    ACL='public-read'
+                )
+            await self.executor.run(self.s3_client.delete_object, Bucket=self.bucket_name, Key=temp_key)
+            return self.public_url(key), uploaded
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload file to S3: {str(e)}"
+            )
+        finally:
+            if upload_id is not None:
+                # Rejected, failed or disconnected midway: drop the parts stored so far
+                try:
+                    await self.executor.run(
+                        self.s3_client.abort_multipart_upload,
+                        Bucket=self.bucket_name,
+                        Key=temp_key,
+                        UploadId=upload_id
+                    )
+                except Exception:
+                    logger.warning(f"Failed to abort multipart upload {upload_id} of {temp_key}", exc_info=True)
+
+    async def download_bytes(self, key: str) -> bytes:
+        def download():
+            return self.s3_client.get_object(Bucket=self.bucket_name, Key=key)['Body'].read()
+
+        return await self.executor.run(download)
+
+    async def download_prefix(self, key: str, length: int) -> bytes:
+        """First length bytes of an object, e.g. to sniff its type"""
+        def download():
+            return self.s3_client.get_object(
+                Bucket=self.bucket_name, Key=key, Range=f"bytes=0-{length - 1}"
+            )['Body'].read()
+
+        return await self.executor.run(download)
+
+    async def upload_bytes(self, key: str, data: bytes, content_type: str) -> str:
+        """
+        Store generated content under a given key and return its URL
+        """
+        await self.executor.run(
+            self.s3_client.put_object,
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            ACL='public-read'
+        )
+        return self.public_url(key)
+
+    def create_presigned_post(self, key: str, content_type: str, max_size: int, expires_in: int) -> dict:
+        """
+        Presigned POST (url and form fields) that only accepts a public-read object
+        at this key, with this content type and at most max_size bytes
+        """
+        return self.s3_client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=key,
+            Fields={'Content-Type': content_type, 'acl': 'public-read'},
+            Conditions=[
+                {'Content-Type': content_type},
+                {'acl': 'public-read'},
+                ['content-length-range', 1, max_size],
+            ],
+            ExpiresIn=expires_in
+        )
+
+    async def head_object(self, key: str) -> Optional[dict]:
+        """
+        Object metadata (ContentLength, ContentType, ...) or None if it does not exist
+        """
+        try:
+            return await self.executor.run(self.s3_client.head_object, Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if is_not_found(e):
+                return None
+            raise
+
     async def delete_file(self, file_url: str) -> bool:
         """
-        Delete file from S3
+        Delete file from S3, with its image renditions.
+        Files are shared between records; only call this for files without references (see StoredFileService).
         """
         try:
+            if not file_url.startswith(self.public_url("")):
+                return False
             # Extract key from URL
-            key = file_url.replace(f"https://{self.bucket_name}.s3.amazonaws.com/", "")
-            
-            self.s3_client.delete_object(
+            key = self.key_from_url(file_url)
+            keys = [key]
+            if has_variants(key):
+                keys += [variant_key(key, variant) for variant in IMAGE_VARIANTS]
+
+            await self.executor.run(
+                self.s3_client.delete_objects,
                 Bucket=self.bucket_name,
-                Key=key
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
             )
             return True
-            
+
         except Exception as e:
             print(f"Failed to delete file from S3: {str(e)}")
             return False
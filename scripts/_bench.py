@@ -0,0 +1,142 @@
+"""
+Shared setup for the benchmark scripts.
+
+The benchmarks seed and wipe a scratch PostgreSQL database given with --database-url; never point
+them at a database whose data matters. Application settings other than DATABASE_URL come from the
+environment / .env as usual.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORDS = [
+    "kvartira", "uy", "hovli", "ofis", "xonadon", "yangi", "remont", "evroremont", "balkon", "metro",
+    "maktab", "bog'", "park", "markaz", "qavat", "lift", "avtoturargoh", "mebel", "konditsioner", "isitish",
+    "apartment", "house", "studio", "penthouse", "renovated", "furnished", "balcony", "parking", "garden", "view",
+    "quiet", "spacious", "bright", "modern", "cozy", "subway", "school", "kindergarten", "market", "center",
+    "квартира", "дом", "ремонт", "балкон", "метро", "новостройка", "мебель", "парковка", "центр", "студия",
+]
+CITIES = ["Tashkent", "Samarkand", "Bukhara", "Namangan", "Andijan", "Fergana", "Nukus", "Qarshi", "Termez", "Jizzakh"]
+STREETS = [
+    "Amir Temur", "Navoiy", "Mustaqillik", "Bunyodkor", "Chilonzor", "Yunusobod", "Shota Rustaveli", "Bobur",
+    "Afrosiyob", "Oybek", "Mirzo Ulug'bek", "Sebzor", "Labzak", "Beshyog'och", "Qatortol", "Farg'ona yo'li",
+]
+
+
+def parse_args(description: str, **defaults) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--database-url", required=True, help="Scratch PostgreSQL database; it is wiped")
+    parser.add_argument("--repeat", type=int, default=defaults.pop("repeat", 10), help="Timed runs per case")
+    for name, value in defaults.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+    # Must happen before anything under app/ is imported: the engines are built from settings at import
+    os.environ["DATABASE_URL"] = args.database_url
+    return args
+
+
+def reset_schema() -> None:
+    """Recreate the schema from the models, as the tests do"""
+    from sqlalchemy import text
+
+    from app import models  # noqa: F401  registers every model on Base.metadata
+    from app.db.base import Base
+    from app.db.session import engine
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+        for extension in ("pg_trgm", "cube", "earthdistance"):
+            connection.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+    Base.metadata.create_all(engine)
+
+
+def seed_ads(
+        count: int,
+        min_latitude: float = 37.2,
+        max_latitude: float = 45.6,
+        min_longitude: float = 56.0,
+        max_longitude: float = 73.1,
+        batch_size: int = 100_000,
+) -> None:
+    """Insert count ads with random words, cities and coordinates in one user's name and one category"""
+    from sqlalchemy import text
+
+    from app.db.session import engine
+
+    def pick(values: str) -> str:
+        return f"({values})[1 + floor(random() * cardinality({values}))::int]"
+
+    title = " || ' ' || ".join([pick(":words")] * 3)
+    description = " || ' ' || ".join([pick(":words")] * 12)
+    insert = text(f"""
+        INSERT INTO ad (
+            title, description, deal_type, city, street, latitude, longitude, price, total_area, rooms_count,
+            currency, commission_from_buyer, contact_type, full_name, email, phone_number, views_count, user_id,
+            category_id, image_urls, document_urls, created_at
+        )
+        SELECT
+            {title}, {description},
+            (ARRAY['sale', 'rent'])[1 + (g % 2)]::dealtype,
+            {pick(":cities")}, {pick(":streets")},
+            :min_lat + random() * (:max_lat - :min_lat), :min_lon + random() * (:max_lon - :min_lon),
+            (10000 + random() * 490000)::int, round((20 + random() * 230)::numeric, 2), 1 + (g % 6),
+            'USD', false, 'realtor', 'Bench User', 'bench@example.com', '+998900000000', (random() * 1000)::int,
+            :user_id, :category_id, '{{}}', '{{}}', now() - g * interval '1 second'
+        FROM generate_series(:start, :stop) AS g
+    """)
+
+    with engine.begin() as connection:
+        user_id = connection.execute(text(
+            "INSERT INTO \"user\" (id, role, is_active, is_verified, username) "
+            "VALUES (gen_random_uuid(), 'realtor', true, true, 'bench') RETURNING id"
+        )).scalar_one()
+        category_id = connection.execute(text("INSERT INTO category DEFAULT VALUES RETURNING id")).scalar_one()
+        connection.execute(
+            text("INSERT INTO category_name (category_id, lang, name) VALUES (:id, 'uz', 'Kvartira')"),
+            {"id": category_id},
+        )
+
+    for start in range(1, count + 1, batch_size):
+        stop = min(start + batch_size - 1, count)
+        with engine.begin() as connection:
+            connection.execute(insert, {
+                "words": WORDS, "cities": CITIES, "streets": STREETS,
+                "min_lat": min_latitude, "max_lat": max_latitude, "min_lon": min_longitude, "max_lon": max_longitude,
+                "user_id": user_id, "category_id": category_id, "start": start, "stop": stop,
+            })
+        print(f"  seeded {stop}/{count} ads", file=sys.stderr)
+
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Wall-clock milliseconds of fn over repeat runs, after one warm-up run"""
+    fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def print_table(headers: List[str], rows: List[List[object]]) -> None:
+    cells = [headers] + [[f"{cell:.2f}" if isinstance(cell, float) else str(cell) for cell in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for index, row in enumerate(cells):
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+        if index == 0:
+            print("  ".join("-" * width for width in widths))
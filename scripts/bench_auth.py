@@ -0,0 +1,78 @@
+"""
+Auth dependency microbenchmark: the per-request cost of get_current_user with and without the verified
+token claims cache (and the authenticated user cache), next to one bcrypt check as paid on login.
+
+    python scripts/bench_auth.py --database-url postgresql://postgres@localhost/bench
+
+Creates one user in a freshly reset schema and resolves the same bearer token through the dependency.
+"""
+import asyncio
+
+from _bench import measure, parse_args, print_table, reset_schema
+
+
+def main() -> None:
+    args = parse_args(__doc__, repeat=2000)
+    reset_schema()
+
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    from app.api.deps import get_current_user
+    from app.core.security import create_access_token, decode_access_token, hash_password, token_claims_cache
+    from app.core.security import verify_password
+    from app.db.session import AsyncSessionLocal, SessionLocal
+    from app.models.user import User, UserRole
+    from app.services.user_cache import authenticated_user_cache
+
+    db = SessionLocal()
+    user = User(role=UserRole.USER, username="bench", password=hash_password("bench-password"))
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    password_hash = user.password
+    db.close()
+
+    loop = asyncio.new_event_loop()
+    session = AsyncSessionLocal()
+
+    def dependency(clear_claims: bool, clear_users: bool):
+        def resolve():
+            if clear_claims:
+                token_claims_cache.clear()
+            if clear_users:
+                authenticated_user_cache.clear()
+            return loop.run_until_complete(get_current_user(db=session, token=credentials))
+
+        return resolve
+
+    def decode(clear_claims: bool):
+        def run():
+            if clear_claims:
+                token_claims_cache.clear()
+            return decode_access_token(token)
+
+        return run
+
+    cases = [
+        ("decode_access_token, no cache", decode(True), args.repeat),
+        ("decode_access_token, claims cached", decode(False), args.repeat),
+        ("get_current_user, no caches", dependency(True, True), args.repeat),
+        ("get_current_user, claims cached", dependency(False, True), args.repeat),
+        ("get_current_user, claims and user cached", dependency(False, False), args.repeat),
+        # Only paid on login, for reference; a few runs are enough at this cost
+        ("bcrypt verify_password", lambda: verify_password("bench-password", password_hash), 10),
+    ]
+    rows = []
+    for name, fn, repeat in cases:
+        timing = measure(fn, repeat)
+        rows.append([name, timing["median_ms"] * 1000, timing["p95_ms"] * 1000, repeat])
+
+    print("Per call (µs)")
+    print_table(["case", "median", "p95", "runs"], rows)
+    loop.run_until_complete(session.close())
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
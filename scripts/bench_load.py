@@ -0,0 +1,106 @@
+"""
+HTTP load test of the authenticated endpoints moved onto the asyncpg session layer: requests/sec of one
+uvicorn worker at a fixed concurrency.
+
+    python scripts/bench_load.py --database-url postgresql://postgres@localhost/bench --seed-only 1
+    uvicorn app.main:app --workers 1 --port 8000 &   # with DATABASE_URL pointing at the same database
+    python scripts/bench_load.py --database-url postgresql://postgres@localhost/bench --base-url http://127.0.0.1:8000
+
+--seed-only resets the schema and seeds --ads ads, favourited and gold verified by their author; start the
+server afterwards. The load run signs a token for that author with the application's SECRET_KEY, so the
+server must share the environment. Run the load generator on other cores than the server if possible.
+"""
+import asyncio
+import statistics
+import time
+
+from _bench import parse_args, print_table, reset_schema, seed_ads
+
+PATHS = [
+    "/api/v1/profile/",
+    "/api/v1/verification/my-gold-requests",
+    "/api/v1/users/me/favourites",
+]
+
+
+def seed(count: int) -> None:
+    from sqlalchemy import text
+
+    from app.db.session import engine
+
+    reset_schema()
+    seed_ads(count)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO favourite (user_id, ad_id) SELECT user_id, id FROM ad"))
+        connection.execute(text(
+            "INSERT INTO gold_verification_requests (ad_id, requested_by, status) "
+            "SELECT id, user_id, 'pending' FROM ad"
+        ))
+
+
+async def load(base_url: str, path: str, headers: dict, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        # Warm up connections and the per-worker caches
+        await asyncio.gather(*(client.get(path) for _ in range(concurrency)), return_exceptions=True)
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else float("nan"),
+        "p99_ms": latencies[int(len(latencies) * 0.99)] if latencies else float("nan"),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    args = parse_args(
+        __doc__, base_url="http://127.0.0.1:8000", ads=20, seed_only=0, concurrency=32, duration=20.0, repeat=1
+    )
+    if args.seed_only:
+        seed(args.ads)
+        return
+
+    from sqlalchemy import text
+
+    from app.core.security import create_access_token
+    from app.db.session import engine
+
+    with engine.connect() as connection:
+        user_id = connection.execute(text("SELECT id FROM \"user\" WHERE username = 'bench'")).scalar_one()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    rows = []
+    for path in PATHS:
+        result = asyncio.run(load(args.base_url, path, headers, args.concurrency, args.duration))
+        rows.append([path, result["rps"], result["p50_ms"], result["p99_ms"], result["errors"]])
+
+    print(f"{args.base_url}, {args.concurrency} concurrent clients, {args.duration:.0f}s per path")
+    print_table(["path", "req/s", "p50 ms", "p99 ms", "errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
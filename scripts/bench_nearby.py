@@ -0,0 +1,69 @@
+"""
+Nearby search benchmark on a dense, Tashkent-sized dataset: the previous unindexed latitude/longitude
+BETWEEN box against the earthdistance-indexed, distance-sorted search behind /api/v1/ads/nearby.
+
+    python scripts/bench_nearby.py --database-url postgresql://postgres@localhost/bench --ads 300000
+
+Seeds --ads ads spread over the city (unless --skip-seed), then times both paths for a few points and radii.
+"""
+from _bench import measure, parse_args, print_table, reset_schema, seed_ads
+
+# Tashkent and its immediate suburbs
+TASHKENT_BOX = dict(min_latitude=41.19, max_latitude=41.43, min_longitude=69.11, max_longitude=69.43)
+POINTS = {
+    "Amir Temur square": (41.311081, 69.279737),
+    "Chilonzor": (41.275000, 69.204000),
+    "Yunusobod": (41.364000, 69.288000),
+}
+RADII_KM = [1.0, 5.0, 20.0]
+
+
+def main() -> None:
+    args = parse_args(__doc__, ads=300_000, skip_seed=0, repeat=5)
+    if not args.skip_seed:
+        reset_schema()
+        seed_ads(args.ads, **TASHKENT_BOX)
+
+    from app.db.session import SessionLocal
+    from app.models.ad import Ad
+    from app.services.ad_service import AD_OUT_LOADER_OPTIONS, DEFAULT_NEARBY_LIMIT, AdService
+
+    db = SessionLocal()
+    ad_service = AdService(db)
+
+    def box_query(latitude: float, longitude: float, radius_km: float):
+        # get_ads_by_location before the earthdistance index: an unindexed, unsorted, unbounded box
+        lat_diff = radius_km / 111.0
+        lng_diff = radius_km / (111.0 * abs(latitude))
+        return (
+            db.query(Ad)
+            .options(*AD_OUT_LOADER_OPTIONS)
+            .filter(
+                Ad.latitude.between(latitude - lat_diff, latitude + lat_diff),
+                Ad.longitude.between(longitude - lng_diff, longitude + lng_diff),
+            )
+            .all()
+        )
+
+    def nearest(latitude: float, longitude: float, radius_km: float):
+        return ad_service.get_ads_by_location(latitude, longitude, radius_km, DEFAULT_NEARBY_LIMIT)
+
+    rows = []
+    for name, (latitude, longitude) in POINTS.items():
+        for radius_km in RADII_KM:
+            box_rows = len(box_query(latitude, longitude, radius_km))
+            before = measure(lambda: box_query(latitude, longitude, radius_km), args.repeat)
+            after = measure(lambda: nearest(latitude, longitude, radius_km), args.repeat)
+            rows.append([
+                name, radius_km, box_rows, before["median_ms"], after["median_ms"], after["p95_ms"],
+                f"{before['median_ms'] / after['median_ms']:.2f}x",
+            ])
+            db.rollback()
+
+    print(f"{args.ads} ads over Tashkent, nearest {DEFAULT_NEARBY_LIMIT}, {args.repeat} runs per case (ms)")
+    print_table(["point", "radius km", "box rows", "box median", "indexed median", "indexed p95", "speedup"], rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Ad search benchmark: the previous ILIKE '%q%' filter against the full-text search behind the q parameter.
+
+    python scripts/bench_search.py --database-url postgresql://postgres@localhost/bench --ads 1000000
+
+Seeds --ads random ads (unless --skip-seed), then times the first page of each query through both paths,
+loading ads with the same AdOut loader options.
+"""
+from _bench import measure, parse_args, print_table, reset_schema, seed_ads
+
+QUERIES = ["metro", "balkon remont", '"yangi kvartira"', "studio -furnished", "квартира", "chilonzor"]
+
+
+def main() -> None:
+    args = parse_args(__doc__, ads=1_000_000, skip_seed=0, repeat=5)
+    if not args.skip_seed:
+        reset_schema()
+        seed_ads(args.ads)
+
+    from sqlalchemy import or_
+
+    from app.db.session import SessionLocal
+    from app.models.ad import Ad
+    from app.services.ad_service import AD_OUT_LOADER_OPTIONS, DEFAULT_PAGE_SIZE, AdService
+
+    db = SessionLocal()
+    ad_service = AdService(db)
+
+    def ilike_page(q: str):
+        # The filter _apply_search_filter used before full-text search, with the same page shape
+        like_query = f"%{q}%"
+        return (
+            db.query(Ad)
+            .options(*AD_OUT_LOADER_OPTIONS)
+            .filter(or_(
+                Ad.title.ilike(like_query),
+                Ad.description.ilike(like_query),
+                Ad.city.ilike(like_query),
+                Ad.street.ilike(like_query),
+            ))
+            .order_by(Ad.created_at.desc(), Ad.id.desc())
+            .limit(DEFAULT_PAGE_SIZE + 1)
+            .all()
+        )
+
+    def full_text_page(q: str):
+        return ad_service.get_all_ads(search_query=q)
+
+    rows = []
+    for q in QUERIES:
+        before = measure(lambda: ilike_page(q), args.repeat)
+        after = measure(lambda: full_text_page(q), args.repeat)
+        rows.append([
+            q, before["median_ms"], before["p95_ms"], after["median_ms"], after["p95_ms"],
+            f"{before['median_ms'] / after['median_ms']:.2f}x",
+        ])
+        db.rollback()
+
+    print(f"First page of results, {args.ads} ads, {args.repeat} runs per case (ms)")
+    print_table(["q", "ILIKE median", "ILIKE p95", "FTS median", "FTS p95", "speedup"], rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Serialization benchmark for a page of ads: FastAPI's response_model rendering (with the EmailStr email field
+AdOut had before, and with the current schema) against ModelJSONResponse / dump_json.
+
+    python scripts/bench_serialization.py --database-url postgresql://postgres@localhost/bench --ads 1000
+
+Seeds --ads ads (unless --skip-seed), each with two images and an approved gold verification request,
+loads them once with the AdOut loader options and times only the rendering of an AdPage to JSON bytes.
+"""
+from _bench import measure, parse_args, print_table, reset_schema, seed_ads
+
+
+def main() -> None:
+    args = parse_args(__doc__, ads=1000, skip_seed=0, repeat=20)
+    if not args.skip_seed:
+        reset_schema()
+        seed_ads(args.ads)
+
+    from typing import List, Optional
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from pydantic import EmailStr, create_model
+    from sqlalchemy import text
+
+    from app.db.session import SessionLocal
+    from app.schemas.ad import AdOut, AdPage
+    from app.services.ad_service import AdService
+    from app.utils.json_response import dump_json
+
+    db = SessionLocal()
+    if not args.skip_seed:
+        db.execute(text("""
+            UPDATE ad SET image_urls = ARRAY[
+                'https://cdn.example.com/' || md5(id::text) || '.jpg',
+                'https://cdn.example.com/' || md5(id::text || 'b') || '.jpg'
+            ]
+        """))
+        db.execute(text("""
+            INSERT INTO gold_verification_requests (ad_id, requested_by, status, processed_at)
+            SELECT id, user_id, 'approved', now() FROM ad
+        """))
+        db.commit()
+
+    page = AdService(db).get_all_ads(limit=args.ads)
+    assert len(page["items"]) == args.ads, "seed at least --ads ads"
+
+    # AdOut and AdPage as they were before email became a plain str
+    AdOutBefore = create_model("AdOut", __base__=AdOut, email=(EmailStr, ...))
+    AdPageBefore = create_model("AdPage", __base__=AdPage, items=(List[AdOutBefore], ...))
+
+    def fastapi_render(model_type):
+        field = create_model_field(name="Response_bench", type_=model_type, mode="serialization")
+
+        async def render() -> bytes:
+            content = await serialize_response(field=field, response_content=page, is_coroutine=True)
+            return JSONResponse(content).body
+
+        return render
+
+    def run_async(render):
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        return lambda: loop.run_until_complete(render())
+
+    cases = {
+        "response_model, EmailStr (before)": run_async(fastapi_render(AdPageBefore)),
+        "response_model, str email": run_async(fastapi_render(AdPage)),
+        "ModelJSONResponse (dump_json)": lambda: dump_json(AdPage, page),
+    }
+    size: Optional[int] = None
+    rows = []
+    for name, render in cases.items():
+        size = len(render())
+        timing = measure(render, args.repeat)
+        rows.append([name, timing["median_ms"], timing["p95_ms"]])
+
+    baseline = rows[0][1]
+    for row in rows:
+        row.append(f"{baseline / row[1]:.2f}x")
+    print(f"AdPage of {args.ads} ads, {size / 1024:.0f} KiB of JSON, {args.repeat} runs per case (ms)")
+    print_table(["renderer", "median", "p95", "speedup"], rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,182 @@
+import os
+from contextlib import contextmanager
+
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 
-from app.main import app
-from app.db.base import Base
-from app.db.session import get_db
-from app.core.config import settings
+# The models and queries are PostgreSQL-specific (generated tsvector columns, pg_trgm and earthdistance
+# indexes, arrays), so database tests run against a disposable PostgreSQL database.
+# Point TEST_DATABASE_URL at an empty database the tests may wipe; without it they are skipped.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
 
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
 
-# Test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+from app.core.security import create_access_token  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app import models  # noqa: E402,F401  registers every model on Base.metadata
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(scope="session")
+def database():
+    """Recreate the schema from the models once per test session"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+        for extension in ("pg_trgm", "cube", "earthdistance"):
+            connection.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+    Base.metadata.create_all(engine)
+    yield engine
+
+
+def _reset_caches():
+    from app.core.security import token_claims_cache
+    from app.services.ad_service import cluster_cache, facets_cache
+    from app.services.category_tree import category_tree_cache
+    from app.services.listing_cache import listing_cache
+    from app.services.user_cache import authenticated_user_cache
+    from app.services.view_counter import view_counter
+
+    for cache in (token_claims_cache, cluster_cache, facets_cache, authenticated_user_cache):
+        cache.clear()
+    listing_cache.clear()
+    category_tree_cache.clear()
+    view_counter.backend.drain()
 
 
-@pytest.fixture(scope="function")
-def db():
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+@pytest.fixture
+def db(database):
+    """Sync session on the test database; every table is emptied after the test"""
+    session = SessionLocal()
     try:
-        yield db
+        yield session
     finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+        session.close()
+        tables = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+        with engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        _reset_caches()
 
 
-@pytest.fixture(scope="function")
-def client(db):
-    app.dependency_overrides[get_db] = override_get_db
+@pytest.fixture(scope="session")
+def client(database):
+    # One client, and so one event loop, for the session: pooled asyncpg connections are bound to their loop
     with TestClient(app) as c:
         yield c
-    app.dependency_overrides.clear()
 
 
 @pytest.fixture
-def admin_user(db):
+def s3(monkeypatch):
+    """In-memory S3 (moto) standing in for the uploads bucket; returns a client on it"""
+    import boto3
+    from moto import mock_aws
+
+    from app.utils.s3_upload import s3_service
+
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=s3_service.bucket_name)
+        monkeypatch.setattr(s3_service, "s3_client", s3_client)
+        yield s3_client
+
+
+@pytest.fixture
+def count_queries():
+    """Count the statements sent by the sync and asyncpg engines inside a `with count_queries() as counter:` block"""
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engines = (engine, async_engine.sync_engine)
+        for target in engines:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+    return counting
+
+
+@pytest.fixture
+def make_user(db):
     from app.models.user import User, UserRole
-    from app.core.security import hash_password
-    
-    user = User(
-        username="admin",
-        password=hash_password("admin123"),
-        role=UserRole.ADMIN,
-        phone_number="+998901234567"
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+
+    def make(role: UserRole = UserRole.USER, is_verified: bool = False, **fields) -> User:
+        user = User(role=role, is_verified=is_verified, **fields)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
+    return make
 
 
 @pytest.fixture
-def sample_ad(db, admin_user):
-    from app.models.ad import Ad, DealType
-    from app.models.category import Category
-    
-    # Create category first
-    category = Category(name="Apartment", description="Residential apartments")
+def admin_user(make_user):
+    from app.models.user import UserRole
+
+    return make_user(role=UserRole.ADMIN, username="admin", phone_number="+998901234567")
+
+
+@pytest.fixture
+def auth_headers():
+    def headers(user) -> dict:
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    return headers
+
+
+@pytest.fixture
+def category(db):
+    from app.models.category import Category, CategoryName
+
+    category = Category(names=[CategoryName(lang="uz", name="Kvartira"), CategoryName(lang="en", name="Apartment")])
     db.add(category)
     db.commit()
     db.refresh(category)
-    
-    ad = Ad(
-        title="Test Apartment",
-        description="Test description",
-        price=100000,
-        deal_type=DealType.sale,
-        category_id=category.id,
-        user_id=admin_user.id,
-        latitude=41.33575242335,
-        longitude=69.21214325235,
-        full_name="Test User",
-        email="test@example.com",
-        phone_number="+998901234567"
-    )
-    db.add(ad)
-    db.commit()
-    db.refresh(ad)
-    return ad
+    return category
+
+
+@pytest.fixture
+def make_ad(db, category):
+    from app.models.ad import Ad, DealType
+
+    def make(user, **fields) -> Ad:
+        values = dict(
+            title="Test Apartment",
+            description="Test description",
+            price=100000,
+            deal_type=DealType.sale,
+            category_id=category.id,
+            city="Tashkent",
+            latitude=41.311081,
+            longitude=69.240562,
+            full_name="Test User",
+            email="test@example.com",
+            phone_number="+998901234567",
+        )
+        values.update(fields)
+        ad = Ad(user_id=user.id, **values)
+        db.add(ad)
+        db.commit()
+        db.refresh(ad)
+        return ad
+
+    return make
 
+
+@pytest.fixture
+def sample_ad(make_ad, admin_user):
+    return make_ad(admin_user)
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import event
+
+from app.db.session import async_engine
+
+
+@pytest.fixture
+def async_statements():
+    """Statements sent through the asyncpg engine while the test runs"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_sync_endpoints_authenticate_on_their_own_session(
+    client, admin_user, sample_ad, make_user, auth_headers, async_statements
+):
+    # First requests of each user: the authenticated user cache is empty, so the user is looked up
+    response = client.get("/api/v1/popular-ads/", headers=auth_headers(admin_user))
+    assert response.status_code == 200
+
+    author = make_user()
+    response = client.post(
+        f"/api/v1/ads/{sample_ad.id}/comments/", json={"text": "Still available?"}, headers=auth_headers(author)
+    )
+    assert response.status_code == 200
+
+    assert async_statements == []
+
+
+def test_sync_admin_endpoints_reject_other_users(client, sample_ad, make_user, auth_headers):
+    response = client.delete(f"/api/v1/popular-ads/{sample_ad.id}", headers=auth_headers(make_user()))
+
+    assert response.status_code == 403
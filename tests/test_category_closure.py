@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models.category import Category, CategoryClosure
+
+CATEGORIES_URL = "/api/v1/categories/"
+
+
+@pytest.fixture
+def create_category(client, admin_user, auth_headers):
+    def create(name: str, parent_id=None) -> int:
+        response = client.post(
+            CATEGORIES_URL, json={"parent_id": parent_id, "names": {"en": name}}, headers=auth_headers(admin_user)
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    return create
+
+
+def _move(client, admin_user, auth_headers, category_id: int, parent_id: int):
+    return client.patch(
+        f"{CATEGORIES_URL}{category_id}", json={"parent_id": parent_id, "names": None}, headers=auth_headers(admin_user)
+    )
+
+
+def _subtree_ad_ids(client, category_id: int) -> set:
+    response = client.get(f"{CATEGORIES_URL}{category_id}/ads", params={"include_descendants": True})
+    assert response.status_code == 200
+    return {ad["id"] for ad in response.json()["items"]}
+
+
+def _closure(db) -> set:
+    return set(db.query(CategoryClosure.ancestor_id, CategoryClosure.descendant_id, CategoryClosure.depth).all())
+
+
+def test_moving_a_subtree_relinks_its_descendants(client, db, admin_user, auth_headers, make_ad, create_category):
+    houses = create_category("Houses")
+    cottages = create_category("Cottages", houses)
+    dachas = create_category("Dachas", cottages)
+    land = create_category("Land")
+    ad = make_ad(admin_user, category_id=dachas)
+    assert _subtree_ad_ids(client, houses) == {ad.id}
+
+    assert _move(client, admin_user, auth_headers, cottages, land).status_code == 200
+
+    assert _subtree_ad_ids(client, houses) == set()
+    assert _subtree_ad_ids(client, land) == {ad.id}
+    assert _subtree_ad_ids(client, cottages) == {ad.id}
+    assert _closure(db) == {
+        (houses, houses, 0), (cottages, cottages, 0), (dachas, dachas, 0), (land, land, 0),
+        (cottages, dachas, 1), (land, cottages, 1), (land, dachas, 2),
+    }
+
+
+def test_moving_below_an_own_descendant_is_rejected(client, db, admin_user, auth_headers, create_category):
+    houses = create_category("Houses")
+    cottages = create_category("Cottages", houses)
+    dachas = create_category("Dachas", cottages)
+    closure = _closure(db)
+
+    response = _move(client, admin_user, auth_headers, houses, dachas)
+
+    assert response.status_code == 400
+    assert _closure(db) == closure
+    assert db.get(Category, houses).parent_id is None
+
+
+def test_failed_create_leaves_no_category(client, db, admin_user, auth_headers):
+    # A missing name fails when the names are inserted, after the category and its closure rows
+    with pytest.raises(IntegrityError):
+        client.post(CATEGORIES_URL, json={"names": {"en": None}}, headers=auth_headers(admin_user))
+
+    assert db.query(Category).count() == 0
+    assert db.query(CategoryClosure).count() == 0
+
+
+def test_update_replaces_names(client, admin_user, auth_headers, create_category):
+    houses = create_category("Houses")
+
+    response = client.patch(
+        f"{CATEGORIES_URL}{houses}", json={"names": {"en": "Homes", "uz": "Uylar"}}, headers=auth_headers(admin_user)
+    )
+
+    assert response.status_code == 200
+    assert response.json()["names"] == {"en": "Homes", "uz": "Uylar"}
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.session import async_engine
+from app.services.category_tree import CategoryTreeCache, category_tree_cache
+
+
+def test_first_bump_after_sequence_creation_is_seen_by_other_workers(db, category):
+    db.execute(text("ALTER SEQUENCE category_tree_version RESTART"))
+    db.commit()
+    other_worker = CategoryTreeCache(check_interval=0)
+    before = other_worker.get(db).version
+
+    category_tree_cache.bump(db)
+    db.commit()
+
+    assert other_worker.get(db).version != before
+
+
+def test_concurrent_reloads_on_the_event_loop_do_not_deadlock(db, category):
+    cache = CategoryTreeCache(check_interval=0)
+    results = []
+
+    async def read_concurrently():
+        engine = create_async_engine(async_engine.url)
+        try:
+            async with AsyncSession(engine) as first, AsyncSession(engine) as second:
+                trees = await asyncio.gather(*(session.run_sync(cache.get) for session in (first, second)))
+                results.extend(trees)
+        finally:
+            await engine.dispose()
+
+    # A deadlock blocks the loop thread itself, so watch it from outside
+    thread = threading.Thread(target=asyncio.run, args=(read_concurrently(),), daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+
+    assert not thread.is_alive(), "category tree reload deadlocked the event loop"
+    assert [set(tree.categories) for tree in results] == [{category.id}, {category.id}]
@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.ad_service import MAX_CLUSTER_CELLS
+
+# Chilonzor and Yunusobod, about 10 km apart, plus a second Chilonzor ad about 140 m away
+CHILONZOR = (41.2800, 69.2040)
+CHILONZOR_NEARBY = (41.2810, 69.2050)
+YUNUSOBOD = (41.3640, 69.2870)
+TASHKENT_BOX = {"min_latitude": 41.0, "min_longitude": 69.0, "max_latitude": 41.6, "max_longitude": 69.6}
+
+
+def _clusters(client, zoom: int, **box) -> list:
+    response = client.get("/api/v1/ads/clusters", params={**TASHKENT_BOX, **box, "zoom": zoom})
+    assert response.status_code == 200
+    return sorted(response.json(), key=lambda cluster: cluster["latitude"])
+
+
+def _place_ads(make_ad, admin_user) -> None:
+    for (latitude, longitude), price in zip((CHILONZOR, CHILONZOR_NEARBY, YUNUSOBOD), (50000, 70000, 90000)):
+        make_ad(admin_user, latitude=latitude, longitude=longitude, price=price)
+
+
+def test_clusters_group_ads_per_cell(client, make_ad, admin_user):
+    _place_ads(make_ad, admin_user)
+
+    chilonzor, yunusobod = _clusters(client, zoom=12)
+
+    assert chilonzor["count"] == 2
+    assert (chilonzor["min_price"], chilonzor["max_price"]) == (50000, 70000)
+    assert chilonzor["latitude"] == pytest.approx((CHILONZOR[0] + CHILONZOR_NEARBY[0]) / 2)
+    assert yunusobod["count"] == 1 and yunusobod["latitude"] == pytest.approx(YUNUSOBOD[0])
+    # At street level each ad has its own cell
+    chilonzor_box = {"min_latitude": 41.27, "min_longitude": 69.19, "max_latitude": 41.29, "max_longitude": 69.21}
+    assert [cluster["count"] for cluster in _clusters(client, zoom=16, **chilonzor_box)] == [1, 1]
+
+
+def test_wide_box_at_high_zoom_is_clustered_at_a_lower_zoom(client, make_ad, admin_user):
+    _place_ads(make_ad, admin_user)
+
+    # 0.6° x 0.6° at zoom 22 would be about 5e10 cells of 2 cm; zoom 13 is the highest within the cap
+    assert (0.6 * 4 * 2 ** 14 / 360) ** 2 > MAX_CLUSTER_CELLS >= (0.6 * 4 * 2 ** 13 / 360 + 1) ** 2
+    assert _clusters(client, zoom=22) == _clusters(client, zoom=13)
+    assert len(_clusters(client, zoom=22)) == 2
+
+
+def test_inverted_box_is_rejected(client):
+    response = client.get("/api/v1/ads/clusters", params={**TASHKENT_BOX, "max_latitude": 40.0, "zoom": 10})
+    assert response.status_code == 400
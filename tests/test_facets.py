@@ -0,0 +1,27 @@
+from app.models.ad import DealType
+
+
+def test_facets_run_on_the_async_engine(client, db, make_user, make_ad, category):
+    author = make_user(is_verified=True)
+    make_ad(author, price=15000, total_area=45.0, rooms_count=2, deal_type=DealType.rent)
+    make_ad(author, price=250000, total_area=95.0, rooms_count=3, city="Samarkand")
+    make_ad(author, price=260000, total_area=310.0, rooms_count=3)
+
+    # /facets is an async endpoint, so the GROUPING SETS query goes through asyncpg
+    response = client.get("/api/v1/ads/facets")
+
+    assert response.status_code == 200
+    facets = response.json()
+    assert facets["categories"] == [{"value": category.id, "count": 3}]
+    assert facets["deal_types"] == [{"value": "sale", "count": 2}, {"value": "rent", "count": 1}]
+    assert facets["rooms_counts"] == [{"value": 3, "count": 2}, {"value": 2, "count": 1}]
+    assert facets["cities"] == [{"value": "Tashkent", "count": 2}, {"value": "Samarkand", "count": 1}]
+    assert facets["price"] == [
+        {"min": 0, "max": 20000, "count": 1},
+        {"min": 200000, "max": 300000, "count": 2},
+    ]
+    assert facets["area"] == [
+        {"min": 30.0, "max": 50.0, "count": 1},
+        {"min": 90.0, "max": 120.0, "count": 1},
+        {"min": 300.0, "max": None, "count": 1},
+    ]
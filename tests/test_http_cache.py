@@ -0,0 +1,27 @@
+from app.services.view_counter import view_counter
+
+
+def test_ad_detail_revalidates_and_counts_every_view(client, sample_ad):
+    path = f"/api/v1/ads/{sample_ad.id}"
+
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    second = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert second.headers["etag"] == first.headers["etag"]
+
+    assert view_counter.pending(sample_ad.id) == 2
+
+
+def test_ad_detail_etag_changes_with_the_ad(client, db, sample_ad):
+    path = f"/api/v1/ads/{sample_ad.id}"
+    etag = client.get(path).headers["etag"]
+
+    sample_ad.price = sample_ad.price + 1
+    db.commit()
+
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == sample_ad.price
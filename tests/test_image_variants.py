@@ -0,0 +1,58 @@
+import io
+import time
+
+from PIL import Image
+
+from app.services.image_pipeline import image_pipeline
+from app.utils.images import IMAGE_VARIANTS, variant_key, variant_urls
+from app.utils.s3_upload import s3_service
+
+
+def _png(size=(1600, 900)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _upload_image(client, headers, data: bytes) -> str:
+    response = client.post("/api/v1/ads/upload-image", files={"file": ("flat.png", data, "image/png")}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["url"]
+
+
+def _wait_for_pipeline(timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while image_pipeline.stats()["pending"]:
+        assert time.monotonic() < deadline, "image pipeline did not finish"
+        time.sleep(0.05)
+
+
+def test_pipeline_stores_webp_renditions(client, s3, make_user, auth_headers):
+    url = _upload_image(client, auth_headers(make_user()), _png())
+    _wait_for_pipeline()
+
+    key = s3_service.key_from_url(url)
+    for variant, size in IMAGE_VARIANTS.items():
+        rendition = s3.get_object(Bucket=s3_service.bucket_name, Key=variant_key(key, variant))
+        assert rendition["ContentType"] == "image/webp"
+        with Image.open(io.BytesIO(rendition["Body"].read())) as image:
+            assert image.format == "WEBP" and max(image.size) == size
+
+
+def test_ads_list_only_generated_renditions(client, s3, make_user, make_ad, auth_headers):
+    user = make_user()
+    failed = image_pipeline.failed
+    url = _upload_image(client, auth_headers(user), _png())
+    # Passes the type check but cannot be decoded, so its pipeline run fails
+    broken_url = _upload_image(client, auth_headers(user), b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)
+    _wait_for_pipeline()
+    assert image_pipeline.failed == failed + 1
+    # Uploaded before renditions were recorded
+    legacy_url = s3_service.public_url("legacy.jpg")
+
+    ad = make_ad(user, image_urls=[legacy_url, url, broken_url])
+    body = client.get(f"/api/v1/ads/{ad.id}").json()
+
+    assert body["image_urls"] == [legacy_url, url, broken_url]
+    assert body["image_variants"] == [{"original": url, **variant_urls(url)}]
+    assert "variant_image_urls" not in body
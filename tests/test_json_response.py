@@ -0,0 +1,38 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.ad import GoldVerificationRequest, GoldVerificationStatus
+from app.models.favourite import Favourite
+from app.schemas.ad import AdPage
+from app.services.ad_service import AdService
+from app.utils.json_response import ModelJSONResponse
+
+
+def test_model_json_response_matches_fastapi_rendering(db, make_user, make_ad, admin_user):
+    author = make_user(is_verified=True)
+    viewer = make_user()
+    make_ad(author, price=None, city=None)
+    ad = make_ad(
+        author,
+        title="Yangi uy — Чиланзар",
+        total_area=72.5,
+        ceiling_height=2.8,
+        image_urls=["https://cdn.example.com/a.jpg", "https://cdn.example.com/b.png"],
+        document_urls=["https://cdn.example.com/plan.pdf"],
+    )
+    db.add_all([
+        GoldVerificationRequest(
+            ad_id=ad.id, requested_by=author.id, processed_by=admin_user.id, status=GoldVerificationStatus.approved
+        ),
+        Favourite(user_id=viewer.id, ad_id=ad.id),
+    ])
+    db.commit()
+
+    page = AdService(db).get_all_ads(current_user=viewer, limit=1)
+    assert page["next_cursor"] is not None
+
+    # What FastAPI renders for response_model=AdPage
+    expected = jsonable_encoder(AdPage.model_validate(page))
+    assert expected["items"][0]["is_favourited"] and expected["items"][0]["is_gold_verified"]
+    assert json.loads(ModelJSONResponse(AdPage, page).body) == expected
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.ad import GoldVerificationRequest, GoldVerificationStatus
+from app.models.favourite import Favourite
+from app.models.popular_ad import PopularAd
+
+
+@pytest.fixture
+def lazy_loads():
+    """Relationship attributes lazily loaded by any session (AsyncSession included) during the test"""
+    loads = []
+
+    def on_execute(orm_execute_state):
+        if not orm_execute_state.is_select:
+            return
+        state = orm_execute_state.lazy_loaded_from
+        if state is not None:
+            loads.append(f"{state.class_.__name__}: {orm_execute_state.statement}")
+
+    event.listen(Session, "do_orm_execute", on_execute)
+    yield loads
+    event.remove(Session, "do_orm_execute", on_execute)
+
+
+@pytest.fixture
+def ad_paths(db, make_user, make_ad, admin_user, category):
+    """The AdOut endpoints, for an ad with every relationship AdOut reads populated"""
+    viewer = make_user(is_verified=True)
+    author = make_user(is_verified=True)
+    ad = make_ad(author)
+    db.add_all([
+        GoldVerificationRequest(
+            ad_id=ad.id,
+            requested_by=author.id,
+            processed_by=admin_user.id,
+            status=GoldVerificationStatus.approved,
+        ),
+        Favourite(user_id=viewer.id, ad_id=ad.id),
+        PopularAd(ad_id=ad.id, added_by=admin_user.id),
+    ])
+    db.commit()
+
+    paths = [
+        "/api/v1/ads/",
+        "/api/v1/ads/nearby?latitude=41.311081&longitude=69.240562",
+        "/api/v1/ads/mine",
+        f"/api/v1/ads/user/{author.id}",
+        f"/api/v1/ads/{ad.id}",
+        "/api/v1/users/me/favourites",
+        "/api/v1/popular-ads/",
+        f"/api/v1/categories/{category.id}/ads",
+    ]
+    return viewer, author, paths
+
+
+@pytest.mark.parametrize("authenticated", [False, True])
+def test_ad_serialization_does_not_lazy_load(authenticated, client, auth_headers, ad_paths, lazy_loads):
+    viewer, author, paths = ad_paths
+    for path in paths:
+        if path in ("/api/v1/ads/mine", "/api/v1/users/me/favourites") and not authenticated:
+            continue
+        user = author if path == "/api/v1/ads/mine" else viewer
+        response = client.get(path, headers=auth_headers(user) if authenticated else {})
+        assert response.status_code == 200, (path, response.text)
+
+    assert lazy_loads == []
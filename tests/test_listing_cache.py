@@ -0,0 +1,35 @@
+from app.models.user import UserRole
+
+
+def _listed_gold_status(client, ad_id):
+    """Gold verification status of an ad in the anonymous (cached) listing"""
+    [item] = [item for item in client.get("/api/v1/ads/").json()["items"] if item["id"] == ad_id]
+    return item["gold_verification_status"], item["gold_verification_comment"]
+
+
+def test_gold_verification_changes_reach_the_cached_listing(client, make_user, make_ad, auth_headers):
+    author = make_user(role=UserRole.REALTOR, is_verified=True)
+    admin = make_user(role=UserRole.ADMIN)
+    ad = make_ad(author)
+    assert _listed_gold_status(client, ad.id) == (None, None)
+
+    response = client.post("/api/v1/verification/gold-request", json={"ad_id": ad.id}, headers=auth_headers(author))
+    assert response.status_code == 201
+    assert _listed_gold_status(client, ad.id) == ("pending", None)
+
+    response = client.put(
+        f"/api/v1/admin/verification/gold-request/{response.json()['id']}/process",
+        json={"status": "rejected", "admin_comment": "Blurry documents"},
+        headers=auth_headers(admin),
+    )
+    assert response.status_code == 200
+    assert _listed_gold_status(client, ad.id) == ("rejected", "Blurry documents")
+
+    response = client.post("/api/v1/verification/gold-request", json={"ad_id": ad.id}, headers=auth_headers(author))
+    assert _listed_gold_status(client, ad.id) == ("pending", None)
+
+    response = client.delete(
+        f"/api/v1/verification/gold-request/{response.json()['id']}", headers=auth_headers(author)
+    )
+    assert response.status_code == 200
+    assert _listed_gold_status(client, ad.id) == ("rejected", "Cancelled by user")
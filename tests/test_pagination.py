@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+ADS_URL = "/api/v1/ads/"
+
+
+def _pages(client, **params) -> list:
+    """Every page of the ad list, following next_cursor"""
+    pages, cursor = [], None
+    while True:
+        response = client.get(ADS_URL, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([ad["id"] for ad in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("rank", [None, 0.0607927])
+def test_cursor_round_trip(rank):
+    created_at = datetime(2026, 10, 17, 9, 30, 15, 123456, tzinfo=timezone.utc)
+
+    cursor = encode_cursor(created_at, 42, rank)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42, rank)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", base64.urlsafe_b64encode(b'["id", 1]').decode(), "e30"])
+def test_malformed_cursor_is_rejected(client, cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+    assert client.get(ADS_URL, params={"cursor": cursor}).status_code == 400
+
+
+def test_pages_continue_through_created_at_ties(client, db, make_ad, admin_user):
+    ads = [make_ad(admin_user) for _ in range(5)]
+    # Same timestamp for every ad: only the id tie-breaker orders them
+    db.execute(text("UPDATE ad SET created_at = '2026-10-17 09:00:00+00'"))
+    db.commit()
+
+    pages = _pages(client, limit=2)
+
+    assert pages == [[ads[4].id, ads[3].id], [ads[2].id, ads[1].id], [ads[0].id]]
+
+
+def test_search_pages_follow_rank(client, make_ad, admin_user):
+    strong = make_ad(admin_user, title="Metro metro yonida", description="Metro 2 daqiqa")
+    medium = [make_ad(admin_user, title="Metro yonida", description="Yangi uy") for _ in range(3)]
+    weak = make_ad(admin_user, title="Yangi uy", description="Metroga yaqin, metro")
+    make_ad(admin_user, title="Hovli", description="Shahar tashqarisida")
+
+    pages = _pages(client, q="metro", limit=2)
+    ranked = [ad_id for page in pages for ad_id in page]
+
+    assert ranked == _pages(client, q="metro", limit=100)[0]
+    assert len(pages) == 3
+    # Equal ranks are ordered newest first, like the unranked list
+    assert ranked[0] == strong.id
+    assert ranked[1:4] == [ad.id for ad in reversed(medium)]
+    # Matched in the description only, and the unmatched ad is left out
+    assert ranked[4:] == [weak.id]
+
+
+def test_cursor_is_bound_to_ranked_or_unranked_order(client, make_ad, admin_user):
+    for _ in range(3):
+        make_ad(admin_user, title="Metro yonida")
+
+    ranked_cursor = client.get(ADS_URL, params={"q": "metro", "limit": 1}).json()["next_cursor"]
+    unranked_cursor = client.get(ADS_URL, params={"limit": 1}).json()["next_cursor"]
+
+    assert client.get(ADS_URL, params={"cursor": ranked_cursor}).status_code == 400
+    assert client.get(ADS_URL, params={"q": "metro", "cursor": unranked_cursor}).status_code == 400
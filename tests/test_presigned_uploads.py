@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from app.models.stored_file import StoredFile
+from app.services.stored_file_service import sweep_unreferenced_files
+from app.utils.s3_upload import s3_service
+
+PDF = b"%PDF-1.7\n" + b"0" * 64
+PNG = b"\x89PNG\r\n\x1a\n" + b"0" * 64
+
+
+def _presign(client, headers, ad_id: int, kind: str, filename: str, content_type: str) -> str:
+    response = client.post(
+        f"/api/v1/ads/{ad_id}/uploads",
+        json={"kind": kind, "filename": filename, "content_type": content_type},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return response.json()["key"]
+
+
+def _complete(client, headers, ad_id: int, kind: str, key: str):
+    return client.post(f"/api/v1/ads/{ad_id}/uploads/complete", json={"kind": kind, "key": key}, headers=headers)
+
+
+def test_completing_twice_attaches_the_file_once(client, db, s3, make_user, make_ad, auth_headers):
+    user = make_user()
+    headers = auth_headers(user)
+    ad = make_ad(user)
+    key = _presign(client, headers, ad.id, "document", "plan.pdf", "application/pdf")
+    s3.put_object(Bucket=s3_service.bucket_name, Key=key, Body=PDF, ContentType="application/pdf")
+
+    first = _complete(client, headers, ad.id, "document", key)
+    second = _complete(client, headers, ad.id, "document", key)
+
+    url = s3_service.public_url(key)
+    assert first.status_code == second.status_code == 200
+    assert first.json()["document_urls"] == second.json()["document_urls"] == [url]
+    assert db.get(StoredFile, url).ref_count == 1
+
+
+def test_content_not_matching_the_declared_type_is_rejected(client, db, s3, make_user, make_ad, auth_headers):
+    user = make_user()
+    headers = auth_headers(user)
+    ad = make_ad(user)
+    key = _presign(client, headers, ad.id, "image", "flat.png", "image/png")
+    # The POST policy only pins the Content-Type field, not what is uploaded
+    s3.put_object(Bucket=s3_service.bucket_name, Key=key, Body=PDF, ContentType="image/png")
+
+    response = _complete(client, headers, ad.id, "image", key)
+
+    assert response.status_code == 400
+    db.refresh(ad)
+    assert ad.image_urls == []
+    assert db.get(StoredFile, s3_service.public_url(key)).ref_count == 0
+
+
+def test_uploads_never_completed_are_swept(client, db, s3, make_user, make_ad, auth_headers):
+    user = make_user()
+    headers = auth_headers(user)
+    ad = make_ad(user)
+    abandoned = _presign(client, headers, ad.id, "image", "flat.png", "image/png")
+    attached = _presign(client, headers, ad.id, "document", "plan.pdf", "application/pdf")
+    s3.put_object(Bucket=s3_service.bucket_name, Key=abandoned, Body=PNG, ContentType="image/png")
+    s3.put_object(Bucket=s3_service.bucket_name, Key=attached, Body=PDF, ContentType="application/pdf")
+    assert _complete(client, headers, ad.id, "document", attached).status_code == 200
+    db.execute(text("UPDATE stored_file SET updated_at = now() - interval '2 days'"))
+    db.commit()
+
+    assert client.portal.call(sweep_unreferenced_files, timedelta(hours=1)) == 1
+
+    keys = [item["Key"] for item in s3.list_objects_v2(Bucket=s3_service.bucket_name).get("Contents", [])]
+    assert keys == [attached]
+    assert db.get(StoredFile, s3_service.public_url(abandoned)) is None
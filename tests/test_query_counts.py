@@ -0,0 +1,62 @@
+import pytest
+
+from app.models.ad import GoldVerificationRequest, GoldVerificationStatus
+from app.models.favourite import Favourite
+from app.models.popular_ad import PopularAd
+
+# Endpoints returning lists of AdOut; (path, whether the listed ads must belong to the caller)
+AD_LIST_ENDPOINTS = [
+    ("/api/v1/ads/", False),
+    ("/api/v1/ads/nearby?latitude=41.311081&longitude=69.240562&radius_km=5", False),
+    ("/api/v1/ads/mine", True),
+    ("/api/v1/users/me/favourites", False),
+    ("/api/v1/popular-ads/", False),
+]
+
+
+def _seed_ads(db, make_user, make_ad, viewer, admin, count: int, own: bool) -> None:
+    """Ads by distinct, verified authors, each gold verified, popular and favourited by viewer"""
+    for _ in range(count):
+        author = viewer if own else make_user(is_verified=True)
+        ad = make_ad(author)
+        db.add_all([
+            GoldVerificationRequest(
+                ad_id=ad.id,
+                requested_by=author.id,
+                processed_by=admin.id,
+                status=GoldVerificationStatus.approved,
+            ),
+            Favourite(user_id=viewer.id, ad_id=ad.id),
+            PopularAd(ad_id=ad.id, added_by=admin.id),
+        ])
+        db.commit()
+
+
+def _items(body):
+    return body["items"] if isinstance(body, dict) else body
+
+
+@pytest.mark.parametrize("path, own", AD_LIST_ENDPOINTS)
+def test_ad_list_query_count_does_not_grow_with_page_size(
+    path, own, client, db, make_user, make_ad, admin_user, auth_headers, count_queries
+):
+    viewer = make_user(is_verified=True)
+    headers = auth_headers(viewer)
+
+    _seed_ads(db, make_user, make_ad, viewer, admin_user, 2, own)
+    # Warm up the per-worker caches (authenticated user, token claims) so both runs see the same state
+    client.get(path, headers=headers)
+    with count_queries() as few:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    assert len(_items(response.json())) == 2
+
+    _seed_ads(db, make_user, make_ad, viewer, admin_user, 8, own)
+    with count_queries() as many:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    items = _items(response.json())
+    assert len(items) == 10
+    assert all(item["is_author_verified"] and item["is_gold_verified"] for item in items)
+
+    assert len(many) == len(few), "\n\n".join(many)
@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+from app.models.stored_file import StoredFile
+from app.services.stored_file_service import StoredFileService, claim_stored_file, sweep_unreferenced_files
+
+GRACE = timedelta(hours=1)
+# Not under the bucket's public URL, so the sweep has no S3 object to delete
+URL = "https://cdn.example.com/3f2a.jpg"
+
+
+def _add_file(db, url: str, ref_count: int = 0, age: timedelta = timedelta(days=2)) -> None:
+    db.add(StoredFile(url=url, ref_count=ref_count))
+    db.commit()
+    db.execute(text("UPDATE stored_file SET updated_at = now() - :age WHERE url = :url"), {"age": age, "url": url})
+    db.commit()
+
+
+def test_claim_restarts_the_grace_period(client, db):
+    _add_file(db, URL)
+
+    client.portal.call(claim_stored_file, URL)
+
+    assert StoredFileService(db).lock_unreferenced(GRACE, 10) == []
+    db.rollback()
+
+
+def test_claim_during_a_sweep_waits_and_keeps_a_row(client, db):
+    _add_file(db, URL)
+    sweep = SessionLocal()
+    try:
+        assert StoredFileService(sweep).lock_unreferenced(GRACE, 10) == [URL]
+
+        claim = client.portal.start_task_soon(claim_stored_file, URL)
+        time.sleep(0.5)
+        assert not claim.done(), "the claim must wait for the sweep holding the row"
+
+        StoredFileService(sweep).forget([URL])
+        sweep.commit()
+        claim.result(timeout=10)
+    finally:
+        sweep.close()
+
+    # The object is gone, but the upload that claimed it checks only now and stores it again
+    file = db.get(StoredFile, URL)
+    assert file is not None and file.ref_count == 0
+    assert StoredFileService(db).lock_unreferenced(GRACE, 10) == []
+    db.rollback()
+
+
+def test_sweep_deletes_only_expired_unreferenced_files(client, db):
+    _add_file(db, URL)
+    _add_file(db, "https://cdn.example.com/referenced.jpg", ref_count=1)
+    _add_file(db, "https://cdn.example.com/recent.jpg", age=timedelta(minutes=5))
+
+    assert client.portal.call(sweep_unreferenced_files, GRACE) == 1
+
+    db.expire_all()
+    assert {url for (url,) in db.query(StoredFile.url)} == {
+        "https://cdn.example.com/referenced.jpg",
+        "https://cdn.example.com/recent.jpg",
+    }
+
+
+def test_avatar_survives_the_sweep_until_it_is_replaced(client, db, make_user, auth_headers):
+    user = make_user()
+    new_avatar = "https://cdn.example.com/new-avatar.jpg"
+    # Uploaded and claimed long before the grace period ran out
+    _add_file(db, URL)
+
+    response = client.patch("/api/v1/profile/", json={"avatar": URL}, headers=auth_headers(user))
+    assert response.status_code == 200
+    db.execute(text("UPDATE stored_file SET updated_at = now() - interval '2 days'"))
+    db.commit()
+
+    assert client.portal.call(sweep_unreferenced_files, GRACE) == 0
+    db.expire_all()
+    assert db.get(StoredFile, URL).ref_count == 1
+
+    _add_file(db, new_avatar, age=timedelta(minutes=5))
+    response = client.patch("/api/v1/profile/", json={"avatar": new_avatar}, headers=auth_headers(user))
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(StoredFile, URL).ref_count == 0
+    assert db.get(StoredFile, new_avatar).ref_count == 1
+
+    assert client.delete("/api/v1/profile/", headers=auth_headers(user)).status_code == 204
+    db.expire_all()
+    assert db.get(StoredFile, new_avatar).ref_count == 0
@@ -0,0 +1,85 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.models.stored_file import StoredFile
+from app.services.ad_service import MAX_FILE_SIZE, UPLOAD_CONTENT_TYPES
+from app.schemas.ad import UploadKind
+from app.utils.s3_upload import MB, s3_service
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\x0dIHDR"
+CHUNK = 256 * 1024
+
+
+@pytest.fixture
+def aborted(s3, monkeypatch):
+    """UploadIds of the aborted multipart uploads; parts are 1 MB so small bodies go multipart"""
+    monkeypatch.setattr(settings, "S3_MULTIPART_CHUNK_MB", 1)
+    upload_ids = []
+    abort = s3.abort_multipart_upload
+
+    def abort_multipart_upload(**kwargs):
+        upload_ids.append(kwargs["UploadId"])
+        return abort(**kwargs)
+
+    monkeypatch.setattr(s3, "abort_multipart_upload", abort_multipart_upload)
+    return upload_ids
+
+
+def _body(header: bytes, size: int):
+    yield header
+    sent = len(header)
+    while sent < size:
+        chunk = b"\x00" * min(CHUNK, size - sent)
+        sent += len(chunk)
+        yield chunk
+
+
+def _assert_nothing_stored(s3, db) -> None:
+    assert s3.list_multipart_uploads(Bucket=s3_service.bucket_name).get("Uploads", []) == []
+    assert s3.list_objects_v2(Bucket=s3_service.bucket_name)["KeyCount"] == 0
+    assert db.query(StoredFile).count() == 0
+
+
+def test_oversized_body_aborts_the_multipart_upload(client, db, s3, aborted):
+    async def body():
+        for chunk in _body(PNG_HEADER, MAX_FILE_SIZE + MB):
+            yield chunk
+
+    # Without a declared length the limit is only hit after several parts have been uploaded
+    with pytest.raises(HTTPException) as error:
+        client.portal.call(s3_service.store_stream, body(), UPLOAD_CONTENT_TYPES[UploadKind.image], MAX_FILE_SIZE)
+
+    assert error.value.status_code == 413
+    assert len(aborted) == 1
+    _assert_nothing_stored(s3, db)
+
+
+def test_disallowed_type_is_refused_before_any_part(client, db, s3, aborted, make_user, auth_headers):
+    response = client.post(
+        "/api/v1/ads/upload-stream",
+        params={"kind": "document"},
+        content=_body(PNG_HEADER, 3 * MB),
+        headers=auth_headers(make_user()),
+    )
+
+    assert response.status_code == 400
+    assert aborted == []
+    _assert_nothing_stored(s3, db)
+
+
+def test_client_disconnect_aborts_the_multipart_upload(client, db, s3, aborted):
+    async def disconnecting_body():
+        for chunk in _body(PNG_HEADER, 3 * MB):
+            yield chunk
+        raise ClientDisconnect()
+
+    with pytest.raises(HTTPException) as error:
+        client.portal.call(
+            s3_service.store_stream, disconnecting_body(), UPLOAD_CONTENT_TYPES[UploadKind.image], MAX_FILE_SIZE
+        )
+
+    assert error.value.status_code == 500
+    assert len(aborted) == 1
+    _assert_nothing_stored(s3, db)
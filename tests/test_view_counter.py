@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine
+
+from app.models.ad import Ad
+from app.services import view_counter as view_counter_module
+from app.services.view_counter import ViewCounter
+
+
+def test_stop_writes_buffered_views(client, db, sample_ad):
+    counter = ViewCounter(flush_interval=3600, flush_threshold=1000)
+    client.portal.call(counter.start)
+    counter.record(sample_ad.id, 3)
+    counter.record(sample_ad.id)
+
+    client.portal.call(counter.stop)
+
+    db.refresh(sample_ad)
+    assert sample_ad.views_count == 4
+    assert counter.pending(sample_ad.id) == 0
+
+
+def test_failed_final_flush_does_not_interrupt_shutdown(client, db, sample_ad, monkeypatch):
+    counter = ViewCounter(flush_interval=3600, flush_threshold=1000)
+    counter.record(sample_ad.id, 2)
+    unreachable = create_engine("postgresql://nobody@127.0.0.1:1/none")
+    monkeypatch.setattr(view_counter_module, "engine", unreachable)
+
+    client.portal.call(counter.stop)
+
+    # Kept in the backend rather than raised out of the lifespan
+    assert counter.pending(sample_ad.id) == 2
+    assert db.get(Ad, sample_ad.id).views_count == 0